@@ -0,0 +1,93 @@
+"""
+Deal memory benchmark: bytes per Deal for the previous layout (plain frozen
+dataclass, string prices, stored url / image_url) vs the current slotted Deal.
+
+    python -m benchmarks.bench_deal_memory               # 100k deals
+    python -m benchmarks.bench_deal_memory --deals 20000
+
+Both sides are built from the same parsed synthetic search rows; the rows
+themselves are excluded from the measurement.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence
+
+from benchmarks.fixtures import synthetic_results_html
+from src.bot.adapters.outbound.steam_parser import SearchRow, _clean, deals_from_rows, parse_search_rows
+from src.bot.domain.models import STEAM_APP_URL, STEAM_HEADER_IMAGE_URL
+
+
+@dataclass(frozen=True)
+class LegacyDeal:
+    # Bản sao layout cũ của Deal để so sánh
+    appid: int
+    name: str
+    discount_pct: int
+    price_final: str
+    price_original: Optional[str]
+    url: str
+    image_url: Optional[str] = None
+    tags: Sequence[str] = ()
+
+
+def legacy_deals_from_rows(rows: list[SearchRow]) -> list[LegacyDeal]:
+    # Như provider cũ: mỗi deal giữ chuỗi giá riêng, url và header URL đã format sẵn
+    return [
+        LegacyDeal(
+            appid=r.appid,
+            name=r.name,
+            discount_pct=r.discount_pct,
+            price_final=_clean(r.price_final),
+            price_original=_clean(r.price_original) if r.price_original else None,
+            url=STEAM_APP_URL.format(appid=r.appid),
+            image_url=STEAM_HEADER_IMAGE_URL.format(appid=r.appid),
+        )
+        for r in rows
+        if r.name is not None and r.discount_pct > 0
+    ]
+
+
+def synthetic_rows(n: int, page_size: int = 100) -> list[SearchRow]:
+    rows: list[SearchRow] = []
+    for start in range(0, n, page_size):
+        rows.extend(parse_search_rows(synthetic_results_html(min(page_size, n - start), start_appid=100_000 + start)))
+    return rows
+
+
+def measure(build: Callable[[list[SearchRow]], list], rows: list[SearchRow]) -> tuple[int, float, list]:
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    deals = build(rows)
+    elapsed = time.perf_counter() - t0
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return memory, elapsed, deals
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--deals", type=int, default=100_000)
+    args = ap.parse_args()
+
+    rows = synthetic_rows(args.deals)
+    legacy_mem, legacy_t, legacy = measure(legacy_deals_from_rows, rows)
+    del legacy
+    current_mem, current_t, current = measure(deals_from_rows, rows)
+
+    n = len(current)
+    print(f"deals={n:,} (from {len(rows):,} rows; build time includes tracemalloc overhead)")
+    print(f"legacy   {legacy_mem / 2**20:7.1f} MiB  {legacy_mem / n:6.0f} B/deal  build {legacy_t:.2f}s")
+    print(f"current  {current_mem / 2**20:7.1f} MiB  {current_mem / n:6.0f} B/deal  build {current_t:.2f}s")
+    print(f"saved    {(1 - current_mem / legacy_mem):.0%}")
+    d = current[0]
+    print(f"sample   {d.name!r} final_minor={d.final_minor} currency={d.currency!r} url={d.url}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+End-to-end `fetch_deals` against a local Steam stand-in (no network).
+
+    python -m benchmarks.bench_e2e
+    python -m benchmarks.bench_e2e --mode search -n 50
+    python -m benchmarks.bench_e2e --store warm --error-rate 0.05 --throttle-rate 0.02
+
+--store none   no appdetails store
+--store cold   fresh SQLite store per iteration (every appid is a miss)
+--store warm   one store shared by all iterations (first run fills it)
+
+Covers steam_parser, HttpClient (limits, retries, conditional cache) and the
+appdetails pipeline; compare the printed numbers across commits.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import Optional
+
+from benchmarks.steam_standin import SteamStandIn, add_standin_args, standin_config
+from src.bot.adapters.outbound.http_client import HttpClient
+from src.bot.adapters.outbound.rate_limit import RateLimitConfig
+from src.bot.adapters.outbound.response_cache import ResponseCache
+from src.bot.adapters.outbound.steam_store_provider import MODE_APPDETAILS, MODE_SEARCH, SteamStoreDealsProvider
+from src.bot.application.ports import DealsQuery
+from src.bot.infrastructure.appdetails_store import SqliteAppDetailsStore
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+def _ratio(hits: int, misses: int) -> str:
+    total = hits + misses
+    return f"{hits / total:.1%}" if total else "n/a"
+
+
+def _make_http(args: argparse.Namespace) -> HttpClient:
+    # Giới hạn rộng: đo pipeline chứ không đo token bucket
+    return HttpClient(
+        user_agent="bench-e2e",
+        rate_limits=RateLimitConfig(rate_per_second=10_000, burst=10_000, max_concurrency=64),
+        response_cache=None if args.no_response_cache else ResponseCache(),
+    )
+
+
+async def _run(args: argparse.Namespace) -> None:
+    standin = SteamStandIn(standin_config(args))
+    base_url = await standin.start()
+    tmp = tempfile.TemporaryDirectory(prefix="bench-e2e-")
+    http = _make_http(args)
+    store: Optional[SqliteAppDetailsStore] = None
+    store_hits = store_misses = 0
+    latencies: list[float] = []
+    parse_seconds = 0.0
+    search_pages = 0
+    errors = 0
+
+    q = DealsQuery(tag_ids=[1628], only_discounted=True, limit=args.limit, country_code="vn", language="english")
+    try:
+        for i in range(args.iterations):
+            if args.store == "cold" or (args.store == "warm" and store is None):
+                if store is not None:
+                    store_hits, store_misses = store_hits + store.hits, store_misses + store.misses
+                    await store.close()
+                store = SqliteAppDetailsStore(os.path.join(tmp.name, f"appdetails-{i}.sqlite3"))
+            provider = SteamStoreDealsProvider(
+                http,
+                concurrency=args.concurrency,
+                store=store,
+                price_batch_size=args.price_batch_size,
+                mode=args.mode,
+                search_page_size=args.page_size,
+                store_base_url=base_url,
+            )
+            t0 = time.perf_counter()
+            try:
+                deals = await provider.fetch_deals(q)
+            except Exception as e:
+                errors += 1
+                print(f"iteration {i}: {type(e).__name__}: {e}")
+                continue
+            latencies.append(time.perf_counter() - t0)
+            parse_seconds += provider.parse_seconds
+            search_pages += provider.search_pages
+            if i == 0:
+                print(f"first run: {len(deals)} deals in {latencies[0] * 1000:.0f} ms")
+    finally:
+        if store is not None:
+            store_hits, store_misses = store_hits + store.hits, store_misses + store.misses
+            await store.close()
+        http_stats = http.stats()
+        await http.close()
+        await standin.stop()
+        tmp.cleanup()
+
+    if not latencies:
+        raise SystemExit("every iteration failed")
+    ms = [x * 1000 for x in latencies]
+    runs = len(latencies)
+    print(f"mode={args.mode} store={args.store} iterations={runs} errors={errors} "
+          f"latency={args.latency_ms:.0f}±{args.latency_jitter_ms:.0f}ms")
+    print(f"fetch_deals ms   p50={_percentile(ms, 50):.1f} p95={_percentile(ms, 95):.1f} "
+          f"p99={_percentile(ms, 99):.1f} mean={statistics.fmean(ms):.1f}")
+    print(f"server requests  {dict(sorted(standin.requests.items()))}")
+    print(f"client requests  total={http_stats['requests']} per_run={http_stats['requests'] / runs:.1f} "
+          f"status={http_stats['status']}")
+    print(f"bytes received   total={http_stats['bytes_received'] / 1024:.0f} KiB "
+          f"per_run={http_stats['bytes_received'] / runs / 1024:.1f} KiB")
+    if "response_cache" in http_stats:
+        rc = http_stats["response_cache"]
+        print(f"response cache   revalidated(304)={rc['revalidated']} stored={rc['stored']} entries={rc['entries']}")
+    print(f"appdetails store hit_ratio={_ratio(store_hits, store_misses)} hits={store_hits} misses={store_misses}")
+    if search_pages:
+        print(f"parse            pages={search_pages} total={parse_seconds * 1000:.1f} ms "
+              f"per_page={parse_seconds / search_pages * 1e6:.0f} µs")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("-n", "--iterations", type=int, default=20)
+    ap.add_argument("--mode", choices=(MODE_APPDETAILS, MODE_SEARCH), default=MODE_APPDETAILS)
+    ap.add_argument("--store", choices=("none", "cold", "warm"), default="cold")
+    ap.add_argument("--limit", type=int, default=10)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--price-batch-size", type=int, default=50)
+    ap.add_argument("--page-size", type=int, default=50)
+    ap.add_argument("--no-response-cache", action="store_true")
+    add_standin_args(ap)
+    ap.set_defaults(latency_ms=20.0, latency_jitter_ms=10.0)
+    asyncio.run(_run(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Search payload decoding: str pipeline vs bytes-in pipeline.
+
+    python -m benchmarks.bench_json
+    python -m benchmarks.bench_json --rows 100 -n 200
+
+"str" is the old path: bytes -> str (resp.text()) -> json.loads -> results_html.
+"bytes" is the current path: bytes -> json_codec.loads -> results_html.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import tracemalloc
+from typing import Callable
+
+from benchmarks.fixtures import synthetic_page
+from src.bot.adapters.outbound import json_codec
+from src.bot.adapters.outbound.steam_parser import parse_search_payload
+
+
+def _str_pipeline(body: bytes) -> str:
+    text = body.decode("utf-8")
+    return json.loads(text).get("results_html", "")
+
+
+def _bytes_pipeline(body: bytes) -> str:
+    return parse_search_payload(body)[0]
+
+
+def _time(fn: Callable[[bytes], str], body: bytes, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(body)
+    return (time.perf_counter() - t0) / repeat
+
+
+def _peak(fn: Callable[[bytes], str], body: bytes) -> int:
+    tracemalloc.start()
+    try:
+        fn(body)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=100, help="rows in the synthetic search payload")
+    ap.add_argument("-n", "--repeat", type=int, default=100)
+    args = ap.parse_args()
+
+    body = synthetic_page(args.rows).encode("utf-8")
+    if _str_pipeline(body) != _bytes_pipeline(body):
+        raise SystemExit("pipelines disagree")
+
+    print(f"payload={len(body) / 1024:.0f} KiB repeat={args.repeat}")
+    print(f"{'pipeline':<22}{'µs/payload':>12}{'MiB/s':>9}{'peak KiB':>10}")
+    rows = []
+    for codec in ("json", "orjson"):
+        if json_codec.use_codec(codec) != codec:
+            print(f"({codec} not installed, skipped)")
+            continue
+        rows.append((f"bytes ({codec})", _bytes_pipeline))
+        for label, fn in ([("str (json)", _str_pipeline)] if codec == "json" else []) + rows[-1:]:
+            sec = _time(fn, body, args.repeat)
+            print(f"{label:<22}{sec * 1e6:>12,.0f}{len(body) / sec / 2**20:>9,.0f}{_peak(fn, body) / 1024:>10,.0f}")
+    json_codec.use_codec("auto")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Load test for /deals_metroidvania: many users at once against a local Steam stand-in.
+
+    python -m benchmarks.bench_load
+    python -m benchmarks.bench_load --levels 1,25,100,400 --limits 5,10,20
+    python -m benchmarks.bench_load --no-streaming --ramp-seconds 2 --throttle-rate 0.05
+
+The registered command callback is driven with fake interactions that record
+when `response.defer` and `followup.send` happen. Each level starts from an
+empty deals cache. Reported per level:
+
+- defer miss: defer later than Discord's 3 s interaction deadline
+- ttfr: interaction created -> first followup carrying embeds
+- loop lag: how late a 10 ms sleeper wakes up while the level runs
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from typing import Optional
+
+import discord
+from discord import app_commands
+
+from benchmarks.steam_standin import SteamStandIn, add_standin_args, standin_config
+from src.bot.adapters.inbound.discord_commands import register_commands
+from src.bot.adapters.outbound.http_client import HttpClient
+from src.bot.adapters.outbound.parse_offload import MODE_INLINE, MODE_PROCESS, MODE_THREAD, ParseOffloader
+from src.bot.adapters.outbound.rate_limit import RateLimitConfig
+from src.bot.adapters.outbound.response_cache import ResponseCache
+from src.bot.adapters.outbound.steam_store_provider import SteamStoreDealsProvider
+from src.bot.application.use_cases import GetDealsUseCase
+from src.bot.infrastructure.cache_memory import MemoryCache
+
+INTERACTION_DEADLINE_SECONDS = 3.0
+LAG_PROBE_INTERVAL_SECONDS = 0.01
+
+
+class _FakeMessage:
+    def __init__(self, owner: "_FakeInteraction"):
+        self._owner = owner
+
+    async def edit(self, **kwargs) -> "_FakeMessage":
+        await asyncio.sleep(self._owner.api_latency)
+        self._owner.edits += 1
+        return self
+
+
+class _FakeResponse:
+    def __init__(self, owner: "_FakeInteraction"):
+        self._owner = owner
+
+    async def defer(self, **kwargs) -> None:
+        self._owner.deferred_at = time.perf_counter()
+        await asyncio.sleep(self._owner.api_latency)
+
+
+class _FakeFollowup:
+    def __init__(self, owner: "_FakeInteraction"):
+        self._owner = owner
+
+    async def send(self, content: Optional[str] = None, *, embeds=None, wait: bool = False, **kwargs):
+        await asyncio.sleep(self._owner.api_latency)
+        owner = self._owner
+        owner.sends += 1
+        if embeds and owner.first_embed_at is None:
+            owner.first_embed_at = time.perf_counter()
+        if content and owner.error is None:
+            owner.error = content
+        return _FakeMessage(owner) if wait else None
+
+
+class _FakeInteraction:
+    """Just enough of discord.Interaction for the deals commands."""
+
+    def __init__(self, user_id: int, api_latency: float, created_at: float):
+        self.user = f"load-user-{user_id}"
+        self.guild = None
+        self.api_latency = api_latency
+        self.created_at = created_at
+        self.deferred_at: Optional[float] = None
+        self.first_embed_at: Optional[float] = None
+        self.sends = 0
+        self.edits = 0
+        self.error: Optional[str] = None
+        self.response = _FakeResponse(self)
+        self.followup = _FakeFollowup(self)
+
+
+async def _probe_loop_lag(samples: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(LAG_PROBE_INTERVAL_SECONDS)
+        samples.append(max(0.0, time.perf_counter() - t0 - LAG_PROBE_INTERVAL_SECONDS))
+
+
+def _pct(values: list[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+async def _run_level(args: argparse.Namespace, base_url: str, http: HttpClient,
+                     parser: ParseOffloader, users: int) -> str:
+    cache = MemoryCache()
+    provider = SteamStoreDealsProvider(http, store=None, mode=args.mode, store_base_url=base_url,
+                                       parse_offloader=parser)
+    uc = GetDealsUseCase(provider, cache, cache_ttl_seconds=900, min_fetch_limit=args.min_fetch_limit)
+
+    client = discord.Client(intents=discord.Intents.none())
+    tree = app_commands.CommandTree(client)
+    register_commands(tree, uc, steam_cc="vn", steam_lang="english", tag_metroidvania=1628,
+                      default_limit=10, streaming=not args.no_streaming)
+    callback = tree.get_command("deals_metroidvania").callback
+
+    rng = random.Random(users)
+    limits = [int(x) for x in args.limits.split(",")]
+    api_latency = args.discord_latency_ms / 1000
+    interactions: list[_FakeInteraction] = []
+
+    async def one_user(i: int, due: float) -> None:
+        # created_at = lúc Discord gửi interaction; loop chậm -> defer trễ theo
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        it = _FakeInteraction(i, api_latency, created_at=due)
+        interactions.append(it)
+        await callback(it, limit=rng.choice(limits))
+
+    lag: list[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe_loop_lag(lag, stop))
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(one_user(i, started + rng.uniform(0, args.ramp_seconds)) for i in range(users)))
+    finally:
+        stop.set()
+        await probe
+        await uc.close()
+        await cache.close()
+    wall = time.perf_counter() - started
+
+    defer_s = [it.deferred_at - it.created_at for it in interactions if it.deferred_at is not None]
+    ttfr = [it.first_embed_at - it.created_at for it in interactions if it.first_embed_at is not None]
+    misses = sum(1 for it in interactions if it.deferred_at is None
+                 or it.deferred_at - it.created_at > INTERACTION_DEADLINE_SECONDS)
+    errors = sum(1 for it in interactions if it.error is not None and it.first_embed_at is None)
+    return (f"{users:>6}{wall:>8.2f}{misses:>7}{errors:>7}"
+            f"{_pct(defer_s, 99) * 1000:>10.1f}"
+            f"{_pct(ttfr, 50) * 1000:>10.0f}{_pct(ttfr, 95) * 1000:>10.0f}{_pct(ttfr, 99) * 1000:>10.0f}"
+            f"{_pct(lag, 99) * 1000:>10.1f}{max(lag, default=0.0) * 1000:>10.1f}"
+            f"{statistics.fmean(it.sends + it.edits for it in interactions):>8.1f}")
+
+
+async def _run(args: argparse.Namespace) -> None:
+    standin = SteamStandIn(standin_config(args))
+    base_url = await standin.start()
+    http = HttpClient(
+        user_agent="bench-load",
+        rate_limits=RateLimitConfig(rate_per_second=args.rate_per_second, burst=int(args.rate_per_second) * 2),
+        response_cache=ResponseCache(),
+    )
+    parser = ParseOffloader(args.parse_offload, min_bytes=0)
+    print(f"mode={args.mode} streaming={not args.no_streaming} parse={args.parse_offload} limits={args.limits} "
+          f"min_fetch={args.min_fetch_limit} "
+          f"steam={args.latency_ms:.0f}±{args.latency_jitter_ms:.0f}ms discord={args.discord_latency_ms:.0f}ms "
+          f"ramp={args.ramp_seconds}s")
+    print(f"{'users':>6}{'wall s':>8}{'miss':>7}{'errors':>7}{'defer p99':>10}"
+          f"{'ttfr p50':>10}{'ttfr p95':>10}{'ttfr p99':>10}{'lag p99':>10}{'lag max':>10}{'calls':>8}")
+    try:
+        for users in (int(x) for x in args.levels.split(",")):
+            standin.reset_counters()
+            print(await _run_level(args, base_url, http, parser, users), f" steam_requests={sum(standin.requests.values())}")
+    finally:
+        await parser.close()
+        await http.close()
+        await standin.stop()
+    print("(times in ms unless noted; calls = Discord sends + edits per interaction)")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--levels", default="1,10,50,200", help="comma-separated concurrent user counts")
+    ap.add_argument("--limits", default="10", help="comma-separated limits users pick from")
+    ap.add_argument("--min-fetch-limit", type=int, default=20,
+                    help="use-case superset fetch size (0 = fetch exactly the requested limit)")
+    ap.add_argument("--mode", choices=("appdetails", "search"), default="appdetails")
+    ap.add_argument("--no-streaming", action="store_true")
+    ap.add_argument("--parse-offload", choices=(MODE_INLINE, MODE_THREAD, MODE_PROCESS), default=MODE_INLINE)
+    ap.add_argument("--ramp-seconds", type=float, default=0.0, help="spread arrivals over this window")
+    ap.add_argument("--discord-latency-ms", type=float, default=60.0)
+    ap.add_argument("--rate-per-second", type=float, default=50.0, help="HttpClient per-host rate")
+    add_standin_args(ap)
+    asyncio.run(_run(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Name-index benchmark: build time, memory and autocomplete lookup latency.
+
+    python -m benchmarks.bench_name_index               # 100k synthetic names
+    python -m benchmarks.bench_name_index --names 20000 -n 5000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+
+from src.bot.domain.models import Deal
+from src.bot.infrastructure.name_index import NameIndex
+
+_WORDS = ("hollow knight ori will wisps dead cells blasphemous axiom verge bloodstained ritual night salt "
+          "sanctuary guacamelee metroid dread castlevania symphony moon shadow iron lantern ender lilies "
+          "grime prince persia lost crown tunic rain world cave story la mulana afterimage nine sols "
+          "chronicles legacy remastered deluxe edition director cut origins souls steel dragon sky").split()
+
+
+def synthetic_names(n: int, seed: int = 1) -> list[str]:
+    rng = random.Random(seed)
+    names = []
+    for i in range(n):
+        words = rng.sample(_WORDS, rng.randint(1, 4))
+        suffix = f" {rng.randint(2, 9)}" if rng.random() < 0.2 else ""
+        names.append(" ".join(w.capitalize() for w in words) + suffix + f" {i}" * (rng.random() < 0.5))
+    return names
+
+
+def _queries(names: list[str], n: int, seed: int = 2) -> list[str]:
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        name = rng.choice(names).lower()
+        kind = rng.random()
+        if kind < 0.5:  # đang gõ từ đầu tên
+            out.append(name[: rng.randint(1, min(len(name), 12))])
+        elif kind < 0.8:  # gõ một từ ở giữa
+            word = rng.choice(name.split())
+            out.append(word[: rng.randint(1, len(word))])
+        else:  # chuỗi con bất kỳ
+            start = rng.randrange(max(1, len(name) - 3))
+            out.append(name[start:start + rng.randint(3, 8)])
+    return out
+
+
+def _pct(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--names", type=int, default=100_000)
+    ap.add_argument("-n", "--queries", type=int, default=20_000)
+    ap.add_argument("--limit", type=int, default=25, help="results per lookup (Discord allows 25 choices)")
+    args = ap.parse_args()
+
+    names = synthetic_names(args.names)
+    deals = [Deal.create(i + 1, name, 50, "100.000₫", "200.000₫") for i, name in enumerate(names)]
+
+    t0 = time.perf_counter()
+    index = NameIndex()
+    index.add_many(deals)
+    build = time.perf_counter() - t0
+
+    # Đo bộ nhớ bằng một lần build riêng: tracemalloc làm build chậm đi vài lần
+    tracemalloc.start()
+    probe = NameIndex()
+    probe.add_many(deals)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del probe
+
+    # Incremental: 1000 tên mới, từng deal một như khi fetch
+    extra = [Deal.create(args.names + i + 1, f"New Release {i}", 30, "") for i in range(1000)]
+    t0 = time.perf_counter()
+    for d in extra:
+        index.add_many([d])
+    incremental = (time.perf_counter() - t0) / len(extra)
+
+    queries = _queries(names, args.queries)
+    timings: list[float] = []
+    hits = 0
+    for q in queries:
+        t0 = time.perf_counter()
+        found = index.search(q, limit=args.limit)
+        timings.append(time.perf_counter() - t0)
+        hits += bool(found)
+
+    print(f"names={args.names:,} queries={len(queries):,} limit={args.limit} stats={index.stats()}")
+    print(f"build            {build:.2f}s  index memory≈{memory / 2**20:.1f} MiB (Deal objects excluded)")
+    print(f"incremental add  {incremental * 1e6:.0f} µs/name")
+    print(f"lookup µs        p50={_pct(timings, 50) * 1e6:.0f} p95={_pct(timings, 95) * 1e6:.0f} "
+          f"p99={_pct(timings, 99) * 1e6:.0f} max={max(timings) * 1e6:.0f} mean={statistics.fmean(timings) * 1e6:.0f}")
+    print(f"queries with results: {hits / len(queries):.1%}")
+
+
+if __name__ == "__main__":
+    main()
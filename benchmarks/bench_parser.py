@@ -0,0 +1,74 @@
+"""
+Search-page parser benchmark: single-pass tokenizer vs BeautifulSoup.
+
+    python -m benchmarks.bench_parser                   # synthetic pages
+    python -m benchmarks.bench_parser --pages rec/ -n 50  # recorded pages
+    python -m benchmarks.bench_parser --pages benchmarks/pages  # sample page, current markup
+    python -m benchmarks.bench_parser --markup legacy   # pre-discount_block row markup
+"""
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+from typing import Callable
+
+from benchmarks.fixtures import MARKUPS, load_pages, synthetic_results_html
+from src.bot.adapters.outbound import steam_parser
+
+
+def _bench(fn: Callable[[str], list], pages: list[str], repeat: int) -> tuple[float, int]:
+    rows = 0
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            rows += len(fn(html))
+    return rows / (time.perf_counter() - t0), rows // repeat
+
+
+def _allocations(fn: Callable[[str], list], pages: list[str]) -> tuple[int, int]:
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        for html in pages:
+            fn(html)
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(s.count_diff for s in after.compare_to(before, "filename") if s.count_diff > 0)
+    return peak, blocks
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--pages", help="directory of recorded search pages (*.json or *.html)")
+    ap.add_argument("--rows", type=int, default=80, help="rows per synthetic page")
+    ap.add_argument("--synthetic", type=int, default=10, help="number of synthetic pages")
+    ap.add_argument("--markup", choices=MARKUPS, default="current", help="synthetic row markup")
+    ap.add_argument("-n", "--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    if args.pages:
+        pages = load_pages(args.pages)
+    else:
+        pages = [synthetic_results_html(args.rows, 100_000 + i * args.rows, args.markup) for i in range(args.synthetic)]
+
+    fast = steam_parser._parse_rows_fast
+    bs4 = steam_parser._parse_rows_bs4
+    if fast(pages[0]) != bs4(pages[0]):
+        raise SystemExit("parsers disagree on the first page")
+
+    print(f"pages={len(pages)} bytes={sum(len(p.encode()) for p in pages)} repeat={args.repeat}")
+    print(f"{'parser':<14}{'rows/page':>10}{'rows/sec':>12}{'peak KiB':>10}{'blocks':>10}")
+    results = {}
+    for label, fn in (("beautifulsoup", bs4), ("single-pass", fast)):
+        rate, rows = _bench(fn, pages, args.repeat)
+        peak, blocks = _allocations(fn, pages)
+        results[label] = rate
+        print(f"{label:<14}{rows / len(pages):>10.1f}{rate:>12,.0f}{peak / 1024:>10,.0f}{blocks:>10,}")
+    print(f"speedup: {results['single-pass'] / results['beautifulsoup']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
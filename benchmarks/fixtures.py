@@ -0,0 +1,172 @@
+"""
+Steam search pages and appdetails payloads for benchmarks.
+
+Recorded pages (the raw JSON body of /search/results/ or a bare results_html
+file) can be dropped into a directory and loaded with `load_pages`. Without
+recordings, `synthetic_page` / `synthetic_appdetails_node` generate data with
+the same shape as the live store so the numbers stay comparable.
+
+Search rows come in two markups: "current" (Steam's `discount_block` with
+`data-discount` / `data-price-final`, the default) and "legacy"
+(`div.search_discount span` + `div.search_price`). `benchmarks/pages/`
+holds a sample page in the current markup for `load_pages`.
+"""
+from __future__ import annotations
+
+import json
+import os
+
+MARKUPS = ("current", "legacy")
+
+_ROW = """<a href="https://store.steampowered.com/app/{appid}/Game_{appid}/?snr=1_7_7_2300_150_1" data-ds-appid="{appid}" data-ds-itemkey="App_{appid}" data-ds-tagids="[{tags}]" data-ds-descids="[]" data-ds-crtrids="[33273264]" onmouseover="GameHover( this, event, 'global_hover', {{&quot;type&quot;:&quot;app&quot;,&quot;id&quot;:{appid}}} );" onmouseout="HideGameHover( this, event, 'global_hover' )" class="search_result_row ds_collapse_flag " data-search-page="1">
+    <div class="col search_capsule"><img src="https://shared.akamai.steamstatic.com/store_item_assets/steam/apps/{appid}/capsule_sm_120.jpg?t=1700000000" srcset="https://shared.akamai.steamstatic.com/store_item_assets/steam/apps/{appid}/capsule_sm_120.jpg?t=1700000000 1x, https://shared.akamai.steamstatic.com/store_item_assets/steam/apps/{appid}/capsule_231x87.jpg?t=1700000000 2x"></div>
+    <div class="responsive_search_name_combined">
+        <div class="col search_name ellipsis">
+            <span class="title">{name}</span>
+            <div><span class="platform_img win"></span><span class="platform_img mac"></span></div>
+        </div>
+        <div class="col search_released responsive_secondrow">24 Feb, 2017</div>
+        <div class="col search_reviewscore responsive_secondrow">
+            <span class="search_review_summary positive" data-tooltip-html="Very Positive&lt;br&gt;97% of the 300,000 user reviews for this game are positive."></span>
+        </div>
+        <div class="col search_price_discount_combined responsive_secondrow" data-price-final="{final_minor}">
+            <div class="col search_discount responsive_secondrow">{discount_html}</div>
+            <div class="col search_price {price_class} responsive_secondrow">{price_html}</div>
+        </div>
+    </div>
+    <div style="clear: left;"></div>
+</a>"""
+
+_ROW_CURRENT = """<a href="https://store.steampowered.com/app/{appid}/Game_{appid}/?snr=1_7_7_2300_150_1" data-ds-appid="{appid}" data-ds-itemkey="App_{appid}" data-ds-tagids="[{tags}]" data-ds-descids="[]" data-ds-crtrids="[33273264]" onmouseover="GameHover( this, event, 'global_hover', {{&quot;type&quot;:&quot;app&quot;,&quot;id&quot;:{appid}}} );" onmouseout="HideGameHover( this, event, 'global_hover' )" class="search_result_row ds_collapse_flag " data-search-page="1">
+    <div class="col search_capsule"><img src="https://shared.akamai.steamstatic.com/store_item_assets/steam/apps/{appid}/capsule_sm_120.jpg?t=1700000000" srcset="https://shared.akamai.steamstatic.com/store_item_assets/steam/apps/{appid}/capsule_sm_120.jpg?t=1700000000 1x, https://shared.akamai.steamstatic.com/store_item_assets/steam/apps/{appid}/capsule_231x87.jpg?t=1700000000 2x"></div>
+    <div class="responsive_search_name_combined">
+        <div class="col search_name ellipsis">
+            <span class="title">{name}</span>
+            <div><span class="platform_img win"></span><span class="platform_img mac"></span></div>
+        </div>
+        <div class="col search_released responsive_secondrow">24 Feb, 2017</div>
+        <div class="col search_reviewscore responsive_secondrow">
+            <span class="search_review_summary positive" data-tooltip-html="Very Positive&lt;br&gt;97% of the 300,000 user reviews for this game are positive."></span>
+        </div>
+        <div class="col search_price_discount_combined responsive_secondrow" data-price-final="{final_minor}">
+            <div class="search_discount_and_price responsive_secondrow">
+                <div class="discount_block search_discount_block{block_class}" data-price-final="{final_minor}" data-bundlediscount="0" data-discount="{discount}" role="link" aria-label="{aria}">{pct_html}<div class="discount_prices">{prices_html}</div></div>
+            </div>
+        </div>
+    </div>
+    <div style="clear: left;"></div>
+</a>"""
+
+_NAMES = ["Hollow Knight", "Ori &amp; the Will of the Wisps", "Dead Cells", "Blasphemous",
+          "Axiom Verge", "Bloodstained: Ritual of the Night", "Salt and Sanctuary", "Guacamelee! 2"]
+
+
+def _format_vnd(amount: int) -> str:
+    return f"{amount:,}₫".replace(",", ".")
+
+
+def _discount(appid: int) -> int:
+    d = (appid * 37) % 95
+    return d if d >= 10 else 0
+
+
+def _original_price(appid: int) -> int:
+    return 50_000 + (appid * 7919) % 400_000
+
+
+def _name(appid: int) -> str:
+    return f"{_NAMES[appid % len(_NAMES)]} {appid}".replace("&amp;", "&")
+
+
+def _current_row(appid: int, name: str, tags: str, discount: int, original: int) -> str:
+    if not discount:
+        return _ROW_CURRENT.format(
+            appid=appid, tags=tags, name=name, final_minor=original * 100, discount=0, block_class=" no_discount",
+            aria=_format_vnd(original), pct_html="",
+            prices_html=f'<div class="discount_final_price">{_format_vnd(original)}</div>',
+        )
+    final = original * (100 - discount) // 100
+    return _ROW_CURRENT.format(
+        appid=appid, tags=tags, name=name, final_minor=final * 100, discount=discount, block_class="",
+        aria=f"{discount}% off. {_format_vnd(original)} normally, discounted to {_format_vnd(final)}",
+        pct_html=f'<div class="discount_pct">-{discount}%</div>',
+        prices_html=(f'<div class="discount_original_price">{_format_vnd(original)}</div>'
+                     f'<div class="discount_final_price">{_format_vnd(final)}</div>'),
+    )
+
+
+def synthetic_row(appid: int, markup: str = "current") -> str:
+    discount = _discount(appid)
+    original = _original_price(appid)
+    name = f"{_NAMES[appid % len(_NAMES)]} {appid}"
+    tags = ",".join(str(t) for t in (1628, 19, 492 + appid % 5))
+    if markup == "current":
+        return _current_row(appid, name, tags, discount, original)
+    if not discount:
+        return _ROW.format(appid=appid, tags=tags, name=name, final_minor=original * 100,
+                           discount_html="", price_class="", price_html=_format_vnd(original))
+    final = original * (100 - discount) // 100
+    price_html = f'<span style="color: #888888;"><strike>{_format_vnd(original)}</strike></span><br>{_format_vnd(final)}'
+    return _ROW.format(appid=appid, tags=tags, name=name, final_minor=final * 100,
+                       discount_html=f"<span>-{discount}%</span>", price_class="discounted", price_html=price_html)
+
+
+def synthetic_results_html(rows: int = 80, start_appid: int = 100_000, markup: str = "current") -> str:
+    return "\n".join(synthetic_row(a, markup) for a in range(start_appid, start_appid + rows))
+
+
+def synthetic_page(rows: int = 80, start_appid: int = 100_000, total_count: int = 1000, markup: str = "current") -> str:
+    """Raw JSON body as returned by /search/results/?infinite=1."""
+    return json.dumps({
+        "success": 1,
+        "results_html": synthetic_results_html(rows, start_appid, markup),
+        "total_count": total_count,
+        "start": 0,
+    })
+
+
+def synthetic_appdetails_node(appid: int, *, price_only: bool = False) -> dict:
+    """One appdetails entry, consistent with `synthetic_row` for the same appid."""
+    if appid % 17 == 0:
+        # free / không bán: Steam trả data = []
+        return {"success": True, "data": []}
+    original = _original_price(appid)
+    discount = _discount(appid)
+    final = original * (100 - discount) // 100
+    price = {
+        "currency": "VND",
+        "initial": original * 100,
+        "final": final * 100,
+        "discount_percent": discount,
+        "initial_formatted": _format_vnd(original) if discount else "",
+        "final_formatted": _format_vnd(final),
+    }
+    if price_only:
+        return {"success": True, "data": {"price_overview": price}}
+    return {
+        "success": True,
+        "data": {
+            "type": "game",
+            "name": _name(appid),
+            "steam_appid": appid,
+            "short_description": "A synthetic game used for benchmarks. " * 8,
+            "detailed_description": "<p>" + "Lorem ipsum dolor sit amet. " * 150 + "</p>",
+            "header_image": f"https://shared.akamai.steamstatic.com/store_item_assets/steam/apps/{appid}/header.jpg?t=1700000000",
+            "price_overview": price,
+            "genres": [{"id": "1", "description": "Action"}, {"id": "25", "description": "Adventure"}],
+        },
+    }
+
+
+def load_pages(directory: str) -> list[str]:
+    """Return results_html strings from recorded *.json / *.html files."""
+    pages: list[str] = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        with open(path, encoding="utf-8") as f:
+            raw = f.read()
+        if name.endswith(".json"):
+            pages.append(json.loads(raw).get("results_html", "") or "")
+        elif name.endswith(".html"):
+            pages.append(raw)
+    return pages
@@ -0,0 +1,198 @@
+"""
+Local Steam store stand-in for offline benchmarks.
+
+Serves /search/results/ and /api/appdetails from recordings or synthetic
+fixtures, with injectable latency, 5xx errors and 429 throttling:
+
+    python -m benchmarks.steam_standin --port 8089 --latency-ms 80 --throttle-rate 0.05
+    STEAM_STORE_BASE_URL=http://127.0.0.1:8089 python -m src.bot.main
+
+Recordings layout (all optional):
+    DIR/search/*.json          raw search bodies, served in name order by page
+    DIR/appdetails/<appid>.json  the {"success": ..., "data": ...} node of one app
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+
+from aiohttp import web
+
+from benchmarks.fixtures import synthetic_appdetails_node, synthetic_page
+
+
+@dataclass
+class StandInConfig:
+    latency_ms: float = 0.0
+    latency_jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after_seconds: int = 1
+    total_results: int = 1000
+    recordings: Optional[str] = None
+    etags: bool = True
+    seed: int = 1
+
+
+class SteamStandIn:
+    def __init__(self, cfg: Optional[StandInConfig] = None, *, host: str = "127.0.0.1", port: int = 0):
+        self.cfg = cfg or StandInConfig()
+        self._host = host
+        self._port = port
+        self._rng = random.Random(self.cfg.seed)
+        self._runner: Optional[web.AppRunner] = None
+        self.requests: Counter[str] = Counter()
+        self.bytes_sent = 0
+
+        self._search_pages: list[bytes] = []
+        self._recorded_apps: dict[int, dict] = {}
+        if self.cfg.recordings:
+            self._load_recordings(self.cfg.recordings)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self._host}:{self._port}"
+
+    def reset_counters(self) -> None:
+        self.requests.clear()
+        self.bytes_sent = 0
+
+    def _load_recordings(self, root: str) -> None:
+        search_dir = os.path.join(root, "search")
+        if os.path.isdir(search_dir):
+            for name in sorted(os.listdir(search_dir)):
+                if name.endswith(".json"):
+                    with open(os.path.join(search_dir, name), "rb") as f:
+                        self._search_pages.append(f.read())
+        apps_dir = os.path.join(root, "appdetails")
+        if os.path.isdir(apps_dir):
+            for name in os.listdir(apps_dir):
+                stem = name.removesuffix(".json")
+                if stem.isdigit():
+                    with open(os.path.join(apps_dir, name), encoding="utf-8") as f:
+                        self._recorded_apps[int(stem)] = json.load(f)
+
+    async def _misbehave(self, endpoint: str) -> Optional[web.Response]:
+        self.requests[endpoint] += 1
+        cfg = self.cfg
+        if cfg.latency_ms or cfg.latency_jitter_ms:
+            delay = cfg.latency_ms + self._rng.uniform(-cfg.latency_jitter_ms, cfg.latency_jitter_ms)
+            await asyncio.sleep(max(0.0, delay) / 1000)
+        roll = self._rng.random()
+        if roll < cfg.throttle_rate:
+            self.requests[endpoint + ":429"] += 1
+            return web.Response(status=429, headers={"Retry-After": str(cfg.retry_after_seconds)})
+        if roll < cfg.throttle_rate + cfg.error_rate:
+            self.requests[endpoint + ":5xx"] += 1
+            return web.Response(status=503, text="Service Unavailable")
+        return None
+
+    def _reply(self, request: web.Request, body: bytes) -> web.Response:
+        headers = {}
+        if self.cfg.etags:
+            etag = f'"{zlib.crc32(body):08x}"'
+            if request.headers.get("If-None-Match") == etag:
+                self.requests["not_modified"] += 1
+                return web.Response(status=304, headers={"ETag": etag})
+            headers["ETag"] = etag
+        self.bytes_sent += len(body)
+        return web.Response(body=body, content_type="application/json", charset="utf-8", headers=headers)
+
+    async def _search(self, request: web.Request) -> web.Response:
+        if (err := await self._misbehave("search")) is not None:
+            return err
+        start = int(request.query.get("start", "0"))
+        count = int(request.query.get("count", "50"))
+        if self._search_pages:
+            idx = start // count
+            body = self._search_pages[idx] if idx < len(self._search_pages) else json.dumps(
+                {"success": 1, "results_html": "", "total_count": start}).encode()
+        else:
+            rows = max(0, min(count, self.cfg.total_results - start))
+            body = synthetic_page(rows, 100_000 + start, total_count=self.cfg.total_results).encode()
+        return self._reply(request, body)
+
+    async def _appdetails(self, request: web.Request) -> web.Response:
+        if (err := await self._misbehave("appdetails")) is not None:
+            return err
+        appids = [int(a) for a in request.query.get("appids", "").split(",") if a.strip().isdigit()]
+        price_only = request.query.get("filters") == "price_overview"
+        if len(appids) > 1 and not price_only:
+            # Steam chỉ chấp nhận nhiều appid khi filters=price_overview
+            return self._reply(request, b"null")
+
+        out = {}
+        for appid in appids:
+            node = self._recorded_apps.get(appid) or synthetic_appdetails_node(appid, price_only=price_only)
+            if price_only and isinstance(node.get("data"), dict):
+                node = {"success": node["success"], "data": {"price_overview": node["data"].get("price_overview")}}
+            out[str(appid)] = node
+        return self._reply(request, json.dumps(out).encode())
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_get("/search/results/", self._search)
+        app.router.add_get("/api/appdetails", self._appdetails)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self._host, self._port)
+        await site.start()
+        self._port = site._server.sockets[0].getsockname()[1]  # port=0 -> cổng ngẫu nhiên
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def add_standin_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--latency-ms", type=float, default=50.0)
+    ap.add_argument("--latency-jitter-ms", type=float, default=30.0)
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    ap.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    ap.add_argument("--retry-after", type=int, default=1)
+    ap.add_argument("--no-etags", action="store_true", help="do not send ETag / answer 304")
+    ap.add_argument("--recordings", help="directory with recorded search/appdetails responses")
+
+
+def standin_config(args: argparse.Namespace) -> StandInConfig:
+    return StandInConfig(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after_seconds=args.retry_after,
+        recordings=args.recordings,
+        etags=not args.no_etags,
+    )
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    standin = SteamStandIn(standin_config(args), port=args.port)
+    print(f"Steam stand-in listening on {await standin.start()}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await standin.stop()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--port", type=int, default=8089)
+    add_standin_args(ap)
+    try:
+        asyncio.run(_serve(ap.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
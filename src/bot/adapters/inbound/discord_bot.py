@@ -14,8 +14,18 @@ class DiscordBot(discord.Client):
         super().__init__(intents=intents)
         self.tree = app_commands.CommandTree(self)
         self.deals_scheduler = None  # gán từ main.py
+        self.metrics_server = None
+        self.loop_monitor = None
+        self.profiler = None
+        self.catalog = None
 
     async def setup_hook(self):
+        if self.loop_monitor is not None:
+            self.loop_monitor.start()
+        # kill -USR1 <pid> -> profile PROFILE_DEFAULT_SECONDS, kết quả ghi log + file
+        if self.profiler is not None and self.profiler.install_signal_handler():
+            log.info("SIGUSR1 starts an on-demand profile")
+
         guild_id = os.getenv("DISCORD_GUILD_ID", "").strip()
 
         if guild_id:
@@ -27,18 +37,31 @@ class DiscordBot(discord.Client):
             synced = await self.tree.sync()
             log.info("Synced %d global commands", len(synced))
 
+        if self.metrics_server is not None:
+            try:
+                await self.metrics_server.start()
+            except OSError as e:
+                log.warning("Metrics endpoint not started: %s", e)
+
+        # Crawl catalog nền cho /deals_tag
+        if self.catalog is not None:
+            self.catalog.start()
+
         # Start scheduler (nếu có)
         if self.deals_scheduler is not None:
             self.deals_scheduler.start(self)
 
     async def close(self):
-        # close http session if exists
-        http = getattr(self, "http_client", None)
-        if http is not None:
-            try:
-                await http.close()
-            except Exception:
-                pass
+        # close background refresher / http session / caches if exists
+        for name in ("deals_uc", "http_client", "cache", "appdetails_store", "metrics_server",
+                     "loop_monitor", "parse_offloader", "profiler", "deals_scheduler", "price_history",
+                     "catalog"):
+            res = getattr(self, name, None)
+            if res is not None:
+                try:
+                    await res.close()
+                except Exception:
+                    pass
         await super().close()
 
     async def on_ready(self):
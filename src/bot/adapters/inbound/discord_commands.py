@@ -1,21 +1,61 @@
 from __future__ import annotations
 
+import functools
+import time
+from typing import AsyncIterator, Callable, Mapping, Optional
+
 import discord
 from discord import app_commands
 
 from src.bot.application.ports import DealsQuery
 from src.bot.application.use_cases import GetDealsUseCase
+from src.bot.domain.models import Deal, parse_country_code
+from src.bot.domain.prices import parse_price_minor
+from src.bot.infrastructure import metrics
+from src.bot.infrastructure.catalog import CatalogIndexer
 from src.bot.infrastructure.logger import get_logger
+from src.bot.infrastructure.name_index import NameIndex
+from src.bot.infrastructure.price_history import PriceHistoryStore
+from src.bot.infrastructure.profiler import SORT_KEYS, OnDemandProfiler, ProfilerBusyError
+from src.bot.infrastructure.subscriptions import Subscription, SubscriptionRegistry, parse_slot, slot_label
 
 log = get_logger(__name__)
 
+DISCORD_SEND_SECONDS = metrics.histogram("discord_send_seconds", "Discord message send/edit latency", ("op",))
+COMMANDS = metrics.counter("bot_commands_total", "Slash command invocations by outcome", ("command", "outcome"))
+AUTOCOMPLETE_SECONDS = metrics.histogram("discord_autocomplete_seconds", "Autocomplete lookup time", ("command",))
+
 MAX_EMBEDS_PER_MESSAGE = 10
+# Discord rate-limit edit message khá chặt -> gom edit tối đa 1 lần / khoảng này
+STREAM_EDIT_INTERVAL_SECONDS = 1.0
+
+DealNote = Callable[[Deal], Optional[str]]
 
 def chunk_list(items, size):
     for i in range(0, len(items), size):
         yield items[i:i+size]
 
-def build_deal_embed(deal) -> discord.Embed:
+def _fmt_day(ts: int) -> str:
+    return time.strftime("%d/%m/%Y", time.localtime(ts))
+
+def price_history_note(history: Optional[PriceHistoryStore], cc: str) -> Optional[DealNote]:
+    """Embed note from the bot's own price history ("historical low" = lowest price the bot has seen)."""
+    if history is None:
+        return None
+
+    def note(deal: Deal) -> Optional[str]:
+        st = history.get(cc, deal.appid)
+        price = deal.final_minor if deal.final_minor is not None else parse_price_minor(deal.price_final)
+        if st is None or price is None:
+            return None
+        if price <= st.low:
+            # Mới thấy lần đầu thì chưa có gì để so
+            return "📉 Thấp nhất từng ghi nhận" if st.first_at < st.since else None
+        return f"Thấp nhất từng ghi nhận: -{st.low_discount}% ({_fmt_day(st.low_at)})"
+
+    return note
+
+def build_deal_embed(deal, note: Optional[str] = None) -> discord.Embed:
     embed = discord.Embed(
         title=f"{deal.name} (-{deal.discount_pct}%)",
         url=deal.url,
@@ -31,27 +71,95 @@ def build_deal_embed(deal) -> discord.Embed:
         embed.add_field(name="Giá gốc", value=deal.price_original, inline=True)
     embed.add_field(name="Giá giảm", value=deal.price_final or "N/A", inline=True)
     embed.add_field(name="% giảm", value=f"{deal.discount_pct}%", inline=True)
+    if note:
+        embed.add_field(name="Lịch sử giá", value=note, inline=False)
 
     return embed
 
-async def send_deals_embeds(send_func, deals):
+def _embed(deal: Deal, note: Optional[DealNote]) -> discord.Embed:
+    return build_deal_embed(deal, note(deal) if note else None)
+
+async def send_deals_embeds(send_func, deals, note: Optional[DealNote] = None):
     # Discord giới hạn 10 embeds / message → chia chunk
     for chunk in chunk_list(deals, MAX_EMBEDS_PER_MESSAGE):
-        embeds = [build_deal_embed(d) for d in chunk]
-        await send_func(embeds=embeds)
+        embeds = [_embed(d, note) for d in chunk]
+        with DISCORD_SEND_SECONDS.time(op="send"), metrics.span("discord.send"):
+            await send_func(embeds=embeds)
+
+async def stream_deals_embeds(send_func, deals: AsyncIterator[Deal], limit: int,
+                              *, edit_interval: float = STREAM_EDIT_INTERVAL_SECONDS,
+                              note: Optional[DealNote] = None) -> list[Deal]:
+    """
+    Post deals while they arrive: the first `limit` arrivals fill messages of
+    MAX_EMBEDS_PER_MESSAGE embeds (new message per chunk, throttled edits
+    while a chunk fills). When the stream ends, a closing edit puts the
+    messages in final discount order. `send_func` must return the sent
+    message (use `wait=True` for webhooks). Returns the ranked deals.
+    """
+    started = time.perf_counter()
+    first_embed_at: float | None = None
+
+    arrived: list[Deal] = []
+    shown: list[Deal] = []
+    messages: list = []
+    displayed: list[list[Deal]] = []  # deals đang hiển thị trên từng message
+    last_edit = 0.0
+
+    async def render(idx: int, chunk: list[Deal]) -> None:
+        embeds = [_embed(d, note) for d in chunk]
+        if idx < len(messages):
+            with DISCORD_SEND_SECONDS.time(op="edit"), metrics.span("discord.edit"):
+                await messages[idx].edit(embeds=embeds)
+            displayed[idx] = list(chunk)
+        else:
+            with DISCORD_SEND_SECONDS.time(op="send"), metrics.span("discord.send"):
+                messages.append(await send_func(embeds=embeds))
+            displayed.append(list(chunk))
+
+    async for d in deals:
+        if d.discount_pct <= 0:
+            continue
+        arrived.append(d)
+        if len(shown) >= limit:
+            continue
+        shown.append(d)
+
+        idx = (len(shown) - 1) // MAX_EMBEDS_PER_MESSAGE
+        chunk = shown[idx * MAX_EMBEDS_PER_MESSAGE:(idx + 1) * MAX_EMBEDS_PER_MESSAGE]
+        now = time.perf_counter()
+        chunk_done = len(chunk) == MAX_EMBEDS_PER_MESSAGE or len(shown) == limit
+        if idx >= len(messages) or chunk_done or now - last_edit >= edit_interval:
+            await render(idx, chunk)
+            last_edit = now
+            if first_embed_at is None:
+                first_embed_at = now - started
+
+    # Closing edit: thứ tự cuối cùng theo % giảm
+    final = sorted(arrived, key=lambda d: d.discount_pct, reverse=True)[:limit]
+    for idx, chunk in enumerate(chunk_list(final, MAX_EMBEDS_PER_MESSAGE)):
+        if idx >= len(displayed) or displayed[idx] != chunk:
+            await render(idx, chunk)
+
+    log.info("Streamed %d deals messages=%d first_embed=%s total=%.2fs",
+             len(final), len(messages),
+             f"{first_embed_at:.2f}s" if first_embed_at is not None else "n/a",
+             time.perf_counter() - started)
+    return final
 
 def register_commands(tree: app_commands.CommandTree, uc: GetDealsUseCase,
-                      steam_cc: str, steam_lang: str, tag_metroidvania: int, default_limit: int):
+                      steam_cc: str, steam_lang: str, tag_metroidvania: int, default_limit: int,
+                      streaming: bool = False, price_history: Optional[PriceHistoryStore] = None):
+    note = price_history_note(price_history, steam_cc)
 
-    @tree.command(name="deals_metroidvania", description="Lấy game Metroidvania đang giảm giá trên Steam")
-    @app_commands.describe(limit="Số lượng deal (1-20)")
-    async def deals_metroidvania(interaction: discord.Interaction, limit: int = default_limit):
+    async def run_deals(interaction: discord.Interaction, limit: int) -> str:
         limit = max(1, min(limit, 20))
 
         log.info("Command /deals_metroidvania user=%s guild=%s limit=%s",
                  interaction.user, getattr(interaction.guild, "id", None), limit)
 
         await interaction.response.defer(thinking=True)
+        if price_history is not None:
+            await price_history.load(steam_cc)  # note() chỉ tra dict, không đọc file trên event loop
 
         q = DealsQuery(
             tag_ids=[tag_metroidvania],
@@ -61,12 +169,28 @@ def register_commands(tree: app_commands.CommandTree, uc: GetDealsUseCase,
             language=steam_lang,
         )
 
+        if streaming:
+            try:
+                send = functools.partial(interaction.followup.send, wait=True)
+                deals = await stream_deals_embeds(send, uc.stream(q), limit, note=note)
+            except Exception as e:
+                log.exception("Fetch deals failed: %s", e)
+                await interaction.followup.send(f"Lỗi fetch: `{type(e).__name__}: {e}`")
+                return "error"
+
+            if not deals:
+                log.warning("No deals returned for query=%s", q)
+                await interaction.followup.send("Không thấy deal nào (hoặc Steam đổi format).")
+                return "empty"
+            log.info("Returned %d deals", len(deals))
+            return "ok"
+
         try:
             deals = list(await uc.execute(q))
         except Exception as e:
             log.exception("Fetch deals failed: %s", e)
             await interaction.followup.send(f"Lỗi fetch: `{type(e).__name__}: {e}`")
-            return
+            return "error"
 
         # Đảm bảo: không 0% và sort
         deals = [d for d in deals if d.discount_pct > 0]
@@ -75,8 +199,264 @@ def register_commands(tree: app_commands.CommandTree, uc: GetDealsUseCase,
         if not deals:
             log.warning("No deals returned for query=%s", q)
             await interaction.followup.send("Không thấy deal nào (hoặc Steam đổi format).")
-            return
+            return "empty"
 
         log.info("Returned %d deals", len(deals))
 
-        await send_deals_embeds(interaction.followup.send, deals)
+        await send_deals_embeds(interaction.followup.send, deals, note=note)
+        return "ok"
+
+    @tree.command(name="deals_metroidvania", description="Lấy game Metroidvania đang giảm giá trên Steam")
+    @app_commands.describe(limit="Số lượng deal (1-20)")
+    async def deals_metroidvania(interaction: discord.Interaction, limit: int = default_limit):
+        # Trace theo từng lệnh: lệnh chậm được log chi tiết từng stage
+        with metrics.trace("cmd.deals_metroidvania"):
+            outcome = await run_deals(interaction, limit)
+        COMMANDS.inc(command="deals_metroidvania", outcome=outcome)
+
+    if price_history is None:
+        return
+
+    @tree.command(name="deal_price", description="Xem giá gần nhất và giá thấp nhất bot từng ghi nhận của một game")
+    @app_commands.describe(appid="Steam appid", cc="Mã vùng Steam (mặc định: vùng của bot)")
+    async def deal_price(interaction: discord.Interaction, appid: int, cc: Optional[str] = None):
+        # cc là text tự do: chỉ nhận mã vùng 2 chữ cái, nếu không mỗi giá trị lạ tạo 1 index rỗng + 1 lần tra file
+        try:
+            region = parse_country_code(cc or steam_cc)
+        except ValueError:
+            await interaction.response.send_message(f"Mã vùng không hợp lệ: {cc!r} (cần 2 chữ cái, vd vn, us).",
+                                                    ephemeral=True)
+            COMMANDS.inc(command="deal_price", outcome="invalid")
+            return
+        await price_history.load(region)
+        st = price_history.get(region, appid)
+        if st is None:
+            await interaction.response.send_message(f"Chưa ghi nhận giá nào cho appid {appid} (cc={region}).",
+                                                    ephemeral=True)
+            return
+        low = "đang là giá thấp nhất" if st.price <= st.low else f"-{st.low_discount}% ({_fmt_day(st.low_at)})"
+        await interaction.response.send_message(
+            f"appid {appid} (cc={region}): gần nhất -{st.discount}% ({_fmt_day(st.last_at)}), "
+            f"thấp nhất từng ghi nhận: {low}, theo dõi từ {_fmt_day(st.first_at)}",
+            ephemeral=True,
+        )
+        COMMANDS.inc(command="deal_price", outcome="ok")
+
+
+def register_subscription_commands(tree: app_commands.CommandTree, registry: SubscriptionRegistry, *,
+                                   steam_cc: str, steam_lang: str, tag_metroidvania: int, default_limit: int):
+
+    @tree.command(name="deals_subscribe", description="Đăng ký kênh nhận deal hằng ngày theo khung giờ")
+    @app_commands.describe(
+        time="Giờ post HH:MM (theo SCHEDULE_TZ)",
+        tags="Steam tag id, cách nhau dấu phẩy",
+        cc="Mã vùng Steam (vn, us, ...)",
+        limit="Số lượng deal (1-20)",
+        channel="Kênh nhận (mặc định: kênh hiện tại)",
+    )
+    @app_commands.default_permissions(manage_channels=True)
+    @app_commands.guild_only()
+    async def deals_subscribe(interaction: discord.Interaction, time: str, tags: Optional[str] = None,
+                              cc: Optional[str] = None, limit: int = default_limit,
+                              channel: Optional[discord.TextChannel] = None):
+        try:
+            slot = slot_label(parse_slot(time))
+            tag_ids = tuple(int(t) for t in tags.split(",") if t.strip()) if tags else (tag_metroidvania,)
+            region = parse_country_code(cc or steam_cc)
+        except ValueError:
+            await interaction.response.send_message(
+                "Sai định dạng: time = HH:MM, tags = số, cách nhau dấu phẩy, cc = mã vùng 2 chữ cái (vd vn, us).",
+                ephemeral=True)
+            return
+        target = channel or interaction.channel
+        sub = Subscription(
+            channel_id=target.id,
+            slot=slot,
+            tag_ids=tag_ids or (tag_metroidvania,),
+            country_code=region,
+            language=steam_lang,
+            limit=max(1, min(limit, 20)),
+            guild_id=interaction.guild_id,
+        )
+        added = registry.add(sub)
+        log.info("Subscription %s channel_id=%s slot=%s tags=%s cc=%s",
+                 "added" if added else "exists", sub.channel_id, sub.slot, sub.tag_ids, sub.country_code)
+        await interaction.response.send_message(
+            f"{'Đã đăng ký' if added else 'Đã có sẵn'}: <#{sub.channel_id}> lúc {sub.slot}, "
+            f"tags={','.join(map(str, sub.tag_ids))} cc={sub.country_code} limit={sub.limit}",
+            ephemeral=True,
+        )
+
+    @tree.command(name="deals_unsubscribe", description="Hủy đăng ký deal hằng ngày của một kênh")
+    @app_commands.describe(time="Chỉ hủy khung giờ này (mặc định: tất cả)", channel="Kênh (mặc định: kênh hiện tại)")
+    @app_commands.default_permissions(manage_channels=True)
+    @app_commands.guild_only()
+    async def deals_unsubscribe(interaction: discord.Interaction, time: Optional[str] = None,
+                                channel: Optional[discord.TextChannel] = None):
+        try:
+            slot = slot_label(parse_slot(time)) if time else None
+        except ValueError:
+            await interaction.response.send_message("Sai định dạng time (HH:MM).", ephemeral=True)
+            return
+        target = channel or interaction.channel
+        removed = registry.remove(target.id, slot)
+        await interaction.response.send_message(f"Đã hủy {removed} đăng ký cho <#{target.id}>.", ephemeral=True)
+
+    @tree.command(name="deals_subscriptions", description="Xem các kênh đăng ký deal trong server")
+    @app_commands.guild_only()
+    async def deals_subscriptions(interaction: discord.Interaction):
+        subs = registry.for_guild(interaction.guild_id) if interaction.guild_id else []
+        if not subs:
+            await interaction.response.send_message("Server chưa có đăng ký nào.", ephemeral=True)
+            return
+        lines = [
+            f"<#{s.channel_id}> {s.slot} tags={','.join(map(str, s.tag_ids))} cc={s.country_code} limit={s.limit}"
+            + (" (env)" if registry.is_default(s) else "")
+            for s in sorted(subs, key=lambda s: (s.slot, s.channel_id))
+        ]
+        await interaction.response.send_message("\n".join(lines)[:1900], ephemeral=True)
+
+
+def _fmt_age(seconds: float) -> str:
+    if seconds < 90:
+        return f"{seconds:.0f} giây"
+    if seconds < 90 * 60:
+        return f"{seconds / 60:.0f} phút"
+    return f"{seconds / 3600:.1f} giờ"
+
+
+def register_catalog_commands(tree: app_commands.CommandTree, catalog: CatalogIndexer, *, steam_cc: str,
+                              default_limit: int, price_history: Optional[PriceHistoryStore] = None):
+    note = price_history_note(price_history, steam_cc)
+
+    @tree.command(name="deals_tag", description="Deal theo tag bất kỳ, trả lời từ chỉ mục catalog (không gọi Steam)")
+    @app_commands.describe(tags="Steam tag id, cách nhau dấu phẩy (game phải có đủ mọi tag)",
+                           limit="Số lượng deal (1-20)")
+    async def deals_tag(interaction: discord.Interaction, tags: str, limit: int = default_limit):
+        try:
+            tag_ids = [int(t) for t in tags.split(",") if t.strip()]
+        except ValueError:
+            await interaction.response.send_message("Sai định dạng tags: số, cách nhau dấu phẩy.", ephemeral=True)
+            COMMANDS.inc(command="deals_tag", outcome="error")
+            return
+        snap = catalog.snapshot
+        if snap is None:
+            await interaction.response.send_message("Chỉ mục catalog đang được xây, thử lại sau ít phút.",
+                                                    ephemeral=True)
+            COMMANDS.inc(command="deals_tag", outcome="empty")
+            return
+
+        t0 = time.perf_counter()
+        deals = snap.query(tag_ids, max(1, min(limit, 20)))
+        took_us = (time.perf_counter() - t0) * 1e6
+        log.info("Command /deals_tag tags=%s results=%d lookup=%.0fµs", tag_ids, len(deals), took_us)
+
+        freshness = (f"Chỉ mục {len(snap.deals)} deal ({snap.cc}), cập nhật {_fmt_age(catalog.age_seconds() or 0)} trước"
+                     + ("" if snap.complete else ", chưa đầy đủ"))
+        if not deals:
+            await interaction.response.send_message(f"Không có deal nào có đủ tag {tags}. {freshness}.")
+            COMMANDS.inc(command="deals_tag", outcome="empty")
+            return
+        await interaction.response.send_message(f"Tags {','.join(map(str, tag_ids))}: {freshness}.")
+        await send_deals_embeds(interaction.followup.send, deals, note=note)
+        COMMANDS.inc(command="deals_tag", outcome="ok")
+
+
+def register_search_commands(tree: app_commands.CommandTree, names: NameIndex, *, steam_cc: str,
+                             price_history: Optional[PriceHistoryStore] = None):
+    note = price_history_note(price_history, steam_cc)
+
+    async def name_autocomplete(interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+        # Discord chờ tối đa ~3s mỗi phím gõ: chỉ tra index trong RAM
+        with AUTOCOMPLETE_SECONDS.time(command="deal_search"):
+            deals = names.search(current, limit=25)
+        return [app_commands.Choice(name=f"{d.name} (-{d.discount_pct}%)"[:100], value=str(d.appid)) for d in deals]
+
+    @tree.command(name="deal_search", description="Tìm deal đang giảm giá theo tên game")
+    @app_commands.describe(name="Tên game (gõ để xem gợi ý)")
+    @app_commands.autocomplete(name=name_autocomplete)
+    async def deal_search(interaction: discord.Interaction, name: str):
+        # Chọn từ gợi ý -> value là appid; gõ tự do -> lấy kết quả khớp nhất
+        deal = names.get(int(name)) if name.isdigit() else None
+        if deal is None:
+            hits = names.search(name, limit=1)
+            deal = hits[0] if hits else None
+        if deal is None:
+            await interaction.response.send_message(f"Không thấy deal nào khớp `{name[:80]}`.", ephemeral=True)
+            COMMANDS.inc(command="deal_search", outcome="empty")
+            return
+
+        seen = names.seen_at(deal.appid)
+        content = f"Giá ghi nhận {_fmt_age(max(0.0, time.time() - seen))} trước" if seen else None
+        await interaction.response.send_message(content, embed=build_deal_embed(deal, note(deal) if note else None))
+        COMMANDS.inc(command="deal_search", outcome="ok")
+
+
+def _fmt_seconds(v: float | None) -> str:
+    if v is None:
+        return "-"
+    return ">30s" if v == float("inf") else f"≤{v * 1000:.0f}ms"
+
+
+def format_bot_stats(sources: Mapping[str, object]) -> str:
+    """Plain-text summary for /bot_stats: component stats, latency buckets, slow traces."""
+    lines: list[str] = []
+    for name, src in sources.items():
+        if src is not None and hasattr(src, "stats"):
+            lines.append(f"{name}: {src.stats()}")
+
+    for metric_name, label in (("http_request_seconds", "http"), ("bot_span_seconds", "span")):
+        hist = metrics.REGISTRY.get(metric_name)
+        if not isinstance(hist, metrics.Histogram):
+            continue
+        for key, (count, total) in sorted(hist.summary().items()):
+            labels = dict(zip(hist.labelnames, key))
+            lines.append(
+                f"{label} {' '.join(key)}: n={count} avg={total / count * 1000:.0f}ms "
+                f"p50{_fmt_seconds(hist.quantile(0.5, **labels))} p95{_fmt_seconds(hist.quantile(0.95, **labels))}"
+            )
+
+    if metrics.RECENT_SLOW_TRACES:
+        lines.append("slow traces (latest):")
+        for tr in list(metrics.RECENT_SLOW_TRACES)[-2:]:
+            lines.append(tr.format())
+    return "\n".join(lines)
+
+
+def register_admin_commands(tree: app_commands.CommandTree, sources: Mapping[str, object],
+                            profiler: Optional[OnDemandProfiler] = None):
+
+    @tree.command(name="bot_stats", description="(Admin) Số liệu nội bộ: cache, HTTP, latency, trace chậm")
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.guild_only()
+    async def bot_stats(interaction: discord.Interaction):
+        text = format_bot_stats(sources)
+        # Giới hạn 2000 ký tự / message
+        if len(text) > 1900:
+            text = text[:1900] + "\n…"
+        await interaction.response.send_message(f"```\n{text}\n```", ephemeral=True)
+
+    if profiler is None:
+        return
+
+    @tree.command(name="bot_profile", description="(Admin) Profile event loop N giây, gửi top hàm tốn thời gian")
+    @app_commands.describe(seconds="Thời gian profile (giây)", sort="cumulative | tottime | ncalls")
+    @app_commands.choices(sort=[app_commands.Choice(name=k, value=k) for k in SORT_KEYS])
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.guild_only()
+    async def bot_profile(interaction: discord.Interaction, seconds: int = 30, sort: str = "cumulative"):
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        try:
+            result = await profiler.capture(seconds, sort=sort)
+        except ProfilerBusyError as e:
+            await interaction.followup.send(str(e), ephemeral=True)
+            return
+
+        head = result.summary
+        if len(head) > 1700:
+            head = head[:1700] + "\n…"
+        await interaction.followup.send(
+            f"Profile {result.seconds:.0f}s -> `{result.path}`\n```\n{head}\n```",
+            file=discord.File(result.summary_path),
+            ephemeral=True,
+        )
@@ -1,60 +1,222 @@
 from __future__ import annotations
 
 import asyncio
-import json
+import time
+from dataclasses import dataclass
 from typing import Any, Optional
+from urllib.parse import urlsplit
 
 import aiohttp
 
+from src.bot.adapters.outbound import json_codec
+from src.bot.adapters.outbound.rate_limit import (
+    HostRateLimiter,
+    RateLimitConfig,
+    RetryBudget,
+    full_jitter_backoff,
+    parse_retry_after,
+)
+from src.bot.adapters.outbound.response_cache import ResponseCache
+from src.bot.infrastructure import metrics
 from src.bot.infrastructure.logger import get_logger
 log = get_logger(__name__)
 
+HTTP_REQUESTS = metrics.counter(
+    "http_requests_total", "Outbound HTTP responses by endpoint/status/attempt (attempt 4 = 4+)",
+    ("host", "endpoint", "status", "attempt"),
+)
+HTTP_SECONDS = metrics.histogram("http_request_seconds", "Outbound HTTP request latency", ("host", "endpoint"))
+HTTP_BYTES = metrics.counter("http_response_bytes_total", "Outbound HTTP body bytes received", ("host", "endpoint"))
+
+
+def _accept_encoding() -> str:
+    # aiohttp chỉ giải nén brotli khi có package brotli/brotlicffi
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        try:
+            import brotlicffi  # noqa: F401
+        except ImportError:
+            return "gzip, deflate"
+    return "gzip, deflate, br"
+
+
+@dataclass(frozen=True)
+class ConnectionConfig:
+    pool_size: int = 100
+    pool_size_per_host: int = 20
+    keepalive_seconds: float = 30.0
+    dns_cache_seconds: int = 300
+
 
 class HttpClient:
-    def __init__(self, user_agent: str, timeout_seconds: int = 20):
+    def __init__(
+        self,
+        user_agent: str,
+        timeout_seconds: int = 20,
+        *,
+        max_attempts: int = 4,
+        rate_limits: Optional[RateLimitConfig] = None,
+        retry_budget_ratio: float = 0.2,
+        connection: Optional[ConnectionConfig] = None,
+        response_cache: Optional[ResponseCache] = None,
+    ):
         self._headers = {
             "User-Agent": user_agent,
             "Accept": "application/json,text/plain,*/*",
+            "Accept-Encoding": _accept_encoding(),
         }
         self._timeout = aiohttp.ClientTimeout(total=timeout_seconds)
         self._session: aiohttp.ClientSession | None = None
+        self._connection = connection or ConnectionConfig()
+        self._response_cache = response_cache
+
+        self.requests = 0
+        self.bytes_received = 0
+        self.status_counts: dict[int, int] = {}
+        self._max_attempts = max(1, max_attempts)
+        self._limiter = HostRateLimiter(rate_limits)
+        self._budget = RetryBudget(retry_budget_ratio)
 
     async def _get_session(self) -> aiohttp.ClientSession:
         if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession(headers=self._headers, timeout=self._timeout)
+            c = self._connection
+            connector = aiohttp.TCPConnector(
+                limit=c.pool_size,
+                limit_per_host=c.pool_size_per_host,
+                keepalive_timeout=c.keepalive_seconds,
+                ttl_dns_cache=c.dns_cache_seconds,
+            )
+            self._session = aiohttp.ClientSession(headers=self._headers, timeout=self._timeout, connector=connector)
         return self._session
 
     async def close(self) -> None:
         if self._session and not self._session.closed:
             await self._session.close()
 
-    async def get_text(self, url: str, params: Optional[dict[str, Any]] = None) -> str:
-        backoff = 0.5
+    def stats(self) -> dict[str, Any]:
+        out: dict[str, Any] = {
+            "requests": self.requests,
+            "bytes_received": self.bytes_received,
+            "status": dict(self.status_counts),
+            "hosts": self._limiter.stats(),
+            "retry_budget": round(self._budget.tokens, 2),
+        }
+        if self._response_cache is not None:
+            out["response_cache"] = self._response_cache.stats()
+        return out
+
+    async def _get(self, url: str, params: Optional[dict[str, Any]] = None) -> tuple[bytes, str]:
+        """GET with limits/retries; returns raw body bytes and the response charset."""
+        parts = urlsplit(url)
+        host, endpoint = parts.hostname or "", parts.path or "/"
+        policy = self._limiter.for_host(host)
+        self._budget.deposit()
         last_err: Exception | None = None
+        cache_key = ResponseCache.key(url, params) if self._response_cache is not None else None
+        probe = 0
+        validators = cache_key is not None
+        attempt = 0
+        refetch = False
+
+        try:
+            while attempt < self._max_attempts:
+                if refetch:
+                    refetch = False  # lần gửi lại sau 304 mồ côi dùng lại số attempt cũ
+                else:
+                    attempt += 1
+                # Breaker mở -> fail fast, không tốn retry; retry của request thăm dò vẫn được đi tiếp
+                probe = policy.breaker.check(host, probe=probe)
+                retry_after: Optional[float] = None
+                try:
+                    log.debug("HTTP GET attempt=%d url=%s params=%s", attempt, url, params)
+                    session = await self._get_session()
+                    headers = self._response_cache.conditional_headers(cache_key) if validators else None
+                    async with policy.slot():
+                        t0 = time.perf_counter()
+                        status = "error"
+                        try:
+                            async with session.get(url, params=params, headers=headers) as resp:
+                                self.requests += 1
+                                self.status_counts[resp.status] = self.status_counts.get(resp.status, 0) + 1
+                                status = str(resp.status)
+                                if resp.status == 304 and headers:
+                                    cached = self._response_cache.get(cache_key)
+                                    if cached is not None:
+                                        policy.on_success()
+                                        self._response_cache.revalidated += 1
+                                        log.debug("HTTP %s status=304 served from cache bytes=%d", url, len(cached.body))
+                                        return cached.body, cached.encoding
+                                    # Entry bị evict giữa lúc gửi validator và lúc nhận 304 -> không có body,
+                                    # gửi lại ngay không kèm validator (không tính là 1 lần thử)
+                                    log.debug("HTTP %s status=304 but cache entry evicted, refetching", url)
+                                    validators = False
+                                    refetch = True
+                                    continue
 
-        for attempt in range(1, 5):
-            try:
-                log.debug("HTTP GET attempt=%d url=%s params=%s", attempt, url, params)
-                session = await self._get_session()
-                async with session.get(url, params=params) as resp:
-                    text = await resp.text()
-                    log.debug("HTTP %s status=%d bytes=%d", url, resp.status, len(text))
-                    if resp.status >= 400:
-                        log.warning("HTTP error status=%d url=%s body_snippet=%r", resp.status, url, text[:200])
-                    resp.raise_for_status()
-                    resp.raise_for_status()
-                    return text
-            except Exception as e:
-                last_err = e
-                log.warning("HTTP GET failed attempt=%d err=%s", attempt, f"{type(e).__name__}: {e}")
-                if attempt == 4:
+                                body = await resp.read()
+                                encoding = resp.get_encoding()
+                                self.bytes_received += len(body)
+                                HTTP_BYTES.inc(len(body), host=host, endpoint=endpoint)
+                                log.debug("HTTP %s status=%d bytes=%d", url, resp.status, len(body))
+                                if resp.status == 429 or resp.status >= 500:
+                                    retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                                    policy.on_throttle(retry_after)
+                                    if resp.status >= 500:
+                                        policy.breaker.record_failure()
+                                    # 429 khi đang thăm dò: host còn sống nhưng bảo chờ -> không mở lại breaker,
+                                    # request này giữ lượt thăm dò cho retry sau Retry-After
+                                else:
+                                    policy.on_success()
+                                if resp.status >= 400:
+                                    log.warning("HTTP error status=%d url=%s body_snippet=%r", resp.status, url, body[:200])
+                                resp.raise_for_status()
+                                if cache_key and resp.status != 304:
+                                    # 304 không có body -> không bao giờ lưu
+                                    self._response_cache.put(
+                                        cache_key, body, encoding, resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+                                    )
+                                return body, encoding
+                        finally:
+                            HTTP_SECONDS.observe(time.perf_counter() - t0, host=host, endpoint=endpoint)
+                            HTTP_REQUESTS.inc(host=host, endpoint=endpoint, status=status, attempt=min(attempt, 4))
+                except aiohttp.ClientResponseError as e:
+                    last_err = e
+                    # 4xx khác 429/408 -> retry cũng vô ích
+                    if e.status < 500 and e.status not in (408, 429):
+                        raise
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    last_err = e
+                    policy.breaker.record_failure()
+
+                log.warning("HTTP GET failed attempt=%d err=%s", attempt, f"{type(last_err).__name__}: {last_err}")
+                if attempt == self._max_attempts:
+                    break
+                if retry_after is not None and retry_after > policy.max_retry_after:
+                    log.warning("HTTP Retry-After=%.0fs exceeds %.0fs, not retrying host=%s",
+                                retry_after, policy.max_retry_after, host)
                     break
-                await asyncio.sleep(backoff)
-                backoff *= 2
+                if not self._budget.try_spend():
+                    log.warning("HTTP retry budget exhausted host=%s", host)
+                    break
+                await asyncio.sleep(retry_after if retry_after is not None else full_jitter_backoff(attempt))
+        finally:
+            # Probe kết thúc bằng mọi cách (429, hết retry, bị cancel bởi wait_for / hedge)
+            # -> trả lại lượt thăm dò, nếu không breaker kẹt ở half-open mãi
+            policy.breaker.release_probe(probe)
 
         assert last_err is not None
         raise last_err
 
+    async def get_bytes(self, url: str, params: Optional[dict[str, Any]] = None) -> bytes:
+        body, _ = await self._get(url, params=params)
+        return body
+
+    async def get_text(self, url: str, params: Optional[dict[str, Any]] = None) -> str:
+        body, encoding = await self._get(url, params=params)
+        return body.decode(encoding, errors="replace")
+
     async def get_json(self, url: str, params: Optional[dict[str, Any]] = None) -> Any:
-        text = await self.get_text(url, params=params)
-        return json.loads(text)
+        # JSON luôn là UTF-8 -> decode thẳng từ bytes, không qua str
+        body = await self.get_bytes(url, params=params)
+        return json_codec.loads(body)
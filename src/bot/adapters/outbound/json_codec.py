@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Union
+
+from src.bot.infrastructure.logger import get_logger
+
+log = get_logger(__name__)
+
+JsonInput = Union[bytes, bytearray, memoryview, str]
+
+# Lỗi decode chung cho mọi codec (orjson.JSONDecodeError kế thừa ValueError)
+JSONDecodeError = ValueError
+
+
+def _stdlib_loads(data: JsonInput) -> Any:
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+def _load_orjson() -> Callable[[JsonInput], Any] | None:
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson.loads
+
+
+_CODECS: dict[str, Callable[[], Callable[[JsonInput], Any] | None]] = {
+    "orjson": _load_orjson,
+    "json": lambda: _stdlib_loads,
+}
+
+_loads: Callable[[JsonInput], Any] = _stdlib_loads
+codec_name = "json"
+
+
+def use_codec(name: str = "auto") -> str:
+    """
+    Select the JSON decoder: "auto" (fastest installed), "orjson" or "json".
+    Falls back to the standard library when the requested codec is missing.
+    """
+    global _loads, codec_name
+    order = ["orjson", "json"] if name == "auto" else [name, "json"]
+    for candidate in order:
+        factory = _CODECS.get(candidate)
+        fn = factory() if factory else None
+        if fn is not None:
+            _loads, codec_name = fn, candidate
+            break
+    if name not in ("auto", codec_name):
+        log.warning("JSON codec %r unavailable, using %s", name, codec_name)
+    return codec_name
+
+
+def loads(data: JsonInput) -> Any:
+    """Decode JSON straight from response bytes (str accepted too)."""
+    return _loads(data)
+
+
+use_codec("auto")
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional, TypeVar
+
+from src.bot.infrastructure import metrics
+from src.bot.infrastructure.logger import get_logger
+
+log = get_logger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+MODE_INLINE = "inline"
+MODE_THREAD = "thread"
+MODE_PROCESS = "process"
+
+OFFLOADED = metrics.counter("parse_offload_total", "Parse jobs by where they ran", ("where",))
+
+
+class ParseOffloader:
+    """
+    Run CPU-bound parsing off the event loop.
+
+    - payloads smaller than `min_bytes` are parsed inline (pool hop costs more)
+    - "thread": ThreadPoolExecutor. The GIL is still held while parsing, but
+      the loop gets switched back in every few ms so heartbeats keep flowing.
+    - "process": spawn-based ProcessPoolExecutor; truly parallel, `fn` and its
+      argument/result must be picklable (module-level function, plain data).
+      If the pool breaks, parsing falls back to inline.
+    """
+
+    def __init__(self, mode: str = MODE_THREAD, *, max_workers: int = 2, min_bytes: int = 64 * 1024):
+        if mode not in (MODE_INLINE, MODE_THREAD, MODE_PROCESS):
+            raise ValueError(f"Unknown parse offload mode: {mode!r}")
+        self.mode = mode
+        self._max_workers = max(1, max_workers)
+        self._min_bytes = max(0, min_bytes)
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Optional[Executor]:
+        # Tạo lazy: pool chỉ sinh ra khi có payload đủ lớn
+        if self.mode == MODE_INLINE:
+            return None
+        if self._executor is None:
+            if self.mode == MODE_PROCESS:
+                # spawn: fork giữa lúc loop/threads đang chạy không an toàn
+                self._executor = ProcessPoolExecutor(self._max_workers, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self._executor = ThreadPoolExecutor(self._max_workers, thread_name_prefix="parse")
+        return self._executor
+
+    async def run(self, fn: Callable[[T], R], payload: T, size: int) -> R:
+        executor = self._get_executor() if size >= self._min_bytes else None
+        if executor is None:
+            OFFLOADED.inc(where=MODE_INLINE)
+            return fn(payload)
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(executor, fn, payload)
+        except BrokenProcessPool as e:
+            log.warning("Parse process pool broken, parsing inline from now on: %s", e)
+            self._shutdown()
+            self.mode = MODE_INLINE
+            OFFLOADED.inc(where=MODE_INLINE)
+            return fn(payload)
+        OFFLOADED.inc(where=self.mode)
+        return result
+
+    def _shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def close(self) -> None:
+        self._shutdown()
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Callable, Optional
+
+from src.bot.infrastructure.logger import get_logger
+
+log = get_logger(__name__)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without touching the network while a host's breaker is open."""
+
+
+@dataclass(frozen=True)
+class RateLimitConfig:
+    rate_per_second: float = 10.0
+    burst: int = 20
+    min_concurrency: int = 2
+    max_concurrency: int = 16
+    # AIMD: +1 slot sau mỗi `limit` lần thành công, x0.5 khi bị throttle
+    decrease_factor: float = 0.5
+    decrease_cooldown_seconds: float = 2.0
+    breaker_failures: int = 5
+    breaker_reset_seconds: float = 30.0
+    # Retry-After dài hơn mức này -> không chờ/retry, request fail luôn
+    max_retry_after_seconds: float = 30.0
+
+
+def parse_retry_after(value: Optional[str], *, now: Optional[float] = None) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        at = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, at - (now if now is not None else time.time()))
+
+
+def full_jitter_backoff(attempt: int, base: float = 0.5, cap: float = 8.0) -> float:
+    """'Full jitter' exponential backoff: uniform(0, min(cap, base * 2^(attempt-1)))."""
+    return random.uniform(0, min(cap, base * (2 ** (attempt - 1))))
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, burst: int, *, clock: Callable[[], float] = time.monotonic):
+        self._rate = max(0.001, rate_per_second)
+        self._burst = max(1, burst)
+        self._tokens = float(self._burst)
+        self._clock = clock
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        # Retry-After: cả host phải chờ, không chỉ request bị 429
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = self._clock()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+class AimdLimiter:
+    """Concurrency limit that grows additively on success and shrinks multiplicatively on throttling."""
+
+    def __init__(self, cfg: RateLimitConfig, *, clock: Callable[[], float] = time.monotonic):
+        self._min = max(1, cfg.min_concurrency)
+        self._max = max(self._min, cfg.max_concurrency)
+        self._factor = cfg.decrease_factor
+        self._cooldown = cfg.decrease_cooldown_seconds
+        self._clock = clock
+        self.limit = float(self._max)
+        self.in_flight = 0
+        self._last_decrease = float("-inf")
+        self._cond = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self) -> None:
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self) -> None:
+        self.limit = min(self._max, self.limit + 1 / self.limit)
+
+    def on_throttle(self) -> None:
+        now = self._clock()
+        # 1 đợt 429 chỉ cắt 1 lần
+        if now - self._last_decrease < self._cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(self._min, self.limit * self._factor)
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failures: int, reset_seconds: float, *, clock: Callable[[], float] = time.monotonic):
+        self._threshold = max(1, failures)
+        self._reset = reset_seconds
+        self._clock = clock
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_id = 0
+
+    def check(self, host: str, *, probe: int = 0) -> int:
+        """
+        Raise CircuitOpenError if `host` must not be called. Returns a non-zero
+        probe id when the caller holds the half-open probe (0 otherwise): pass
+        it back as `probe=` on the same request's retries and to
+        `release_probe` when the request ends, however it ends (response,
+        error, 429 or cancellation).
+        """
+        if self.state == self.OPEN:
+            if self._clock() - self._opened_at < self._reset:
+                raise CircuitOpenError(f"circuit open for {host}")
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == self.HALF_OPEN:
+            if probe and self._probe_in_flight and probe == self._probe_id:
+                return probe  # retry của chính request thăm dò (vd sau 429)
+            # Chỉ cho 1 request thăm dò
+            if self._probe_in_flight:
+                raise CircuitOpenError(f"circuit half-open for {host}, probe in flight")
+            self._probe_in_flight = True
+            self._probe_id += 1
+            return self._probe_id
+        return 0
+
+    def release_probe(self, probe: int) -> None:
+        # Chỉ probe hiện tại mới được trả lượt; id cũ (breaker đã mở lại rồi half-open lần nữa) bỏ qua
+        if probe and probe == self._probe_id:
+            self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self.state == self.HALF_OPEN or self._failures >= self._threshold:
+            if self.state != self.OPEN:
+                log.warning("Circuit OPEN after %d consecutive failures", self._failures)
+            self.state = self.OPEN
+            self._opened_at = self._clock()
+            self._probe_in_flight = False
+
+
+class RetryBudget:
+    """
+    Retries allowed across all requests: every request deposits `ratio`
+    tokens, every retry spends one. Keeps retries to ~ratio of traffic when
+    the upstream is struggling, instead of multiplying load by max_attempts.
+    """
+
+    def __init__(self, ratio: float = 0.2, *, min_tokens: float = 10.0, max_tokens: float = 100.0):
+        self._ratio = ratio
+        self._max = max_tokens
+        self.tokens = min_tokens
+
+    def deposit(self) -> None:
+        self.tokens = min(self._max, self.tokens + self._ratio)
+
+    def try_spend(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class HostPolicy:
+    def __init__(self, host: str, cfg: RateLimitConfig):
+        self.host = host
+        self.bucket = TokenBucket(cfg.rate_per_second, cfg.burst)
+        self.concurrency = AimdLimiter(cfg)
+        self.breaker = CircuitBreaker(cfg.breaker_failures, cfg.breaker_reset_seconds)
+        self.max_retry_after = max(0.0, cfg.max_retry_after_seconds)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self.concurrency.acquire()
+        try:
+            await self.bucket.acquire()
+            yield
+        finally:
+            await self.concurrency.release()
+
+    def on_success(self) -> None:
+        self.concurrency.on_success()
+        self.breaker.record_success()
+
+    def on_throttle(self, retry_after: Optional[float]) -> None:
+        self.concurrency.on_throttle()
+        if retry_after:
+            # Host tự báo thời gian chờ bất kỳ (vd 3600) -> chỉ dừng cả host tối đa max_retry_after
+            self.bucket.pause(min(retry_after, self.max_retry_after))
+        log.warning("Throttled by %s -> concurrency=%.1f retry_after=%s", self.host, self.concurrency.limit, retry_after)
+
+
+class HostRateLimiter:
+    """Per-host HostPolicy registry; policies are created on first use."""
+
+    def __init__(self, cfg: Optional[RateLimitConfig] = None):
+        self._cfg = cfg or RateLimitConfig()
+        self._hosts: dict[str, HostPolicy] = {}
+
+    def for_host(self, host: str) -> HostPolicy:
+        policy = self._hosts.get(host)
+        if policy is None:
+            policy = self._hosts[host] = HostPolicy(host, self._cfg)
+        return policy
+
+    def stats(self) -> dict[str, dict[str, object]]:
+        return {
+            host: {
+                "concurrency_limit": round(p.concurrency.limit, 2),
+                "in_flight": p.concurrency.in_flight,
+                "breaker": p.breaker.state,
+            }
+            for host, p in self._hosts.items()
+        }
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+from urllib.parse import urlencode
+
+from src.bot.infrastructure.logger import get_logger
+
+log = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    encoding: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+class ResponseCache:
+    """
+    HTTP validator cache: keeps body bytes with their ETag / Last-Modified so
+    HttpClient can send conditional requests and serve 304s locally.
+    LRU-bounded by entry count and total body bytes.
+    """
+
+    def __init__(self, *, max_entries: int = 2048, max_bytes: int = 16 * 1024 * 1024):
+        self._store: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._max_entries = max(1, max_entries)
+        self._max_bytes = max(1, max_bytes)
+        self._bytes = 0
+
+        self.revalidated = 0  # 304 served from cache
+        self.stored = 0
+
+    @staticmethod
+    def key(url: str, params: Optional[dict[str, Any]]) -> str:
+        if not params:
+            return url
+        return url + "?" + urlencode(sorted((k, str(v)) for k, v in params.items()))
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        item = self._store.get(key)
+        if item is not None:
+            self._store.move_to_end(key)
+        return item
+
+    def conditional_headers(self, key: str) -> dict[str, str]:
+        item = self.get(key)
+        if item is None:
+            return {}
+        headers: dict[str, str] = {}
+        if item.etag:
+            headers["If-None-Match"] = item.etag
+        if item.last_modified:
+            headers["If-Modified-Since"] = item.last_modified
+        return headers
+
+    def put(self, key: str, body: bytes, encoding: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+        # Không có validator thì không revalidate được -> không lưu
+        if not etag and not last_modified:
+            return
+        if len(body) > self._max_bytes:
+            return
+        old = self._store.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old.body)
+        self._store[key] = CachedResponse(body, encoding, etag, last_modified)
+        self._bytes += len(body)
+        self.stored += 1
+
+        while len(self._store) > self._max_entries or self._bytes > self._max_bytes:
+            _, evicted = self._store.popitem(last=False)
+            self._bytes -= len(evicted.body)
+
+    def stats(self) -> dict[str, int]:
+        return {"entries": len(self._store), "bytes": self._bytes, "stored": self.stored, "revalidated": self.revalidated}
@@ -1,14 +1,37 @@
 from __future__ import annotations
 
-import json
 import re
-from typing import Optional
+import time
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import Optional, Union
 
 from bs4 import BeautifulSoup
 
+from src.bot.adapters.outbound import json_codec
 from src.bot.domain.models import Deal
+from src.bot.infrastructure import metrics
+from src.bot.infrastructure.logger import get_logger
 
-STEAM_APP_URL = "https://store.steampowered.com/app/{appid}/"
+log = get_logger(__name__)
+
+PARSE_SECONDS = metrics.histogram("steam_parse_seconds", "Search results_html parse time", ("parser",))
+PARSE_ROWS = metrics.histogram("steam_parse_rows", "Rows per parsed search page", ("parser",),
+                               buckets=metrics.SIZE_BUCKETS)
+
+_ROW_CLASS_RE = re.compile(r"""class\s*=\s*["'][^"']*\bsearch_result_row\b""")
+
+
+@dataclass(frozen=True)
+class SearchRow:
+    appid: int
+    name: Optional[str]  # None khi row không có span.title
+    discount_pct: int
+    price_original: Optional[str]
+    price_final: str
+    image_url: Optional[str]
+    tag_ids: tuple[int, ...] = ()  # data-ds-tagids, thứ tự như Steam trả về
+    final_minor: Optional[int] = None  # data-price-final (minor units), None nếu row không có
 
 
 def _clean(s: str) -> str:
@@ -20,20 +43,33 @@ def _try_parse_discount(text: str) -> int:
     return int(m.group(1)) if m else 0
 
 
-def parse_search_response(raw_text: str) -> str:
+def parse_search_response(raw: Union[bytes, str]) -> str:
+    return parse_search_payload(raw)[0]
+
+
+def _as_text(raw: Union[bytes, str]) -> str:
+    return raw.decode("utf-8", errors="replace") if isinstance(raw, (bytes, bytearray)) else raw
+
+
+def parse_search_payload(raw: Union[bytes, str]) -> tuple[str, Optional[int]]:
+    """
+    Return (results_html, total_count) from a /search/results/?infinite=1
+    body, decoded straight from the response bytes. Non-JSON bodies are
+    treated as bare HTML with an unknown total.
+    """
     try:
-        data = json.loads(raw_text)
-        html = data.get("results_html", "") or ""
-        return html if html else raw_text
-    except json.JSONDecodeError:
-        return raw_text
+        data = json_codec.loads(raw)
+    except json_codec.JSONDecodeError:
+        return _as_text(raw), None
+    if not isinstance(data, dict):
+        return _as_text(raw), None
 
+    html = data.get("results_html", "") or ""
+    total = data.get("total_count")
+    return (html if html else _as_text(raw)), (int(total) if isinstance(total, (int, str)) and str(total).isdigit() else None)
 
-def _parse_price(price_div) -> tuple[Optional[str], str]:
-    if not price_div:
-        return None, ""
 
-    parts = [s.strip() for s in price_div.stripped_strings if s.strip()]
+def _split_price_parts(parts: list[str]) -> tuple[Optional[str], str]:
     if not parts:
         return None, ""
 
@@ -49,6 +85,12 @@ def _parse_price(price_div) -> tuple[Optional[str], str]:
     return None, parts[0]
 
 
+def _parse_price(price_div) -> tuple[Optional[str], str]:
+    if not price_div:
+        return None, ""
+    return _split_price_parts([s.strip() for s in price_div.stripped_strings if s.strip()])
+
+
 def _parse_image_url(row) -> Optional[str]:
     img = row.select_one("div.search_capsule img")
     if not img:
@@ -57,42 +99,334 @@ def _parse_image_url(row) -> Optional[str]:
     return img.get("src") or img.get("data-src")
 
 
-def parse_deals_from_html(html: str) -> list[Deal]:
-    soup = BeautifulSoup(html, "html.parser")
-    deals: list[Deal] = []
-
-    for a in soup.select("a.search_result_row"):
-        appid_raw = a.get("data-ds-appid") or ""
-        appid_str = appid_raw.split(",")[0].strip()
-        if not appid_str.isdigit():
-            continue
-        appid = int(appid_str)
-
-        title_el = a.select_one("span.title")
-        if not title_el:
+def _appid_from_attr(raw: Optional[str]) -> Optional[int]:
+    appid_str = (raw or "").split(",")[0].strip()
+    return int(appid_str) if appid_str.isdigit() else None
+
+
+def _tagids_from_attr(raw: Optional[str]) -> tuple[int, ...]:
+    # data-ds-tagids="[1628,19,492]"
+    return tuple(int(t) for t in (raw or "").strip("[] ").split(",") if t.strip().isdigit())
+
+
+def _int_attr(raw: Optional[str]) -> Optional[int]:
+    raw = (raw or "").strip()
+    return int(raw) if raw.isdigit() else None
+
+
+# Markup hiện tại của Steam gom giảm giá + giá vào 1 block:
+#   <div class="discount_block search_discount_block" data-price-final="5999" data-discount="40">
+#     <div class="discount_pct">-40%</div>
+#     <div class="discount_prices">
+#       <div class="discount_original_price">99.999₫</div><div class="discount_final_price">59.999₫</div>
+# Markup cũ (div.search_discount span + div.search_price) vẫn được hỗ trợ.
+_BLOCK_CLASS = "discount_block"
+
+
+def _block_prices(original: Optional[str], final: Optional[str]) -> tuple[Optional[str], str]:
+    return _split_price_parts([p for p in (original, final) if p])
+
+
+# ---------------------------------------------------------------------------
+# Single-pass tokenizer (fast path)
+# ---------------------------------------------------------------------------
+
+class _UnexpectedMarkup(Exception):
+    pass
+
+
+class _RowState:
+    __slots__ = ("appid", "tag_ids", "title", "discount", "price_parts", "image_url", "has_title",
+                 "block_discount", "block_final_minor", "block_pct", "block_original", "block_final",
+                 "price_final_attr")
+
+    def __init__(self, appid: Optional[int], tag_ids: tuple[int, ...] = ()):
+        self.appid = appid
+        self.tag_ids = tag_ids
+        self.title: list[str] = []
+        self.discount: list[str] = []
+        self.price_parts: list[str] = []
+        self.image_url: Optional[str] = None
+        self.has_title = False
+        # discount_block (markup hiện tại)
+        self.block_discount: Optional[int] = None
+        self.block_final_minor: Optional[int] = None
+        self.block_pct: list[str] = []
+        self.block_original: list[str] = []
+        self.block_final: list[str] = []
+        self.price_final_attr: Optional[int] = None
+
+
+class _SearchRowsParser(HTMLParser):
+    """
+    Streaming walk over `results_html` that extracts every row field in one
+    pass, mirroring the CSS selectors of the BeautifulSoup parser:
+    `a.search_result_row`, `span.title`, `div.search_discount span`,
+    `div.search_price` and `div.search_capsule img`, plus the current
+    `div.discount_block` (`div.discount_pct`, `div.discount_original_price`,
+    `div.discount_final_price`).
+    """
+
+    # Bits pushed on the element stack; a text node belongs to every open region
+    _TITLE, _DISCOUNT, _DISCOUNT_SPAN, _PRICE, _CAPSULE = 1, 2, 4, 8, 16
+    _BLOCK_PCT, _BLOCK_ORIGINAL, _BLOCK_FINAL = 32, 64, 128
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.rows: list[_RowState] = []
+        self._row: Optional[_RowState] = None
+        self._stack: list[tuple[str, int]] = []
+        self._flags = 0
+        self._discount_span_seen = False
+
+    def handle_starttag(self, tag, attrs):
+        row = self._row
+        if tag == "a":
+            cls = _attr(attrs, "class")
+            if cls and "search_result_row" in cls.split():
+                if row is not None:
+                    raise _UnexpectedMarkup("nested search_result_row")
+                self._row = _RowState(_appid_from_attr(_attr(attrs, "data-ds-appid")),
+                                      _tagids_from_attr(_attr(attrs, "data-ds-tagids")))
+                self._stack = []
+                self._flags = 0
+                self._discount_span_seen = False
+            return
+        if row is None:
+            return
+
+        if tag == "img":
+            if self._flags & self._CAPSULE and row.image_url is None:
+                row.image_url = _attr(attrs, "src") or _attr(attrs, "data-src")
+            return
+        if tag not in ("div", "span"):
+            return
+
+        flag = 0
+        cls = _attr(attrs, "class")
+        classes = cls.split() if cls else ()
+        if tag == "span":
+            if "title" in classes and not row.has_title:
+                row.has_title = True
+                flag = self._TITLE
+            elif self._flags & self._DISCOUNT and not self._discount_span_seen:
+                self._discount_span_seen = True
+                flag = self._DISCOUNT_SPAN
+        elif classes:
+            if "search_discount" in classes:
+                flag = self._DISCOUNT
+            elif "search_price" in classes:
+                flag = self._PRICE
+            elif "search_capsule" in classes:
+                flag = self._CAPSULE
+            elif _BLOCK_CLASS in classes:
+                if row.block_discount is None:
+                    row.block_discount = _int_attr(_attr(attrs, "data-discount"))
+                    row.block_final_minor = _int_attr(_attr(attrs, "data-price-final"))
+            elif "discount_pct" in classes:
+                flag = self._BLOCK_PCT
+            elif "discount_original_price" in classes:
+                flag = self._BLOCK_ORIGINAL
+            elif "discount_final_price" in classes:
+                flag = self._BLOCK_FINAL
+            elif "search_price_discount_combined" in classes:
+                row.price_final_attr = _int_attr(_attr(attrs, "data-price-final"))
+
+        self._stack.append((tag, flag))
+        self._flags |= flag
+
+    def handle_endtag(self, tag):
+        row = self._row
+        if row is None:
+            return
+        if tag == "a":
+            self.rows.append(row)
+            self._row = None
+            return
+        if tag not in ("div", "span"):
+            return
+        if not self._stack or self._stack[-1][0] != tag:
+            raise _UnexpectedMarkup(f"unbalanced </{tag}>")
+        _, flag = self._stack.pop()
+        if flag:
+            self._flags &= ~flag
+
+    def handle_data(self, data):
+        row = self._row
+        if row is None or not self._flags:
+            return
+        flags = self._flags
+        if flags & self._TITLE:
+            row.title.append(data)
+        if flags & self._DISCOUNT_SPAN:
+            row.discount.append(data)
+        if flags & self._PRICE:
+            s = data.strip()
+            if s:
+                row.price_parts.append(s)
+        if flags & self._BLOCK_PCT:
+            row.block_pct.append(data)
+        if flags & self._BLOCK_ORIGINAL:
+            row.block_original.append(data)
+        if flags & self._BLOCK_FINAL:
+            row.block_final.append(data)
+
+
+def _attr(attrs: list[tuple[str, Optional[str]]], name: str) -> Optional[str]:
+    for k, v in attrs:
+        if k == name:
+            return v
+    return None
+
+
+def _parse_rows_fast(html: str) -> list[SearchRow]:
+    p = _SearchRowsParser()
+    p.feed(html)
+    p.close()
+    if p._row is not None:
+        raise _UnexpectedMarkup("unterminated search_result_row")
+
+    expected = len(_ROW_CLASS_RE.findall(html))
+    if expected != len(p.rows):
+        raise _UnexpectedMarkup(f"rows parsed={len(p.rows)} expected={expected}")
+
+    out: list[SearchRow] = []
+    for r in p.rows:
+        if r.appid is None:
             continue
-        name = title_el.get_text(strip=True)
+        if r.block_final or r.block_original:
+            price_original, price_final = _block_prices(_clean("".join(r.block_original)) or None,
+                                                        _clean("".join(r.block_final)) or None)
+        else:
+            price_original, price_final = _split_price_parts(r.price_parts)
+        if r.block_discount is not None:
+            discount_pct = r.block_discount
+        elif r.block_pct:
+            discount_pct = _try_parse_discount("".join(s.strip() for s in r.block_pct))
+        else:
+            discount_pct = _try_parse_discount("".join(s.strip() for s in r.discount))
+        out.append(
+            SearchRow(
+                appid=r.appid,
+                name="".join(s.strip() for s in r.title) if r.has_title else None,
+                discount_pct=discount_pct,
+                price_original=price_original,
+                price_final=price_final,
+                image_url=r.image_url,
+                tag_ids=r.tag_ids,
+                final_minor=r.block_final_minor if r.block_final_minor is not None else r.price_final_attr,
+            )
+        )
+    return out
 
-        disc_el = a.select_one("div.search_discount span")
-        discount_pct = _try_parse_discount(disc_el.get_text(strip=True)) if disc_el else 0
 
-        price_div = a.select_one("div.search_price")
-        price_original, price_final = _parse_price(price_div)
+# ---------------------------------------------------------------------------
+# BeautifulSoup parser (fallback)
+# ---------------------------------------------------------------------------
 
-        image_url = _parse_image_url(a)
+def _parse_rows_bs4(html: str) -> list[SearchRow]:
+    soup = BeautifulSoup(html, "html.parser")
+    rows: list[SearchRow] = []
 
-        if discount_pct <= 0:
+    for a in soup.select("a.search_result_row"):
+        appid = _appid_from_attr(a.get("data-ds-appid"))
+        if appid is None:
             continue
 
-        deals.append(
-            Deal(
+        title_el = a.select_one("span.title")
+        name = title_el.get_text(strip=True) if title_el else None
+
+        block = a.select_one("div.discount_block")
+        combined = a.select_one("div.search_price_discount_combined")
+        final_minor = _int_attr(combined.get("data-price-final")) if combined else None
+        if block is not None:
+            pct_el = block.select_one("div.discount_pct")
+            discount_pct = _int_attr(block.get("data-discount"))
+            if discount_pct is None:
+                discount_pct = _try_parse_discount(pct_el.get_text(strip=True)) if pct_el else 0
+            orig_el = block.select_one("div.discount_original_price")
+            final_el = block.select_one("div.discount_final_price")
+            price_original, price_final = _block_prices(
+                _clean(orig_el.get_text(" ", strip=True)) if orig_el else None,
+                _clean(final_el.get_text(" ", strip=True)) if final_el else None,
+            )
+            block_minor = _int_attr(block.get("data-price-final"))
+            final_minor = block_minor if block_minor is not None else final_minor
+        else:
+            disc_el = a.select_one("div.search_discount span")
+            discount_pct = _try_parse_discount(disc_el.get_text(strip=True)) if disc_el else 0
+            price_div = a.select_one("div.search_price")
+            price_original, price_final = _parse_price(price_div)
+
+        rows.append(
+            SearchRow(
                 appid=appid,
                 name=name,
                 discount_pct=discount_pct,
-                price_final=_clean(price_final),
-                price_original=_clean(price_original) if price_original else None,
-                url=STEAM_APP_URL.format(appid=appid),
-                image_url=image_url,
+                price_original=price_original,
+                price_final=price_final,
+                image_url=_parse_image_url(a),
+                tag_ids=_tagids_from_attr(a.get("data-ds-tagids")),
+                final_minor=final_minor,
+            )
+        )
+    return rows
+
+
+def _parse_rows(html: str) -> tuple[list[SearchRow], str]:
+    try:
+        return _parse_rows_fast(html), "fast"
+    except _UnexpectedMarkup as e:
+        log.debug("Fast search parser fallback to BeautifulSoup: %s", e)
+        return _parse_rows_bs4(html), "bs4"
+
+
+def record_parse(parser: str, seconds: float, rows: int) -> None:
+    """Record parse metrics; call on the event loop (the metrics registry is not thread-safe)."""
+    PARSE_SECONDS.observe(seconds, parser=parser)
+    PARSE_ROWS.observe(rows, parser=parser)
+
+
+def parse_search_rows(html: str) -> list[SearchRow]:
+    """
+    Parse every search row once. Uses the single-pass tokenizer and falls
+    back to BeautifulSoup when the markup does not look like what it expects.
+    Records metrics, so call it on the event loop; off-loop callers use
+    `parse_search_page`.
+    """
+    t0 = time.perf_counter()
+    rows, parser = _parse_rows(html)
+    record_parse(parser, time.perf_counter() - t0, len(rows))
+    return rows
+
+
+def parse_search_page(raw: Union[bytes, str]) -> tuple[list[SearchRow], Optional[int], str, float]:
+    """
+    Decode and parse one /search/results/ body: (rows, total_count, parser,
+    parse seconds). Module-level and picklable in/out so ParseOffloader can
+    run it in a pool; it touches no metrics (worker threads / processes), the
+    caller passes parser + seconds to `record_parse` back on the loop.
+    """
+    html, total = parse_search_payload(raw)
+    t0 = time.perf_counter()
+    rows, parser = _parse_rows(html)
+    return rows, total, parser, time.perf_counter() - t0
+
+
+def deals_from_rows(rows: list[SearchRow]) -> list[Deal]:
+    deals: list[Deal] = []
+    for r in rows:
+        if r.name is None or r.discount_pct <= 0:
+            continue
+        # Capsule trong search chỉ là ảnh nhỏ 120px -> để Deal dùng header mặc định theo appid
+        deals.append(
+            Deal.create(
+                appid=r.appid,
+                name=r.name,
+                discount_pct=r.discount_pct,
+                price_final=_clean(r.price_final),
+                price_original=_clean(r.price_original) if r.price_original else None,
+                final_minor=r.final_minor or None,
             )
         )
 
@@ -101,21 +435,14 @@ def parse_deals_from_html(html: str) -> list[Deal]:
     return deals
 
 
-def extract_appids_from_html(html: str) -> list[int]:
-    soup = BeautifulSoup(html, "html.parser")
-    appids: list[int] = []
+def appids_from_rows(rows: list[SearchRow]) -> list[int]:
+    # giữ thứ tự nhưng loại trùng
+    return list(dict.fromkeys(r.appid for r in rows))
 
-    for a in soup.select("a.search_result_row"):
-        appid_raw = a.get("data-ds-appid") or ""
-        appid_str = appid_raw.split(",")[0].strip()
-        if appid_str.isdigit():
-            appids.append(int(appid_str))
 
-    # giữ thứ tự nhưng loại trùng
-    seen = set()
-    out = []
-    for x in appids:
-        if x not in seen:
-            seen.add(x)
-            out.append(x)
-    return out
\ No newline at end of file
+def parse_deals_from_html(html: str) -> list[Deal]:
+    return deals_from_rows(parse_search_rows(html))
+
+
+def extract_appids_from_html(html: str) -> list[int]:
+    return appids_from_rows(parse_search_rows(html))
@@ -1,33 +1,152 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Optional
+import contextlib
+import dataclasses
+import time
+from typing import AsyncIterator, Optional
 
-from src.bot.application.ports import DealsProvider, DealsQuery
+from src.bot.application.ports import AppDetailsStore, DealsProvider, DealsQuery
 from src.bot.adapters.outbound.http_client import HttpClient
-from src.bot.adapters.outbound.steam_parser import parse_search_response, extract_appids_from_html
+from src.bot.adapters.outbound.parse_offload import MODE_INLINE, ParseOffloader
+from src.bot.adapters.outbound.steam_parser import (
+    SearchRow,
+    appids_from_rows,
+    deals_from_rows,
+    parse_search_page,
+    record_parse,
+)
 from src.bot.domain.models import Deal
+from src.bot.infrastructure import metrics
 from src.bot.infrastructure.logger import get_logger
 
 log = get_logger(__name__)
 
-STEAM_SEARCH_URL = "https://store.steampowered.com/search/results/"
-STEAM_APP_URL = "https://store.steampowered.com/app/{appid}/"
-STEAM_APPDETAILS_URL = "https://store.steampowered.com/api/appdetails"
+STEAM_STORE_BASE_URL = "https://store.steampowered.com"
+STEAM_SEARCH_PATH = "/search/results/"
+STEAM_APPDETAILS_PATH = "/api/appdetails"
+STEAM_SEARCH_URL = STEAM_STORE_BASE_URL + STEAM_SEARCH_PATH
+STEAM_APPDETAILS_URL = STEAM_STORE_BASE_URL + STEAM_APPDETAILS_PATH
+
+MODE_APPDETAILS = "appdetails"
+MODE_SEARCH = "search"
 
 
 class SteamStoreDealsProvider(DealsProvider):
-    def __init__(self, http: HttpClient, *, concurrency: int = 8):
+    def __init__(
+        self,
+        http: HttpClient,
+        *,
+        concurrency: int = 8,
+        store: Optional[AppDetailsStore] = None,
+        price_batch_size: int = 50,
+        request_deadline_seconds: float = 10.0,
+        hedge_delay_seconds: float = 0.0,
+        mode: str = MODE_APPDETAILS,
+        search_page_size: int = 50,
+        search_max_pages: int = 5,
+        store_base_url: str = STEAM_STORE_BASE_URL,
+        parse_offloader: Optional[ParseOffloader] = None,
+    ):
+        if mode not in (MODE_APPDETAILS, MODE_SEARCH):
+            raise ValueError(f"Unknown provider mode: {mode!r}")
         self._http = http
         self._concurrency = max(1, min(concurrency, 20))
+        self._store = store
+        # <= 1 -> tắt pass giá theo batch, gọi full appdetails cho từng appid như cũ
+        self._price_batch_size = max(0, min(price_batch_size, 100))
+        self._request_deadline = request_deadline_seconds
+        # <= 0 -> không hedge
+        self._hedge_delay = hedge_delay_seconds
+        self._mode = mode
+        self._search_page_size = max(10, min(search_page_size, 100))
+        self._search_max_pages = max(1, search_max_pages)
+        # Đổi base URL để chạy với Steam giả lập (benchmarks) hoặc proxy
+        base = store_base_url.rstrip("/")
+        self._search_url = base + STEAM_SEARCH_PATH
+        self._appdetails_url = base + STEAM_APPDETAILS_PATH
+        self._parser = parse_offloader or ParseOffloader(MODE_INLINE)
+        # search mode: appid đang được enrich nền (tránh gọi trùng)
+        self._enriching: set[int] = set()
+        self._enrich_tasks: set[asyncio.Task] = set()
+
+        self.hedged_count = 0
+        self.deadline_misses = 0
+        self.search_pages = 0
+        self.parse_seconds = 0.0
+
+    async def _fetch_price_batch(self, appids: list[int], cc: str) -> tuple[list[int], list[int]]:
+        """
+        Price-only appdetails lookup for many appids in one request
+        (`filters=price_overview` is the only filter Steam accepts with
+        several appids). Returns (discounted, not_discounted); appids missing
+        from the answer or from a failed request count as discounted so the
+        full-details pass still looks at them.
+        """
+        try:
+            resp = await self._http.get_json(
+                self._appdetails_url,
+                params={
+                    "appids": ",".join(str(a) for a in appids),
+                    "cc": cc,
+                    "filters": "price_overview",
+                },
+            )
+        except Exception as e:
+            log.debug("price batch failed size=%d err=%s", len(appids), f"{type(e).__name__}: {e}")
+            return list(appids), []
+
+        if not isinstance(resp, dict):
+            return list(appids), []
+
+        discounted: list[int] = []
+        negative: list[int] = []
+        for appid in appids:
+            node = resp.get(str(appid))
+            if not isinstance(node, dict):
+                discounted.append(appid)
+                continue
+            # Free / không bán: data là [] hoặc không có price_overview
+            data = node.get("data") if node.get("success") else None
+            price = data.get("price_overview") if isinstance(data, dict) else None
+            if price and int(price.get("discount_percent") or 0) > 0:
+                discounted.append(appid)
+            else:
+                negative.append(appid)
+        return discounted, negative
+
+    async def _discounted_appids(self, appids: list[int], cc: str, lang: str) -> list[int]:
+        size = self._price_batch_size
+        batches = [appids[i:i + size] for i in range(0, len(appids), size)]
+        sem = asyncio.Semaphore(self._concurrency)
+
+        async def run(batch: list[int]) -> tuple[list[int], list[int]]:
+            async with sem:
+                return await self._fetch_price_batch(batch, cc)
+
+        results = await asyncio.gather(*(run(b) for b in batches))
+        discounted = {a for d, _ in results for a in d}
+        negative = [a for _, n in results for a in n]
+
+        if self._store is not None and negative:
+            try:
+                await self._store.put_many([(a, None) for a in negative], cc, lang)
+            except Exception as e:
+                log.warning("appdetails store write failed err=%s", f"{type(e).__name__}: {e}")
+
+        log.info("Price pass requests=%d appids=%d discounted=%d", len(batches), len(appids), len(discounted))
+        # giữ thứ tự của search
+        return [a for a in appids if a in discounted]
 
     async def _fetch_one_appdetails(self, appid: int, cc: str, lang: str) -> Optional[Deal]:
         """
         Fetch appdetails for 1 appid and return Deal if discounted (>0%).
+        Definitive answers (positive or negative) are written to the store;
+        transport errors are not, so they get retried next time.
         """
         try:
             resp = await self._http.get_json(
-                STEAM_APPDETAILS_URL,
+                self._appdetails_url,
                 params={
                     "appids": str(appid),
                     "cc": cc,
@@ -39,6 +158,16 @@ class SteamStoreDealsProvider(DealsProvider):
             log.debug("appdetails failed appid=%s err=%s", appid, f"{type(e).__name__}: {e}")
             return None
 
+        deal = self._deal_from_appdetails(appid, resp)
+        if self._store is not None and isinstance(resp, dict) and str(appid) in resp:
+            try:
+                await self._store.put(appid, cc, lang, deal)
+            except Exception as e:
+                log.warning("appdetails store write failed appid=%s err=%s", appid, f"{type(e).__name__}: {e}")
+        return deal
+
+    @staticmethod
+    def _deal_from_appdetails(appid: int, resp: object) -> Optional[Deal]:
         if not isinstance(resp, dict):
             return None
 
@@ -59,27 +188,191 @@ class SteamStoreDealsProvider(DealsProvider):
 
         # NAME + IMAGE
         name = data.get("name") or f"App {appid}"
-        img = data.get("header_image") or f"https://cdn.akamai.steamstatic.com/steam/apps/{appid}/header.jpg"
+        img = data.get("header_image") or None
 
         initial = price.get("initial_formatted") or ""
         final = price.get("final_formatted") or ""
 
-        return Deal(
+        # price_overview có sẵn số (minor units) + mã tiền tệ -> không cần parse chuỗi
+        return Deal.create(
             appid=appid,
             name=name,
             discount_pct=discount,
             price_original=initial if initial else None,
             price_final=final,
-            url=STEAM_APP_URL.format(appid=appid),
+            final_minor=price["final"] if isinstance(price.get("final"), int) else None,
+            original_minor=price["initial"] if isinstance(price.get("initial"), int) else None,
+            currency=str(price.get("currency") or ""),
             image_url=img,
         )
 
-    async def fetch_deals(self, q: DealsQuery):
-        # 1) Search để lấy appids theo tag + specials
+    async def _deals_from_search(self, rows: list[SearchRow], q: DealsQuery, need: int) -> list[Deal]:
+        """
+        Fast path: build Deals straight from the search rows (no appdetails).
+        Search only carries a small capsule image, so non-default header
+        images come from the appdetails store when known; the rest use the
+        header derived from the appid and are enriched in the background for
+        the next query.
+        """
+        deals = deals_from_rows(rows)[:need]
+        if not deals:
+            return []
+
+        known: dict[int, Optional[Deal]] = {}
+        if self._store is not None:
+            try:
+                known = await self._store.get_many([d.appid for d in deals], q.country_code, q.language)
+            except Exception as e:
+                log.warning("appdetails store read failed err=%s", f"{type(e).__name__}: {e}")
+
+        out: list[Deal] = []
+        missing: list[int] = []
+        for d in deals:
+            rich = known.get(d.appid)
+            if rich is not None:
+                # Giá lấy từ search (mới hơn), chỉ lấy ảnh header từ store
+                if rich.image or rich.image_t is not None:
+                    d = dataclasses.replace(d, image=rich.image, image_t=rich.image_t)
+            else:
+                if not d.price_final or d.appid not in known:
+                    missing.append(d.appid)
+            out.append(d)
+
+        if missing and self._store is not None:
+            self._enrich_in_background(missing, q.country_code, q.language)
+        return out
+
+    def _enrich_in_background(self, appids: list[int], cc: str, lang: str) -> None:
+        todo = [a for a in appids if a not in self._enriching]
+        if not todo:
+            return
+        self._enriching.update(todo)
+
+        async def run() -> None:
+            sem = asyncio.Semaphore(self._concurrency)
+
+            async def one(appid: int) -> None:
+                try:
+                    async with sem:
+                        await self._fetch_one_appdetails(appid, cc, lang)
+                finally:
+                    self._enriching.discard(appid)
+
+            await asyncio.gather(*(one(a) for a in todo))
+            log.debug("Search-mode enrichment done appids=%d", len(todo))
+
+        task = asyncio.create_task(run(), name="search-enrich")
+        self._enrich_tasks.add(task)
+        task.add_done_callback(self._enrich_tasks.discard)
+
+    async def _fetch_with_deadline(self, appid: int, cc: str, lang: str) -> Optional[Deal]:
+        """
+        One appdetails lookup bounded by the per-request deadline. With hedging
+        on, a second identical request is fired if the first has not answered
+        after `hedge_delay` and whichever finishes first wins.
+        """
+
+        async def attempt() -> Optional[Deal]:
+            try:
+                return await asyncio.wait_for(self._fetch_one_appdetails(appid, cc, lang), self._request_deadline)
+            except asyncio.TimeoutError:
+                self.deadline_misses += 1
+                log.debug("appdetails deadline exceeded appid=%s deadline=%.1fs", appid, self._request_deadline)
+                return None
+
+        if self._hedge_delay <= 0:
+            return await attempt()
+
+        tasks = {asyncio.create_task(attempt())}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self._hedge_delay)
+            if not done:
+                self.hedged_count += 1
+                log.debug("appdetails hedged appid=%s after %.2fs", appid, self._hedge_delay)
+                tasks.add(asyncio.create_task(attempt()))
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            return done.pop().result()
+        finally:
+            # Worker bị cancel hoặc đã có kết quả -> huỷ request còn lại
+            for t in tasks:
+                t.cancel()
+
+    async def _stream_appdetails(self, appids: list[int], q: DealsQuery, need: int) -> AsyncIterator[Deal]:
+        """
+        Yield discounted Deals for `appids` as they resolve. A bounded pool of
+        workers drains a job queue and pushes results onto a result queue, so
+        one slow app only occupies one worker. Closing the iterator (enough
+        deals) cancels the outstanding requests.
+        """
+        produced = 0
+
+        # Lấy từ store những appid đã biết (positive + negative), chỉ gọi mạng cho phần còn lại
+        if self._store is not None:
+            try:
+                with metrics.span("steam.store_read"):
+                    known = await self._store.get_many(appids, q.country_code, q.language)
+            except Exception as e:
+                log.warning("appdetails store read failed err=%s", f"{type(e).__name__}: {e}")
+                known = {}
+            appids = [a for a in appids if a not in known]
+            log.info("Appdetails store hits=%d to_fetch=%d", len(known), len(appids))
+            for d in known.values():
+                if d is not None:
+                    yield d
+                    produced += 1
+            if produced >= need:
+                return
+
+        # Pass giá theo batch: chỉ giữ lại appid đang giảm giá
+        if self._price_batch_size > 1 and appids:
+            with metrics.span("steam.price_pass"):
+                appids = await self._discounted_appids(appids, q.country_code, q.language)
+        if not appids:
+            return
+
+        jobs: asyncio.Queue[int] = asyncio.Queue()
+        for a in appids:
+            jobs.put_nowait(a)
+        results: asyncio.Queue[Optional[Deal]] = asyncio.Queue()
+
+        async def worker() -> None:
+            while True:
+                try:
+                    appid = jobs.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    with metrics.span("steam.appdetails"):
+                        d = await self._fetch_with_deadline(appid, q.country_code, q.language)
+                except Exception as e:
+                    log.debug("appdetails worker failed appid=%s err=%s", appid, f"{type(e).__name__}: {e}")
+                    d = None
+                results.put_nowait(d)
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(self._concurrency, len(appids)))]
+        try:
+            for _ in range(len(appids)):
+                d = await results.get()
+                if d is None:
+                    continue
+                yield d
+                produced += 1
+                if produced >= need:
+                    return
+        finally:
+            cancelled = sum(1 for w in workers if not w.done())
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            if cancelled:
+                log.debug("appdetails pipeline stopped early, cancelled workers=%d queued=%d", cancelled, jobs.qsize())
+
+    async def _fetch_search_page(self, q: DealsQuery, start: int,
+                                 count: Optional[int] = None) -> tuple[list[SearchRow], Optional[int]]:
         params = {
             "query": "",
-            "start": 0,
-            "count": 80,  # lấy nhiều để lọc vẫn đủ
+            "start": start,
+            "count": count or self._search_page_size,
             "infinite": 1,
             "specials": 1 if q.only_discounted else 0,
             "tags": ",".join(str(t) for t in q.tag_ids),
@@ -87,36 +380,104 @@ class SteamStoreDealsProvider(DealsProvider):
             "l": q.language,
         }
 
-        log.info("Steam search fetch cc=%s lang=%s tags=%s", q.country_code, q.language, q.tag_ids)
-        raw = await self._http.get_text(STEAM_SEARCH_URL, params=params)
-        html = parse_search_response(raw)
-        appids = extract_appids_from_html(html)
+        log.info("Steam search fetch cc=%s lang=%s tags=%s start=%d", q.country_code, q.language, q.tag_ids, start)
+        with metrics.span("steam.search_page"):
+            raw = await self._http.get_bytes(self._search_url, params=params)
+        t0 = time.perf_counter()
+        with metrics.span("steam.parse"):
+            rows, total, parser, parse_seconds = await self._parser.run(parse_search_page, raw, len(raw))
+        record_parse(parser, parse_seconds, len(rows))
+        self.parse_seconds += time.perf_counter() - t0
+        self.search_pages += 1
+        return rows, total
 
-        log.info("Steam search extracted appids=%d", len(appids))
-        if not appids:
-            return []
+    async def iter_search_pages(self, q: DealsQuery, *, max_pages: Optional[int] = None,
+                                page_size: Optional[int] = None,
+                                want_rows: Optional[int] = None) -> AsyncIterator[list[SearchRow]]:
+        """
+        Page through the search lazily. While fewer than `want_rows` rows
+        (None = every page) have arrived, the next page is requested while
+        the caller is still processing the current one; past that, a page is
+        only fetched if the caller asks for it. Closing the iterator early
+        cancels the prefetch. `max_pages` / `page_size` override the provider
+        settings (the catalog crawler walks far more pages).
+        """
+        max_pages = max_pages or self._search_max_pages
+        count = max(10, min(page_size, 100)) if page_size else None
+        start = 0
+        pending: Optional[asyncio.Task] = None
+        try:
+            for page_no in range(max_pages):
+                if pending is None:
+                    pending = asyncio.create_task(self._fetch_search_page(q, start, count))
+                rows, total = await pending
+                pending = None
+                if not rows:
+                    return
 
-        # 2) Fetch appdetails theo từng appid, concurrency có kiểm soát
-        sem = asyncio.Semaphore(self._concurrency)
-        deals: list[Deal] = []
+                start += len(rows)
+                more = page_no + 1 < max_pages and (total is None or start < total)
+                # Chỉ prefetch khi gần như chắc chắn cần trang sau: 1 trang đủ thì không tốn request
+                if more and (want_rows is None or start < want_rows):
+                    pending = asyncio.create_task(self._fetch_search_page(q, start, count))
 
-        async def worker(appid: int) -> None:
-            nonlocal deals
-            async with sem:
-                d = await self._fetch_one_appdetails(appid, q.country_code, q.language)
-                if d:
-                    deals.append(d)
-
-        # Dừng sớm khi đã đủ nhiều (lọc + sort)
-        # Ta chạy theo "waves": mỗi wave ~ 25 appids, đủ deals thì stop.
-        wave_size = 25
-        for i in range(0, len(appids), wave_size):
-            wave = appids[i:i + wave_size]
-            await asyncio.gather(*(worker(a) for a in wave))
-
-            # nếu đã có đủ > limit một chút thì break (để sort đẹp)
-            if len(deals) >= max(q.limit, 10):
-                break
+                yield rows
+                if not more:
+                    return
+        finally:
+            if pending is not None:
+                pending.cancel()
+                # Lấy kết quả (kể cả lỗi) để không có "Task exception was never retrieved"
+                with contextlib.suppress(Exception, asyncio.CancelledError):
+                    await pending
+
+    async def iter_deals(self, q: DealsQuery, want: Optional[int] = None) -> AsyncIterator[Deal]:
+        """
+        Yield qualifying deals page by page and stop once `want` (default:
+        max(limit, 10), enough headroom to rank) have been produced. Order is
+        arrival order; callers rank.
+        """
+        want = want or max(q.limit, 10)
+        produced = 0
+        seen: set[int] = set()
+        pages = self.iter_search_pages(q, want_rows=want)
+        try:
+            async for rows in pages:
+                rows = [r for r in rows if r.appid not in seen]
+                seen.update(r.appid for r in rows)
+                need = want - produced
+
+                if self._mode == MODE_SEARCH:
+                    for d in await self._deals_from_search(rows, q, need):
+                        yield d
+                        produced += 1
+                else:
+                    stream = self._stream_appdetails(appids_from_rows(rows), q, need)
+                    try:
+                        async for d in stream:
+                            yield d
+                            produced += 1
+                            if produced >= want:
+                                break
+                    finally:
+                        await stream.aclose()
+
+                if produced >= want:
+                    return
+        finally:
+            await pages.aclose()
+
+    def stats(self) -> dict[str, object]:
+        return {
+            "mode": self._mode,
+            "search_pages": self.search_pages,
+            "parse_ms": round(self.parse_seconds * 1000, 1),
+            "hedged": self.hedged_count,
+            "deadline_misses": self.deadline_misses,
+        }
+
+    async def fetch_deals(self, q: DealsQuery):
+        deals = [d async for d in self.iter_deals(q)]
 
         # sort theo % giảm
         deals.sort(key=lambda d: d.discount_pct, reverse=True)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Protocol, Optional, Sequence
+from typing import AsyncIterator, Iterable, Protocol, Optional, Sequence
 from src.bot.domain.models import Deal
 
 @dataclass(frozen=True)
@@ -15,9 +15,36 @@ class DealsProvider(Protocol):
     async def fetch_deals(self, q: DealsQuery) -> Sequence[Deal]:
         ...
 
+    def iter_deals(self, q: DealsQuery, want: Optional[int] = None) -> AsyncIterator[Deal]:
+        ...
+
 class Cache(Protocol):
     async def get(self, key: str) -> Optional[object]:
         ...
 
     async def set(self, key: str, value: object, ttl_seconds: int) -> None:
-        ...
\ No newline at end of file
+        ...
+
+class AppDetailsStore(Protocol):
+    async def get_many(self, appids: Sequence[int], cc: str, lang: str) -> dict[int, Optional[Deal]]:
+        """
+        Fresh entries only. A value of None is a cached negative result
+        (no price / not discounted); missing appids are unknown or stale.
+        """
+        ...
+
+    async def put(self, appid: int, cc: str, lang: str, deal: Optional[Deal]) -> None:
+        ...
+
+    async def put_many(self, entries: Sequence[tuple[int, Optional[Deal]]], cc: str, lang: str) -> None:
+        ...
+
+class PriceHistory(Protocol):
+    async def record(self, cc: str, deals: Sequence[Deal], observed_at: Optional[float] = None) -> int:
+        """Fold one fetch result (every deal seen, not just the top-N) into the history."""
+        ...
+
+class DealNameIndex(Protocol):
+    def offer(self, deals: Iterable[Deal], seen_at: Optional[float] = None) -> None:
+        """Index names of newly seen deals for search / autocomplete without blocking the event loop."""
+        ...
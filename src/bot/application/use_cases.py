@@ -1,39 +1,363 @@
 from __future__ import annotations
 
+import asyncio
 import json
-from typing import Sequence
+import time
+from dataclasses import dataclass, replace
+from typing import AsyncIterator, Callable, Optional, Sequence
 
-from src.bot.application.ports import DealsProvider, DealsQuery, Cache
+from src.bot.application.ports import DealsProvider, DealsQuery, Cache, DealNameIndex, PriceHistory
 from src.bot.domain.models import Deal
+from src.bot.infrastructure import metrics
 from src.bot.infrastructure.logger import get_logger
 
 log = get_logger(__name__)
 
+CACHE_LOOKUPS = metrics.counter("deals_cache_lookups_total", "Deals cache lookups by result", ("result",))
+FETCHES = metrics.counter("deals_fetches_total", "Provider fetches started, by reason", ("reason",))
+COALESCED = metrics.counter("deals_coalesced_total", "Callers that joined an in-flight fetch")
+
+
+@dataclass(frozen=True)
+class _CachedDeals:
+    deals: list[Deal]  # đã rank theo % giảm
+    fetched_at: float
+    limit: int  # limit của lần fetch tạo ra entry này
+
+    def covers(self, limit: int) -> bool:
+        # Ít deal hơn limit đã xin -> list đã đủ cho mọi limit lớn hơn
+        return limit <= self.limit or len(self.deals) < self.limit
+
+
+_DONE = object()
+
+
+class _InflightFetch:
+    """One shared provider fetch plus the deals it has produced so far."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.task: asyncio.Task | None = None
+        self.seen: list[Deal] = []
+        self._listeners: set[asyncio.Queue] = set()
+
+    def publish(self, deal: Deal) -> None:
+        self.seen.append(deal)
+        for listener in self._listeners:
+            listener.put_nowait(deal)
+
+    def subscribe(self) -> asyncio.Queue:
+        # Late joiners get a replay of what already arrived
+        listener: asyncio.Queue = asyncio.Queue()
+        for d in self.seen:
+            listener.put_nowait(d)
+        if self.task is not None and self.task.done():
+            listener.put_nowait(_DONE)
+        self._listeners.add(listener)
+        return listener
+
+    def unsubscribe(self, listener: asyncio.Queue) -> None:
+        self._listeners.discard(listener)
+
+    def finish(self) -> None:
+        for listener in self._listeners:
+            listener.put_nowait(_DONE)
+
+
+@dataclass
+class _HotKey:
+    query: DealsQuery
+    last_access: float
+    hits: int = 0
+
+
 class GetDealsUseCase:
-    def __init__(self, provider: DealsProvider, cache: Cache, cache_ttl_seconds: int = 900):
+    """
+    Cached deal lookup.
+
+    - `cache_ttl_seconds` is the soft TTL: younger entries are served as-is.
+    - `stale_ttl_seconds` is the hard TTL: between soft and hard the stale list
+      is served immediately and a background refresh is started.
+    - keys read at least `hot_min_hits` times and not idle for longer than
+      `hot_window_seconds` are refreshed ahead of the soft TTL by a periodic
+      refresher.
+    - `limit` is not part of the cache key: one ranked list of at least
+      `min_fetch_limit` deals is cached per (tags, cc, lang, only_discounted)
+      and smaller limits are served by slicing it. A larger limit than the
+      cached entry covers widens the fetch and replaces the entry.
+    - every fetched deal (before the `limit` cut) is recorded in the optional
+      `price_history` and `name_index`.
+    """
+
+    def __init__(
+        self,
+        provider: DealsProvider,
+        cache: Cache,
+        cache_ttl_seconds: int = 900,
+        *,
+        stale_ttl_seconds: int = 0,
+        refresh_interval_seconds: float = 0,
+        refresh_ahead_ratio: float = 0.8,
+        hot_min_hits: int = 2,
+        hot_window_seconds: float = 3600,
+        clock: Callable[[], float] = time.monotonic,
+        price_history: Optional[PriceHistory] = None,
+        min_fetch_limit: int = 0,
+        name_index: Optional[DealNameIndex] = None,
+    ):
         self._provider = provider
         self._cache = cache
+        self._price_history = price_history
+        self._min_fetch_limit = min_fetch_limit
+        self._name_index = name_index
         self._ttl = cache_ttl_seconds
+        self._hard_ttl = max(cache_ttl_seconds, stale_ttl_seconds)
+        self._refresh_interval = refresh_interval_seconds
+        self._refresh_ahead_ratio = refresh_ahead_ratio
+        self._hot_min_hits = hot_min_hits
+        self._hot_window = hot_window_seconds
+        self._clock = clock
+
+        # Single-flight: key -> task đang fetch, các caller cùng key chờ chung 1 task
+        self._inflight: dict[str, _InflightFetch] = {}
+        self.coalesced_count = 0
+        self.stale_served_count = 0
+        self.refresh_count = 0
+        self.widen_count = 0
+
+        self._hot: dict[str, _HotKey] = {}
+        self._refresher: asyncio.Task | None = None
 
     def _cache_key(self, q: DealsQuery) -> str:
+        # Không có limit: mọi limit dùng chung 1 entry
         payload = {
-            "tag_ids": list(q.tag_ids),
+            "tag_ids": sorted(set(q.tag_ids)),
             "only_discounted": q.only_discounted,
-            "limit": q.limit,
             "cc": q.country_code,
             "lang": q.language,
         }
         return "deals:" + json.dumps(payload, sort_keys=True)
 
+    def _fetch_query(self, q: DealsQuery, limit: int) -> DealsQuery:
+        return replace(q, tag_ids=tuple(sorted(set(q.tag_ids))), limit=max(limit, q.limit, self._min_fetch_limit))
+
+    async def _fetch_and_store(self, key: str, q: DealsQuery, flight: _InflightFetch) -> Sequence[Deal]:
+        started = self._clock()
+        deals: list[Deal] = []
+        with metrics.span("deals.fetch"):
+            async for d in self._provider.iter_deals(q):
+                deals.append(d)
+                flight.publish(d)
+
+        if self._price_history is not None:
+            try:
+                await self._price_history.record(q.country_code, deals)
+            except Exception as e:
+                # Lịch sử giá chỉ là phụ: không làm hỏng lần fetch
+                log.warning("Price history record failed cc=%s err=%s", q.country_code, e)
+        if self._name_index is not None:
+            self._name_index.offer(deals)
+
+        # Giống fetch_deals: sort theo % giảm rồi cắt theo limit
+        deals.sort(key=lambda d: d.discount_pct, reverse=True)
+        deals = deals[: q.limit]
+
+        # Một fetch rộng hơn bắt đầu sau và đã xong trước -> đừng ghi đè entry của nó
+        current = await self._cache.get(key)
+        if isinstance(current, _CachedDeals) and current.limit > q.limit and current.fetched_at >= started:
+            return deals
+        await self._cache.set(key, _CachedDeals(deals, self._clock(), q.limit), ttl_seconds=self._hard_ttl)
+        log.debug("Cache SET key=%s ttl=%ds/%ds items=%d limit=%d",
+                  key, self._ttl, self._hard_ttl, len(deals), q.limit)
+        return deals
+
+    def _on_fetch_done(self, key: str, flight: _InflightFetch) -> None:
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+        flight.finish()
+        # Mark the exception as retrieved: every waiter already got it via await
+        task = flight.task
+        if task is not None and not task.cancelled():
+            task.exception()
+
+    def _start_fetch(self, key: str, q: DealsQuery, reason: str = "miss",
+                     limit: int = 0) -> tuple[_InflightFetch, bool]:
+        fq = self._fetch_query(q, limit)
+        flight = self._inflight.get(key)
+        if flight is not None and flight.limit >= fq.limit:
+            return flight, False
+        if flight is not None:
+            # Fetch đang chạy hẹp hơn limit cần -> fetch rộng hơn thay chỗ nó
+            reason = "widen"
+        if reason == "widen":
+            self.widen_count += 1
+        FETCHES.inc(reason=reason)
+        flight = _InflightFetch(fq.limit)
+        flight.task = asyncio.create_task(self._fetch_and_store(key, fq, flight), name=f"fetch {key} limit={fq.limit}")
+        self._inflight[key] = flight
+        flight.task.add_done_callback(lambda _t, k=key, f=flight: self._on_fetch_done(k, f))
+        return flight, True
+
+    async def _fetch_shared(self, key: str, q: DealsQuery, reason: str = "miss") -> Sequence[Deal]:
+        """
+        Run at most one provider fetch per key. Concurrent callers await the
+        same task; shield() keeps one caller's cancellation (e.g. a timed-out
+        interaction) from cancelling the fetch the others are waiting on.
+        """
+        flight, started = self._start_fetch(key, q, reason=reason)
+        if not started:
+            self.coalesced_count += 1
+            COALESCED.inc()
+            log.debug("Coalesced fetch key=%s coalesced_total=%d", key, self.coalesced_count)
+        return await asyncio.shield(flight.task)
+
+    def _refresh_in_background(self, key: str, q: DealsQuery, reason: str, limit: int = 0) -> None:
+        flight, started = self._start_fetch(key, q, reason=reason, limit=limit)
+        if not started:
+            return
+        self.refresh_count += 1
+        log.debug("Background refresh (%s) key=%s", reason, key)
+
+        def _log_failure(t: asyncio.Task) -> None:
+            if not t.cancelled() and t.exception() is not None:
+                log.warning("Background refresh failed key=%s err=%r", key, t.exception())
+
+        flight.task.add_done_callback(_log_failure)
+
+    def _touch(self, key: str, q: DealsQuery) -> None:
+        hot = self._hot.get(key)
+        if hot is None:
+            hot = self._hot[key] = _HotKey(query=q, last_access=self._clock())
+        hot.last_access = self._clock()
+        hot.hits += 1
+        if q.limit > hot.query.limit:
+            hot.query = q  # refresh-ahead giữ limit lớn nhất từng được hỏi
+
+    async def _lookup_cached(self, key: str, q: DealsQuery) -> tuple[list[Deal] | None, str]:
+        """(deals, "") on a hit; (None, fetch reason) when the caller has to fetch."""
+        cached = await self._cache.get(key)
+        if not isinstance(cached, _CachedDeals):
+            CACHE_LOOKUPS.inc(result="miss")
+            log.debug("Cache MISS key=%s", key)
+            return None, "miss"
+        if not cached.covers(q.limit):
+            # Entry hẹp hơn limit được hỏi -> caller fetch rộng hơn
+            CACHE_LOOKUPS.inc(result="narrow")
+            log.debug("Cache NARROW key=%s cached_limit=%d limit=%d", key, cached.limit, q.limit)
+            return None, "widen"
+
+        age = self._clock() - cached.fetched_at
+        if age < self._ttl:
+            CACHE_LOOKUPS.inc(result="hit")
+            log.debug("Cache HIT key=%s items=%d age=%.0fs", key, len(cached.deals), age)
+            return cached.deals[: q.limit], ""
+
+        # Soft TTL đã qua nhưng chưa tới hard TTL -> trả data cũ ngay, refresh nền
+        self.stale_served_count += 1
+        CACHE_LOOKUPS.inc(result="stale")
+        log.debug("Cache STALE key=%s items=%d age=%.0fs", key, len(cached.deals), age)
+        self._refresh_in_background(key, q, reason="stale", limit=cached.limit)
+        return cached.deals[: q.limit], ""
+
     async def execute(self, q: DealsQuery) -> Sequence[Deal]:
+        self._ensure_refresher()
         key = self._cache_key(q)
-        cached = await self._cache.get(key)
-        if isinstance(cached, list) and all(isinstance(x, Deal) for x in cached):
-            log.debug("Cache HIT key=%s items=%d", key, len(cached))
+        self._touch(key, q)
+
+        cached, reason = await self._lookup_cached(key, q)
+        if cached is not None:
             return cached
+        deals = await self._fetch_shared(key, q, reason)
+        return deals[: q.limit]
 
-        log.debug("Cache MISS key=%s", key)
-        deals = await self._provider.fetch_deals(q)
-        await self._cache.set(key, deals, ttl_seconds=self._ttl)
-        log.debug("Cache SET key=%s ttl=%ds items=%d", key, self._ttl, len(deals))
-        return deals
+    async def stream(self, q: DealsQuery) -> AsyncIterator[Deal]:
+        """
+        Like `execute`, but yields deals as the provider produces them
+        (arrival order, possibly more than `q.limit`). Ranking the yielded
+        deals by discount and keeping `q.limit` gives the `execute` result.
+        A cancelled consumer only unsubscribes; the shared fetch keeps going.
+        """
+        self._ensure_refresher()
+        key = self._cache_key(q)
+        self._touch(key, q)
+
+        cached, reason = await self._lookup_cached(key, q)
+        if cached is not None:
+            for d in cached:
+                yield d
+            return
+
+        flight, started = self._start_fetch(key, q, reason=reason)
+        if not started:
+            self.coalesced_count += 1
+            COALESCED.inc()
+            log.debug("Coalesced stream key=%s coalesced_total=%d", key, self.coalesced_count)
+
+        listener = flight.subscribe()
+        try:
+            while True:
+                item = await listener.get()
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            flight.unsubscribe(listener)
+
+        # Propagate provider errors to the streaming caller
+        await asyncio.shield(flight.task)
+
+    async def refresh_hot_keys(self) -> int:
+        """
+        Refresh hot keys whose entry is past `refresh_ahead_ratio` of the soft
+        TTL, and forget keys nobody asked for within the hot window.
+        """
+        now = self._clock()
+        started = 0
+        for key, hot in list(self._hot.items()):
+            if now - hot.last_access > self._hot_window:
+                del self._hot[key]
+                continue
+            if hot.hits < self._hot_min_hits:
+                continue
+
+            cached = await self._cache.get(key)
+            age = now - cached.fetched_at if isinstance(cached, _CachedDeals) else None
+            if age is None or age >= self._ttl * self._refresh_ahead_ratio:
+                limit = cached.limit if isinstance(cached, _CachedDeals) else 0
+                self._refresh_in_background(key, hot.query, reason="refresh-ahead", limit=limit)
+                started += 1
+        return started
+
+    def _ensure_refresher(self) -> None:
+        # Start lazily: the use case is built before the event loop runs
+        if self._refresh_interval <= 0 or (self._refresher is not None and not self._refresher.done()):
+            return
+        self._refresher = asyncio.get_running_loop().create_task(self._refresh_loop(), name="deals-refresher")
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._refresh_interval)
+            try:
+                n = await self.refresh_hot_keys()
+                if n:
+                    log.info("Refresh-ahead started %d background fetch(es)", n)
+            except Exception as e:
+                log.exception("Refresh-ahead loop error: %s", e)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "inflight": len(self._inflight),
+            "hot_keys": len(self._hot),
+            "coalesced": self.coalesced_count,
+            "stale_served": self.stale_served_count,
+            "refreshes": self.refresh_count,
+            "widened": self.widen_count,
+        }
+
+    async def close(self) -> None:
+        if self._refresher is not None:
+            self._refresher.cancel()
+            self._refresher = None
+        for flight in list(self._inflight.values()):
+            if flight.task is not None:
+                flight.task.cancel()
@@ -1,14 +1,95 @@
+import re
+import sys
 from dataclasses import dataclass
 from typing import Optional, Sequence
 
+from src.bot.domain.prices import currency_from_text, parse_price_minor
 
-@dataclass(frozen=True)
+STEAM_APP_URL = "https://store.steampowered.com/app/{appid}/"
+STEAM_HEADER_IMAGE_URL = "https://cdn.akamai.steamstatic.com/steam/apps/{appid}/header.jpg"
+
+# Header chuẩn theo appid -> không cần lưu URL, suy ra được; chỉ giữ ?t=... (cache-buster của CDN)
+_DEFAULT_HEADER_RE = re.compile(r"^https://[^/]+/(?:store_item_assets/)?steam/apps/(\d+)/header\.jpg(?:\?t=(\d+))?$")
+
+
+def parse_country_code(raw: str) -> str:
+    """Normalize a Steam region code ("VN " -> "vn"); ValueError unless it is two ASCII letters."""
+    cc = raw.strip().lower()
+    if not (len(cc) == 2 and cc.isascii() and cc.isalpha()):
+        raise ValueError(f"Invalid country code: {raw!r}")
+    return cc
+
+
+def _intern(s: Optional[str]) -> Optional[str]:
+    # Giá hiển thị / mã tiền tệ lặp lại rất nhiều giữa các deal -> dùng chung 1 object
+    return sys.intern(s) if s else s
+
+
+@dataclass(frozen=True, slots=True)
 class Deal:
+    """
+    One discounted app. Prices are kept both as integers in minor units
+    (value * 100, as in Steam's price_overview) for sorting / filtering and as
+    the display strings Steam formatted. `url` and `image_url` are derived
+    from `appid`; `image` is only stored when the header is not the default one,
+    otherwise just its `?t=` version (`image_t`) is kept.
+    Build instances with `Deal.create` so prices are parsed and strings interned.
+    """
+
     appid: int
     name: str
     discount_pct: int
-    price_final: str
-    price_original: Optional[str]
-    url: str
-    image_url: Optional[str] = None
-    tags: Sequence[str] = ()
+    final_minor: Optional[int] = None  # None = không parse được (Free, ...)
+    original_minor: Optional[int] = None
+    currency: str = ""  # ISO 4217, "" = không rõ
+    price_final: str = ""
+    price_original: Optional[str] = None
+    image: Optional[str] = None
+    image_t: Optional[int] = None  # ?t=... của header mặc định
+    tags: tuple[str, ...] = ()
+
+    @property
+    def url(self) -> str:
+        return STEAM_APP_URL.format(appid=self.appid)
+
+    @property
+    def image_url(self) -> str:
+        if self.image:
+            return self.image
+        url = STEAM_HEADER_IMAGE_URL.format(appid=self.appid)
+        return url if self.image_t is None else f"{url}?t={self.image_t}"
+
+    @staticmethod
+    def create(
+        appid: int,
+        name: str,
+        discount_pct: int,
+        price_final: str,
+        price_original: Optional[str] = None,
+        *,
+        final_minor: Optional[int] = None,
+        original_minor: Optional[int] = None,
+        currency: str = "",
+        image_url: Optional[str] = None,
+        tags: Sequence[str] = (),
+    ) -> "Deal":
+        """Build a Deal from Steam's display prices; numeric fields given by the caller win over parsing."""
+        image_t = None
+        if image_url:
+            m = _DEFAULT_HEADER_RE.match(image_url)
+            if m and int(m.group(1)) == appid:
+                image_url = None
+                image_t = int(m.group(2)) if m.group(2) else None
+        return Deal(
+            appid=appid,
+            name=name,
+            discount_pct=discount_pct,
+            final_minor=final_minor if final_minor is not None else parse_price_minor(price_final),
+            original_minor=original_minor if original_minor is not None else parse_price_minor(price_original),
+            currency=_intern(currency or currency_from_text(price_final or price_original)),
+            price_final=_intern(price_final),
+            price_original=_intern(price_original),
+            image=image_url or None,
+            image_t=image_t,
+            tags=tuple(_intern(t) for t in tags),
+        )
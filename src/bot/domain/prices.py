@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Optional
+
+_NUMBER_RE = re.compile(r"\d[\d.,'\s]*")
+_SPACE_RE = re.compile(r"[\s']")
+_SEP_RE = re.compile(r"[.,]")
+
+
+# Cùng một chuỗi giá lặp lại ở rất nhiều deal -> cache kết quả parse
+@lru_cache(maxsize=4096)
+def parse_price_minor(text: Optional[str]) -> Optional[int]:
+    """
+    Parse a Steam-formatted price into minor units (value * 100, the unit
+    Steam's price_overview uses for every currency):
+
+        "123.000₫" -> 12300000, "$19.99" -> 1999, "19,99€" -> 1999,
+        "1.234,56 zł" -> 123456, "¥ 1,200" -> 120000
+
+    The last '.'/',' is a decimal point only when 1-2 digits follow it;
+    otherwise separators are grouping. Returns None when no number is found
+    ("Free", "").
+    """
+    if not text:
+        return None
+    m = _NUMBER_RE.search(text)
+    if not m:
+        return None
+    raw = _SPACE_RE.sub("", m.group(0)).rstrip(".,")
+    if not raw:
+        return None
+
+    cut = max(raw.rfind("."), raw.rfind(","))
+    if cut >= 0 and 1 <= len(raw) - cut - 1 <= 2:
+        whole, frac = raw[:cut], raw[cut + 1:]
+    else:
+        whole, frac = raw, ""
+    whole = _SEP_RE.sub("", whole) or "0"
+    return int(whole) * 100 + int(frac.ljust(2, "0") or 0)
+
+
+# Ký hiệu Steam dùng khi format giá -> mã ISO 4217. Ký hiệu dài khớp trước
+# ("CDN$" trước "$"); "$" trơn là USD, "¥" trơn là JPY (CNY cũng dùng "¥").
+_CURRENCY_SYMBOLS = {
+    "CDN$": "CAD", "A$": "AUD", "NZ$": "NZD", "S$": "SGD", "HK$": "HKD", "NT$": "TWD",
+    "Mex$": "MXN", "R$": "BRL", "CLP$": "CLP", "COL$": "COP", "$U": "UYU", "S/.": "PEN",
+    "Rp": "IDR", "RM": "MYR", "CHF": "CHF", "AED": "AED", "SR": "SAR", "QR": "QAR", "KD": "KWD",
+    "zł": "PLN", "kr": "NOK", "₫": "VND", "€": "EUR", "£": "GBP", "₩": "KRW", "₽": "RUB",
+    "₱": "PHP", "฿": "THB", "₹": "INR", "₺": "TRY", "₴": "UAH", "₸": "KZT", "₪": "ILS",
+    "₡": "CRC", "¥": "JPY", "$": "USD",
+}
+_CURRENCY_RE = re.compile("|".join(re.escape(s) for s in sorted(_CURRENCY_SYMBOLS, key=len, reverse=True)))
+
+
+@lru_cache(maxsize=1024)
+def currency_from_text(text: Optional[str]) -> str:
+    """ISO currency code guessed from a formatted price ("123.000₫" -> "VND"); "" if unknown."""
+    if not text:
+        return ""
+    m = _CURRENCY_RE.search(text)
+    return _CURRENCY_SYMBOLS[m.group(0)] if m else ""
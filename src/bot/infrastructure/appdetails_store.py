@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import json
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from typing import Optional, Sequence
+
+from src.bot.domain.models import Deal
+from src.bot.infrastructure.logger import get_logger
+
+log = get_logger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS appdetails (
+    appid      INTEGER NOT NULL,
+    cc         TEXT    NOT NULL,
+    lang       TEXT    NOT NULL,
+    deal_json  TEXT,              -- NULL = negative result
+    expires_at REAL    NOT NULL,  -- unix time, must survive restarts
+    PRIMARY KEY (appid, cc, lang)
+) WITHOUT ROWID
+"""
+
+# SQLite giới hạn số biến trong 1 câu lệnh -> chia nhỏ IN (...)
+_MAX_VARS = 500
+
+
+def _deal_to_json(deal: Deal) -> str:
+    return json.dumps(dataclasses.asdict(deal), ensure_ascii=False, separators=(",", ":"))
+
+
+def _deal_from_json(raw: str) -> Deal:
+    data = json.loads(raw)
+    if "url" in data or "image_url" in data:
+        # Row ghi trước khi Deal có giá dạng số: parse lại từ chuỗi hiển thị
+        return Deal.create(
+            appid=data["appid"],
+            name=data["name"],
+            discount_pct=data["discount_pct"],
+            price_final=data.get("price_final") or "",
+            price_original=data.get("price_original"),
+            image_url=data.get("image_url"),
+            tags=data.get("tags") or (),
+        )
+    data["tags"] = tuple(data.get("tags") or ())
+    for key in ("currency", "price_final", "price_original"):
+        if isinstance(data.get(key), str):
+            data[key] = sys.intern(data[key])
+    return Deal(**data)
+
+
+class SqliteAppDetailsStore:
+    """
+    On-disk appdetails results keyed by (appid, cc, lang).
+
+    Positive results (a discounted `Deal`) and negative results (no price or
+    0% discount) get separate TTLs, each spread by +/- `jitter_ratio` so a
+    warm cache does not expire all at once. sqlite3 is blocking, so every call
+    runs in a worker thread behind a lock.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        positive_ttl_seconds: int = 1800,
+        negative_ttl_seconds: int = 6 * 3600,
+        jitter_ratio: float = 0.1,
+    ):
+        self._positive_ttl = positive_ttl_seconds
+        self._negative_ttl = negative_ttl_seconds
+        self._jitter = max(0.0, min(jitter_ratio, 0.9))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(_SCHEMA)
+            removed = self._conn.execute("DELETE FROM appdetails WHERE expires_at < ?", (time.time(),)).rowcount
+        count = self._conn.execute("SELECT COUNT(*) FROM appdetails").fetchone()[0]
+        log.info("Appdetails store path=%s warm_entries=%d pruned=%d", path, count, removed)
+
+    def _expires_at(self, positive: bool) -> float:
+        ttl = self._positive_ttl if positive else self._negative_ttl
+        return time.time() + ttl * (1 + random.uniform(-self._jitter, self._jitter))
+
+    def _get_many_sync(self, appids: Sequence[int], cc: str, lang: str) -> dict[int, Optional[Deal]]:
+        out: dict[int, Optional[Deal]] = {}
+        now = time.time()
+        ids = list(dict.fromkeys(appids))
+        with self._lock:
+            for i in range(0, len(ids), _MAX_VARS):
+                chunk = ids[i:i + _MAX_VARS]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT appid, deal_json FROM appdetails "
+                    f"WHERE cc = ? AND lang = ? AND expires_at > ? AND appid IN ({marks})",
+                    (cc, lang, now, *chunk),
+                ).fetchall()
+                for appid, raw in rows:
+                    try:
+                        out[appid] = _deal_from_json(raw) if raw is not None else None
+                    except (ValueError, TypeError) as e:
+                        log.debug("Appdetails store bad row appid=%s err=%s", appid, e)
+        return out
+
+    def _put_many_sync(self, entries: Sequence[tuple[int, Optional[Deal]]], cc: str, lang: str) -> None:
+        rows = [
+            (appid, cc, lang, _deal_to_json(deal) if deal is not None else None, self._expires_at(deal is not None))
+            for appid, deal in entries
+        ]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO appdetails (appid, cc, lang, deal_json, expires_at) VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+
+    async def get_many(self, appids: Sequence[int], cc: str, lang: str) -> dict[int, Optional[Deal]]:
+        if not appids:
+            return {}
+        out = await asyncio.to_thread(self._get_many_sync, appids, cc, lang)
+        # Đếm trên event loop: các worker thread chạy song song, += không atomic
+        self.hits += len(out)
+        self.misses += len(set(appids)) - len(out)
+        return out
+
+    async def put(self, appid: int, cc: str, lang: str, deal: Optional[Deal]) -> None:
+        await asyncio.to_thread(self._put_many_sync, [(appid, deal)], cc, lang)
+
+    async def put_many(self, entries: Sequence[tuple[int, Optional[Deal]]], cc: str, lang: str) -> None:
+        if entries:
+            await asyncio.to_thread(self._put_many_sync, entries, cc, lang)
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def _close_sync(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    async def close(self) -> None:
+        # Lock có thể đang bị worker giữ giữa một truy vấn: chờ nó trong thread, không chặn loop
+        await asyncio.to_thread(self._close_sync)
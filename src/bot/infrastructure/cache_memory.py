@@ -1,20 +1,166 @@
 from __future__ import annotations
+
+import asyncio
+import sys
 import time
-from typing import Optional
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from src.bot.infrastructure.logger import get_logger
+
+log = get_logger(__name__)
+
+
+def approx_size(obj: object, _seen: Optional[set[int]] = None) -> int:
+    """
+    Rough deep size in bytes (containers, dataclass/__slots__ objects).
+    Only used for the cache byte budget, so it errs on cheap over exact.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        return size + sum(approx_size(k, _seen) + approx_size(v, _seen) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(approx_size(x, _seen) for x in obj)
+
+    d = getattr(obj, "__dict__", None)
+    if d is not None:
+        size += approx_size(d, _seen)
+    for cls in type(obj).__mro__:
+        for name in getattr(cls, "__slots__", ()):
+            if hasattr(obj, name):
+                size += approx_size(getattr(obj, name), _seen)
+    return size
+
+
+@dataclass
+class _Entry:
+    expires_at: float
+    value: object
+    size: int
+
 
 class MemoryCache:
-    def __init__(self):
-        self._store: dict[str, tuple[float, object]] = {}
+    """
+    In-process LRU + TTL cache implementing the `Cache` port.
+
+    - bounded by entry count and by an approximate byte budget (0 = no byte limit)
+    - least recently used entries are evicted first
+    - expiry uses a monotonic clock; a background sweeper drops expired keys
+      that nobody reads again
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 256,
+        max_bytes: int = 32 * 1024 * 1024,
+        sweep_interval_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._store: OrderedDict[str, _Entry] = OrderedDict()
+        self._max_entries = max(1, max_entries)
+        self._max_bytes = max(0, max_bytes)
+        self._sweep_interval = sweep_interval_seconds
+        self._clock = clock
+        self._bytes = 0
+        self._sweeper: asyncio.Task | None = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
 
     async def get(self, key: str) -> Optional[object]:
+        self._ensure_sweeper()
         item = self._store.get(key)
-        if not item:
+        if item is None:
+            self.misses += 1
             return None
-        expires_at, value = item
-        if time.time() > expires_at:
-            self._store.pop(key, None)
+        if self._clock() >= item.expires_at:
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
             return None
-        return value
+        self._store.move_to_end(key)
+        self.hits += 1
+        return item.value
 
     async def set(self, key: str, value: object, ttl_seconds: int) -> None:
-        self._store[key] = (time.time() + ttl_seconds, value)
\ No newline at end of file
+        self._ensure_sweeper()
+        if key in self._store:
+            self._remove(key)
+
+        size = approx_size(key) + approx_size(value)
+        if self._max_bytes and size > self._max_bytes:
+            log.warning("Cache value too large key=%s bytes=%d budget=%d -> not cached", key, size, self._max_bytes)
+            return
+
+        self._store[key] = _Entry(self._clock() + ttl_seconds, value, size)
+        self._bytes += size
+        self._evict()
+
+    async def delete(self, key: str) -> None:
+        if key in self._store:
+            self._remove(key)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._store),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def sweep(self) -> int:
+        now = self._clock()
+        expired = [k for k, e in self._store.items() if now >= e.expires_at]
+        for k in expired:
+            self._remove(k)
+        self.expirations += len(expired)
+        return len(expired)
+
+    async def close(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+
+    def _remove(self, key: str) -> None:
+        entry = self._store.pop(key)
+        self._bytes -= entry.size
+
+    def _evict(self) -> None:
+        while self._store and (
+            len(self._store) > self._max_entries
+            or (self._max_bytes and self._bytes > self._max_bytes)
+        ):
+            key, entry = self._store.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+            log.debug("Cache EVICT key=%s bytes=%d", key, entry.size)
+
+    def _ensure_sweeper(self) -> None:
+        # Start lazily: the cache is built before the event loop runs
+        if self._sweep_interval <= 0 or (self._sweeper is not None and not self._sweeper.done()):
+            return
+        try:
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep_loop(), name="cache-sweeper")
+        except RuntimeError:
+            pass
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._sweep_interval)
+            n = self.sweep()
+            if n:
+                log.debug("Cache sweep expired=%d stats=%s", n, self.stats())
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional, Sequence
+
+from src.bot.application.ports import DealsQuery, PriceHistory
+from src.bot.adapters.outbound.steam_parser import SearchRow, deals_from_rows
+from src.bot.adapters.outbound.steam_store_provider import SteamStoreDealsProvider
+from src.bot.domain.models import Deal
+from src.bot.infrastructure import metrics
+from src.bot.infrastructure.logger import get_logger
+from src.bot.infrastructure.name_index import NameIndex
+
+log = get_logger(__name__)
+
+CRAWLS = metrics.counter("catalog_crawls_total", "Catalog crawls by outcome", ("outcome",))
+CRAWL_SECONDS = metrics.histogram("catalog_crawl_seconds", "Full catalog crawl duration",
+                                  buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800))
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """
+    Immutable index over one crawl of the discounted catalog. Rankings are
+    precomputed (best discount first, then appid), so a query is a walk over
+    the shortest tag list until `limit` matches are found.
+    """
+
+    cc: str
+    lang: str
+    built_at: float  # unix time
+    complete: bool  # False khi crawl bị cắt bởi max_pages
+    deals: dict[int, Deal]
+    ranked: tuple[int, ...]
+    by_tag: dict[int, tuple[int, ...]]
+    tag_sets: dict[int, frozenset[int]]
+
+    @staticmethod
+    def build(cc: str, lang: str, rows: Iterable[SearchRow], *, built_at: float, complete: bool) -> "CatalogSnapshot":
+        unique: dict[int, SearchRow] = {}
+        for r in rows:
+            unique.setdefault(r.appid, r)  # trang sau có thể lặp lại row (giá đổi giữa 2 trang)
+        deals = {d.appid: d for d in deals_from_rows(list(unique.values()))}
+        ranked = tuple(sorted(deals, key=lambda a: (-deals[a].discount_pct, a)))
+
+        tagged: dict[int, list[int]] = {}
+        for appid in ranked:
+            for tag in unique[appid].tag_ids:
+                tagged.setdefault(tag, []).append(appid)
+        return CatalogSnapshot(
+            cc=cc,
+            lang=lang,
+            built_at=built_at,
+            complete=complete,
+            deals=deals,
+            ranked=ranked,
+            by_tag={t: tuple(ids) for t, ids in tagged.items()},
+            tag_sets={t: frozenset(ids) for t, ids in tagged.items()},
+        )
+
+    def query(self, tag_ids: Sequence[int], limit: int) -> list[Deal]:
+        """Deals carrying every tag in `tag_ids` (Steam's AND semantics), best discount first."""
+        tags = sorted(set(tag_ids))
+        if not tags:
+            return [self.deals[a] for a in self.ranked[:limit]]
+        if any(t not in self.by_tag for t in tags):
+            return []
+        # Duyệt list ngắn nhất theo thứ tự rank, các tag còn lại chỉ check membership
+        base = min(tags, key=lambda t: len(self.by_tag[t]))
+        others = [self.tag_sets[t] for t in tags if t != base]
+        out: list[Deal] = []
+        for appid in self.by_tag[base]:
+            if all(appid in s for s in others):
+                out.append(self.deals[appid])
+                if len(out) >= limit:
+                    break
+        return out
+
+
+class CatalogIndexer:
+    """
+    Background crawler: every `refresh_seconds` it walks all discounted search
+    results (tags unset, `page_size` rows per page, at most `max_pages`)
+    through the provider's paged search and swaps in a new CatalogSnapshot.
+    Readers always see a whole snapshot; a failed crawl keeps the old one.
+    Crawled deals also feed the price history and the name index (a complete
+    crawl prunes names that are no longer discounted).
+    """
+
+    def __init__(
+        self,
+        provider: SteamStoreDealsProvider,
+        *,
+        cc: str,
+        lang: str,
+        refresh_seconds: float = 3600,
+        max_pages: int = 200,
+        page_size: int = 100,
+        retry_seconds: float = 300,
+        price_history: Optional[PriceHistory] = None,
+        name_index: Optional[NameIndex] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._provider = provider
+        self._cc = cc
+        self._lang = lang
+        self._refresh = refresh_seconds
+        self._max_pages = max(1, max_pages)
+        self._page_size = page_size
+        self._retry = retry_seconds
+        self._price_history = price_history
+        self._name_index = name_index
+        self._clock = clock
+
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._task: Optional[asyncio.Task] = None
+        self._crawling = False
+        self.crawl_count = 0
+        self.last_crawl_seconds = 0.0
+        self.last_error: Optional[str] = None
+
+    @property
+    def snapshot(self) -> Optional[CatalogSnapshot]:
+        return self._snapshot
+
+    def age_seconds(self) -> Optional[float]:
+        return None if self._snapshot is None else max(0.0, self._clock() - self._snapshot.built_at)
+
+    async def crawl(self) -> CatalogSnapshot:
+        q = DealsQuery(tag_ids=(), only_discounted=True, limit=0, country_code=self._cc, language=self._lang)
+        started = time.perf_counter()
+        rows: list[SearchRow] = []
+        pages = 0
+        self._crawling = True
+        try:
+            with metrics.span("catalog.crawl"):
+                it = self._provider.iter_search_pages(q, max_pages=self._max_pages, page_size=self._page_size)
+                try:
+                    async for page in it:
+                        rows.extend(page)
+                        pages += 1
+                finally:
+                    await it.aclose()
+                snap = await asyncio.to_thread(
+                    CatalogSnapshot.build, self._cc, self._lang, rows,
+                    built_at=self._clock(), complete=pages < self._max_pages,
+                )
+        finally:
+            self._crawling = False
+
+        self._snapshot = snap
+        self.crawl_count += 1
+        self.last_crawl_seconds = time.perf_counter() - started
+        CRAWL_SECONDS.observe(self.last_crawl_seconds)
+        log.info("Catalog crawl cc=%s pages=%d rows=%d deals=%d tags=%d in %.1fs%s",
+                 self._cc, pages, len(rows), len(snap.deals), len(snap.by_tag), self.last_crawl_seconds,
+                 "" if snap.complete else " (max_pages reached)")
+
+        if self._price_history is not None:
+            try:
+                await self._price_history.record(self._cc, list(snap.deals.values()))
+            except Exception as e:
+                log.warning("Price history record failed cc=%s err=%s", self._cc, e)
+        if self._name_index is not None:
+            # Lần đầu có thể là hàng chục nghìn tên -> index ngoài event loop
+            await asyncio.to_thread(self._name_index.add_many, snap.deals.values())
+            if snap.complete:
+                await asyncio.to_thread(self._name_index.retain, snap.deals.keys())
+        return snap
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="catalog-indexer")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.crawl()
+                CRAWLS.inc(outcome="ok")
+                self.last_error = None
+                delay = self._refresh
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                CRAWLS.inc(outcome="error")
+                self.last_error = f"{type(e).__name__}: {e}"
+                log.warning("Catalog crawl failed, keeping previous index: %s", self.last_error)
+                delay = min(self._refresh, self._retry)
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict[str, object]:
+        snap = self._snapshot
+        age = self.age_seconds()
+        return {
+            "deals": len(snap.deals) if snap else 0,
+            "tags": len(snap.by_tag) if snap else 0,
+            "complete": snap.complete if snap else False,
+            "age_s": round(age) if age is not None else None,
+            "crawls": self.crawl_count,
+            "crawling": self._crawling,
+            "last_crawl_s": round(self.last_crawl_seconds, 1),
+            "last_error": self.last_error,
+        }
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -11,12 +11,72 @@ class Settings:
     steam_cc: str = "vn"
     steam_lang: str = "english"
     cache_ttl_seconds: int = 900
+    cache_max_entries: int = 256
+    cache_max_bytes: int = 32 * 1024 * 1024
+    cache_sweep_seconds: int = 60
+    cache_stale_ttl_seconds: int = 3600
+    cache_refresh_interval_seconds: int = 60
+    cache_min_fetch_limit: int = 20
     default_limit: int = 10
     metroidvania_tag_id: int = 1628
+    streaming_replies: bool = False
+
+    http_max_attempts: int = 4
+    http_rate_per_second: float = 10.0
+    http_burst: int = 20
+    http_min_concurrency: int = 2
+    http_max_concurrency: int = 16
+    http_retry_budget_ratio: float = 0.2
+    http_breaker_failures: int = 5
+    http_breaker_reset_seconds: float = 30.0
+    http_max_retry_after_seconds: float = 30.0
+    http_pool_size: int = 100
+    http_pool_size_per_host: int = 20
+    http_keepalive_seconds: float = 30.0
+    http_dns_cache_seconds: int = 300
+    http_response_cache_bytes: int = 16 * 1024 * 1024
+    json_codec: str = "auto"
+
+    store_base_url: str = "https://store.steampowered.com"
+    provider_mode: str = "appdetails"
+    search_page_size: int = 50
+    search_max_pages: int = 5
+    appdetails_db_path: str = "data/appdetails.sqlite3"
+    appdetails_positive_ttl_seconds: int = 1800
+    appdetails_negative_ttl_seconds: int = 21600
+    appdetails_ttl_jitter: float = 0.1
+    appdetails_price_batch_size: int = 50
+    appdetails_request_deadline_seconds: float = 10.0
+    appdetails_hedge_delay_seconds: float = 0.0
+
+    parse_offload: str = "thread"
+    parse_offload_workers: int = 2
+    parse_offload_min_bytes: int = 64 * 1024
+    loop_lag_interval_ms: int = 100
+    loop_lag_threshold_ms: int = 250
+
+    profile_dir: str = "data/profiles"
+    profile_default_seconds: int = 30
+    profile_top_n: int = 25
+
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int = 0
+    trace_slow_seconds: float = 2.0
 
     deals_channel_id: int | None = None
     schedule_tz: str = "Asia/Ho_Chi_Minh"
+    schedule_slots: str = "06:00"
+    schedule_prewarm_seconds: int = 120
+    schedule_catchup_seconds: int = 6 * 3600
+    schedule_state_path: str = "data/scheduler_state.json"
+    subscriptions_path: str = "data/subscriptions.json"
+    subscription_fanout_concurrency: int = 5
     daily_post_limit: int = 10
+    price_history_dir: str = "data/price_history"
+    catalog_refresh_seconds: int = 0  # 0 = tắt crawler (opt-in)
+    catalog_max_pages: int = 200
+    catalog_page_size: int = 100
+    schedule_only_new_deals: bool = False
 
     @staticmethod
     def load() -> "Settings":
@@ -32,9 +92,64 @@ class Settings:
             steam_cc=os.getenv("STEAM_CC", "vn"),
             steam_lang=os.getenv("STEAM_LANG", "english"),
             cache_ttl_seconds=int(os.getenv("CACHE_TTL_SECONDS", "900")),
+            cache_max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "256")),
+            cache_max_bytes=int(os.getenv("CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+            cache_sweep_seconds=int(os.getenv("CACHE_SWEEP_SECONDS", "60")),
+            cache_stale_ttl_seconds=int(os.getenv("CACHE_STALE_TTL_SECONDS", "3600")),
+            cache_refresh_interval_seconds=int(os.getenv("CACHE_REFRESH_INTERVAL_SECONDS", "60")),
+            cache_min_fetch_limit=int(os.getenv("CACHE_MIN_FETCH_LIMIT", "20")),
             default_limit=int(os.getenv("DEFAULT_LIMIT", "10")),
             metroidvania_tag_id=int(os.getenv("METROIDVANIA_TAG_ID", "1628")),
+            streaming_replies=os.getenv("DISCORD_STREAMING_REPLIES", "0").strip().lower() in ("1", "true", "yes"),
+            http_max_attempts=int(os.getenv("HTTP_MAX_ATTEMPTS", "4")),
+            http_rate_per_second=float(os.getenv("HTTP_RATE_PER_SECOND", "10")),
+            http_burst=int(os.getenv("HTTP_BURST", "20")),
+            http_min_concurrency=int(os.getenv("HTTP_MIN_CONCURRENCY", "2")),
+            http_max_concurrency=int(os.getenv("HTTP_MAX_CONCURRENCY", "16")),
+            http_retry_budget_ratio=float(os.getenv("HTTP_RETRY_BUDGET_RATIO", "0.2")),
+            http_breaker_failures=int(os.getenv("HTTP_BREAKER_FAILURES", "5")),
+            http_breaker_reset_seconds=float(os.getenv("HTTP_BREAKER_RESET_SECONDS", "30")),
+            http_max_retry_after_seconds=float(os.getenv("HTTP_MAX_RETRY_AFTER_SECONDS", "30")),
+            http_pool_size=int(os.getenv("HTTP_POOL_SIZE", "100")),
+            http_pool_size_per_host=int(os.getenv("HTTP_POOL_SIZE_PER_HOST", "20")),
+            http_keepalive_seconds=float(os.getenv("HTTP_KEEPALIVE_SECONDS", "30")),
+            http_dns_cache_seconds=int(os.getenv("HTTP_DNS_CACHE_SECONDS", "300")),
+            http_response_cache_bytes=int(os.getenv("HTTP_RESPONSE_CACHE_BYTES", str(16 * 1024 * 1024))),
+            json_codec=os.getenv("JSON_CODEC", "auto").strip().lower(),
+            store_base_url=os.getenv("STEAM_STORE_BASE_URL", "https://store.steampowered.com").strip(),
+            provider_mode=os.getenv("STEAM_PROVIDER_MODE", "appdetails").strip().lower(),
+            search_page_size=int(os.getenv("STEAM_SEARCH_PAGE_SIZE", "50")),
+            search_max_pages=int(os.getenv("STEAM_SEARCH_MAX_PAGES", "5")),
+            appdetails_db_path=os.getenv("APPDETAILS_DB_PATH", "data/appdetails.sqlite3").strip(),
+            appdetails_positive_ttl_seconds=int(os.getenv("APPDETAILS_POSITIVE_TTL_SECONDS", "1800")),
+            appdetails_negative_ttl_seconds=int(os.getenv("APPDETAILS_NEGATIVE_TTL_SECONDS", "21600")),
+            appdetails_ttl_jitter=float(os.getenv("APPDETAILS_TTL_JITTER", "0.1")),
+            appdetails_price_batch_size=int(os.getenv("APPDETAILS_PRICE_BATCH_SIZE", "50")),
+            appdetails_request_deadline_seconds=float(os.getenv("APPDETAILS_REQUEST_DEADLINE_SECONDS", "10")),
+            appdetails_hedge_delay_seconds=float(os.getenv("APPDETAILS_HEDGE_DELAY_SECONDS", "0")),
+            parse_offload=os.getenv("PARSE_OFFLOAD", "thread").strip().lower(),
+            parse_offload_workers=int(os.getenv("PARSE_OFFLOAD_WORKERS", "2")),
+            parse_offload_min_bytes=int(os.getenv("PARSE_OFFLOAD_MIN_BYTES", str(64 * 1024))),
+            loop_lag_interval_ms=int(os.getenv("LOOP_LAG_INTERVAL_MS", "100")),
+            loop_lag_threshold_ms=int(os.getenv("LOOP_LAG_THRESHOLD_MS", "250")),
+            profile_dir=os.getenv("PROFILE_DIR", "data/profiles").strip(),
+            profile_default_seconds=int(os.getenv("PROFILE_DEFAULT_SECONDS", "30")),
+            profile_top_n=int(os.getenv("PROFILE_TOP_N", "25")),
+            metrics_host=os.getenv("METRICS_HOST", "127.0.0.1").strip(),
+            metrics_port=int(os.getenv("METRICS_PORT", "0")),
+            trace_slow_seconds=float(os.getenv("TRACE_SLOW_SECONDS", "2")),
             deals_channel_id=deals_channel_id,
             schedule_tz=os.getenv("SCHEDULE_TZ", "Asia/Ho_Chi_Minh"),
+            schedule_slots=os.getenv("SCHEDULE_SLOTS", "06:00").strip(),
+            schedule_prewarm_seconds=int(os.getenv("SCHEDULE_PREWARM_SECONDS", "120")),
+            schedule_catchup_seconds=int(os.getenv("SCHEDULE_CATCHUP_SECONDS", str(6 * 3600))),
+            schedule_state_path=os.getenv("SCHEDULE_STATE_PATH", "data/scheduler_state.json").strip(),
+            subscriptions_path=os.getenv("SUBSCRIPTIONS_PATH", "data/subscriptions.json").strip(),
+            subscription_fanout_concurrency=int(os.getenv("SUBSCRIPTION_FANOUT_CONCURRENCY", "5")),
             daily_post_limit=int(os.getenv("DAILY_POST_LIMIT", "10")),
+            price_history_dir=os.getenv("PRICE_HISTORY_DIR", "data/price_history").strip(),
+            catalog_refresh_seconds=int(os.getenv("CATALOG_REFRESH_SECONDS", "0")),
+            catalog_max_pages=int(os.getenv("CATALOG_MAX_PAGES", "200")),
+            catalog_page_size=int(os.getenv("CATALOG_PAGE_SIZE", "100")),
+            schedule_only_new_deals=os.getenv("SCHEDULE_ONLY_NEW_DEALS", "0").strip().lower() in ("1", "true", "yes"),
         )
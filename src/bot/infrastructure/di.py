@@ -1,19 +1,161 @@
 from __future__ import annotations
 from src.bot.infrastructure.config import Settings
 from src.bot.infrastructure.cache_memory import MemoryCache
-from src.bot.adapters.outbound.http_client import HttpClient
+from src.bot.infrastructure.appdetails_store import SqliteAppDetailsStore
+from src.bot.infrastructure.catalog import CatalogIndexer
+from src.bot.infrastructure import metrics
+from src.bot.infrastructure.loop_monitor import LoopLagMonitor
+from src.bot.infrastructure.name_index import NameIndex
+from src.bot.infrastructure.price_history import PriceHistoryStore
+from src.bot.infrastructure.profiler import OnDemandProfiler
+from src.bot.infrastructure.subscriptions import Subscription, SubscriptionRegistry, parse_slots, slot_label
+from src.bot.adapters.outbound import json_codec
+from src.bot.adapters.outbound.http_client import ConnectionConfig, HttpClient
+from src.bot.adapters.outbound.parse_offload import ParseOffloader
+from src.bot.adapters.outbound.response_cache import ResponseCache
+from src.bot.adapters.outbound.rate_limit import RateLimitConfig
 from src.bot.adapters.outbound.steam_store_provider import SteamStoreDealsProvider
 from src.bot.application.use_cases import GetDealsUseCase
 
 
 def build_container(settings: Settings):
-    cache = MemoryCache()
-    http = HttpClient(user_agent="DiscordSteamDealsBot/1.0")
-    provider = SteamStoreDealsProvider(http=http, concurrency=8)
-    uc = GetDealsUseCase(provider=provider, cache=cache, cache_ttl_seconds=settings.cache_ttl_seconds)
+    json_codec.use_codec(settings.json_codec)
+    metrics.set_slow_trace_threshold(settings.trace_slow_seconds)
+
+    cache = MemoryCache(
+        max_entries=settings.cache_max_entries,
+        max_bytes=settings.cache_max_bytes,
+        sweep_interval_seconds=settings.cache_sweep_seconds,
+    )
+    http = HttpClient(
+        user_agent="DiscordSteamDealsBot/1.0",
+        max_attempts=settings.http_max_attempts,
+        rate_limits=RateLimitConfig(
+            rate_per_second=settings.http_rate_per_second,
+            burst=settings.http_burst,
+            min_concurrency=settings.http_min_concurrency,
+            max_concurrency=settings.http_max_concurrency,
+            breaker_failures=settings.http_breaker_failures,
+            breaker_reset_seconds=settings.http_breaker_reset_seconds,
+            max_retry_after_seconds=settings.http_max_retry_after_seconds,
+        ),
+        retry_budget_ratio=settings.http_retry_budget_ratio,
+        connection=ConnectionConfig(
+            pool_size=settings.http_pool_size,
+            pool_size_per_host=settings.http_pool_size_per_host,
+            keepalive_seconds=settings.http_keepalive_seconds,
+            dns_cache_seconds=settings.http_dns_cache_seconds,
+        ),
+        # HTTP_RESPONSE_CACHE_BYTES=0 -> tắt conditional requests
+        response_cache=ResponseCache(max_bytes=settings.http_response_cache_bytes)
+        if settings.http_response_cache_bytes > 0 else None,
+    )
+
+    # APPDETAILS_DB_PATH rỗng -> tắt store
+    store = None
+    if settings.appdetails_db_path:
+        store = SqliteAppDetailsStore(
+            settings.appdetails_db_path,
+            positive_ttl_seconds=settings.appdetails_positive_ttl_seconds,
+            negative_ttl_seconds=settings.appdetails_negative_ttl_seconds,
+            jitter_ratio=settings.appdetails_ttl_jitter,
+        )
+
+    parse_offloader = ParseOffloader(
+        settings.parse_offload,
+        max_workers=settings.parse_offload_workers,
+        min_bytes=settings.parse_offload_min_bytes,
+    )
+
+    provider = SteamStoreDealsProvider(
+        http=http,
+        concurrency=8,
+        store=store,
+        price_batch_size=settings.appdetails_price_batch_size,
+        request_deadline_seconds=settings.appdetails_request_deadline_seconds,
+        hedge_delay_seconds=settings.appdetails_hedge_delay_seconds,
+        mode=settings.provider_mode,
+        search_page_size=settings.search_page_size,
+        search_max_pages=settings.search_max_pages,
+        store_base_url=settings.store_base_url,
+        parse_offloader=parse_offloader,
+    )
+    # PRICE_HISTORY_DIR rỗng -> không ghi lịch sử giá
+    price_history = PriceHistoryStore(settings.price_history_dir) if settings.price_history_dir else None
+
+    name_index = NameIndex()
+
+    uc = GetDealsUseCase(
+        provider=provider,
+        cache=cache,
+        cache_ttl_seconds=settings.cache_ttl_seconds,
+        stale_ttl_seconds=settings.cache_stale_ttl_seconds,
+        refresh_interval_seconds=settings.cache_refresh_interval_seconds,
+        price_history=price_history,
+        min_fetch_limit=settings.cache_min_fetch_limit,
+        name_index=name_index,
+    )
+    # CATALOG_REFRESH_SECONDS=0 -> không crawl, không có /deals_tag
+    catalog = None
+    if settings.catalog_refresh_seconds > 0:
+        catalog = CatalogIndexer(
+            provider,
+            cc=settings.steam_cc,
+            lang=settings.steam_lang,
+            refresh_seconds=settings.catalog_refresh_seconds,
+            max_pages=settings.catalog_max_pages,
+            page_size=settings.catalog_page_size,
+            price_history=price_history,
+            name_index=name_index,
+        )
+
+    # METRICS_PORT=0 -> không mở endpoint (metrics vẫn có qua /bot_stats)
+    metrics_server = None
+    if settings.metrics_port > 0:
+        metrics_server = metrics.MetricsServer(settings.metrics_host, settings.metrics_port)
+
+    # LOOP_LAG_THRESHOLD_MS=0 -> tắt monitor
+    loop_monitor = None
+    if settings.loop_lag_threshold_ms > 0:
+        loop_monitor = LoopLagMonitor(
+            interval_seconds=settings.loop_lag_interval_ms / 1000,
+            threshold_seconds=settings.loop_lag_threshold_ms / 1000,
+        )
+
+    # DISCORD_DEALS_CHANNEL_ID cũ = 1 subscription mặc định cho mỗi SCHEDULE_SLOTS
+    legacy = []
+    if settings.deals_channel_id:
+        legacy = [
+            Subscription(
+                channel_id=settings.deals_channel_id,
+                slot=slot_label(slot),
+                tag_ids=(settings.metroidvania_tag_id,),
+                country_code=settings.steam_cc,
+                language=settings.steam_lang,
+                limit=max(1, min(settings.daily_post_limit, 20)),
+            )
+            for slot in parse_slots(settings.schedule_slots)
+        ]
+    subscriptions = SubscriptionRegistry(settings.subscriptions_path, defaults=legacy)
+
+    profiler = OnDemandProfiler(
+        settings.profile_dir,
+        default_seconds=settings.profile_default_seconds,
+        top_n=settings.profile_top_n,
+    )
+
     return {
+        "metrics_server": metrics_server,
+        "profiler": profiler,
+        "subscriptions": subscriptions,
+        "loop_monitor": loop_monitor,
+        "parse_offloader": parse_offloader,
         "cache": cache,
         "http": http,
+        "appdetails_store": store,
+        "price_history": price_history,
+        "catalog": catalog,
+        "name_index": name_index,
         "provider": provider,
         "get_deals_uc": uc,
     }
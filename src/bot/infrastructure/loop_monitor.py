@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from src.bot.infrastructure import metrics
+from src.bot.infrastructure.logger import get_logger
+
+log = get_logger(__name__)
+
+LOOP_LAG_SECONDS = metrics.histogram(
+    "event_loop_lag_seconds", "How late the loop-lag probe woke up",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+LOOP_STALLS = metrics.counter("event_loop_stalls_total", "Times the event loop was blocked past the threshold")
+
+
+class LoopLagMonitor:
+    """
+    Event-loop responsiveness monitor.
+
+    A probe task wakes every `interval_seconds` and records how late it was
+    (event_loop_lag_seconds). A watchdog thread checks the probe's heartbeat;
+    once the loop has not ticked for `threshold_seconds`, it samples the loop
+    thread's stack with sys._current_frames() — i.e. while the blocking
+    callback is still running — and logs it with the stall duration.
+    """
+
+    def __init__(self, *, interval_seconds: float = 0.1, threshold_seconds: float = 0.25,
+                 max_stack_depth: int = 12):
+        self._interval = interval_seconds
+        self._threshold = threshold_seconds
+        self._max_depth = max_stack_depth
+        self._probe: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._last_tick = time.monotonic()
+
+        self.max_lag = 0.0
+        self.stalls = 0
+
+    def start(self) -> None:
+        if self._probe is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._stop.clear()
+        self._probe = asyncio.get_running_loop().create_task(self._probe_loop(), name="loop-lag-probe")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+        log.info("Loop lag monitor started interval=%.0fms threshold=%.0fms",
+                 self._interval * 1000, self._threshold * 1000)
+
+    async def _probe_loop(self) -> None:
+        while True:
+            t0 = time.monotonic()
+            await asyncio.sleep(self._interval)
+            now = time.monotonic()
+            self._last_tick = now
+            lag = max(0.0, now - t0 - self._interval)
+            LOOP_LAG_SECONDS.observe(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+
+    def _sample_stack(self) -> str:
+        frame = sys._current_frames().get(self._loop_thread_id) if self._loop_thread_id else None
+        if frame is None:
+            return "  (no frame)"
+        # Chỉ giữ các frame trong cùng, đủ để thấy callback đang chặn loop
+        return "".join(traceback.format_stack(frame)[-self._max_depth:]).rstrip()
+
+    def _watch(self) -> None:
+        reported_tick = None
+        while not self._stop.wait(self._threshold / 2):
+            tick = self._last_tick
+            blocked = time.monotonic() - tick - self._interval
+            if blocked < self._threshold or tick == reported_tick:
+                continue
+            # Mỗi lần loop bị chặn chỉ báo 1 lần
+            reported_tick = tick
+            self.stalls += 1
+            LOOP_STALLS.inc()
+            log.warning("Event loop blocked for %.0f ms, loop thread stack:\n%s",
+                        blocked * 1000, self._sample_stack())
+
+    def stats(self) -> dict[str, float]:
+        return {"max_lag_ms": round(self.max_lag * 1000, 1), "stalls": self.stalls}
+
+    async def close(self) -> None:
+        self._stop.set()
+        if self._probe is not None:
+            self._probe.cancel()
+            self._probe = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
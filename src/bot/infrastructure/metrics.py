@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import bisect
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, Optional, Sequence
+
+from src.bot.infrastructure.logger import get_logger
+
+log = get_logger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_num(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) and not v.is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: dict[str, object]) -> tuple[str, ...]:
+        if labels.keys() != set(self.labelnames):
+            raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: object) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: object) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> dict[tuple[str, ...], float]:
+        return dict(self._values)
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        for key, v in sorted(self._values.items()):
+            lines.append(f"{self.name}{_fmt_labels(self.labelnames, key)} {_fmt_num(v)}")
+        return lines
+
+
+@dataclass
+class _HistogramState:
+    counts: list[int]
+    total: float = 0.0
+    count: int = 0
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._states: dict[tuple[str, ...], _HistogramState] = {}
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        st = self._states.get(key)
+        if st is None:
+            st = self._states[key] = _HistogramState([0] * (len(self.buckets) + 1))
+        st.counts[bisect.bisect_left(self.buckets, value)] += 1
+        st.total += value
+        st.count += 1
+
+    @contextmanager
+    def time(self, **labels: object) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def quantile(self, q: float, **labels: object) -> Optional[float]:
+        """Bucket upper bound holding the q-quantile (coarse, for /bot_stats)."""
+        st = self._states.get(self._key(labels))
+        if st is None or st.count == 0:
+            return None
+        target = q * st.count
+        seen = 0
+        for bound, c in zip(self.buckets + (float("inf"),), st.counts):
+            seen += c
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def summary(self) -> dict[tuple[str, ...], tuple[int, float]]:
+        """label values -> (count, sum)."""
+        return {k: (st.count, st.total) for k, st in self._states.items()}
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        for key, st in sorted(self._states.items()):
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), st.counts):
+                cumulative += c
+                le = 'le="' + _fmt_num(bound) + '"'
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {st.total!r}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labelnames, key)} {st.count}")
+        return lines
+
+
+class Registry:
+    """
+    In-process metrics (single event loop, no locking): observe only from
+    the event loop thread, never from `to_thread` / offload workers.
+    `counter` / `histogram` are get-or-create so modules can declare at import.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, *args, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} already registered as {metric.kind}")
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help_text, labelnames)
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, labelnames, buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.counter(name, help_text, labelnames)
+
+
+def histogram(name: str, help_text: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+    return REGISTRY.histogram(name, help_text, labelnames, buckets)
+
+
+# ---------------------------------------------------------------- tracing
+
+SPAN_SECONDS = histogram("bot_span_seconds", "Duration of traced stages", ("span",))
+
+
+@dataclass
+class Span:
+    name: str
+    start: float  # giây tính từ đầu trace
+    duration: float
+
+
+@dataclass
+class Trace:
+    name: str
+    started: float = field(default_factory=time.perf_counter)
+    spans: list[Span] = field(default_factory=list)
+    duration: float = 0.0
+
+    def format(self, collapse_over: int = 3) -> str:
+        """Timeline of spans; names seen more than `collapse_over` times become one summary line."""
+        by_name: dict[str, list[Span]] = {}
+        for s in self.spans:
+            by_name.setdefault(s.name, []).append(s)
+
+        rows: list[tuple[float, str]] = []
+        for name, group in by_name.items():
+            if len(group) > collapse_over:
+                first = min(s.start for s in group)
+                end = max(s.start + s.duration for s in group)
+                longest = max(s.duration for s in group)
+                rows.append((first, f"  +{first * 1000:>6.0f} ms {(end - first) * 1000:>7.1f} ms  "
+                                    f"{name} x{len(group)} (max {longest * 1000:.1f} ms)"))
+            else:
+                rows.extend((s.start, f"  +{s.start * 1000:>6.0f} ms {s.duration * 1000:>7.1f} ms  {name}")
+                            for s in group)
+        rows.sort(key=lambda r: r[0])
+        return "\n".join([f"{self.name} {self.duration * 1000:.0f} ms"] + [line for _, line in rows])
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("bot_trace", default=None)
+
+# Trace chậm gần đây, cho /bot_stats
+RECENT_SLOW_TRACES: deque[Trace] = deque(maxlen=20)
+_slow_threshold_seconds = 2.0
+
+
+def set_slow_trace_threshold(seconds: float) -> None:
+    global _slow_threshold_seconds
+    _slow_threshold_seconds = seconds
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    Time one stage: always feeds bot_span_seconds, and is attached to the
+    current trace (if any). Tasks created inside a trace inherit it, so
+    concurrent stages show up side by side on the timeline.
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        SPAN_SECONDS.observe(elapsed, span=name)
+        tr = _current_trace.get()
+        if tr is not None and len(tr.spans) < 500:
+            tr.spans.append(Span(name, t0 - tr.started, elapsed))
+
+
+@contextmanager
+def trace(name: str) -> Iterator[Trace]:
+    """Start a per-request trace; slow ones are logged stage by stage and kept."""
+    tr = Trace(name)
+    token = _current_trace.set(tr)
+    try:
+        yield tr
+    finally:
+        _current_trace.reset(token)
+        tr.duration = time.perf_counter() - tr.started
+        SPAN_SECONDS.observe(tr.duration, span=name)
+        if tr.duration >= _slow_threshold_seconds:
+            RECENT_SLOW_TRACES.append(tr)
+            log.warning("Slow trace:\n%s", tr.format())
+
+
+# ---------------------------------------------------------------- endpoint
+
+class MetricsServer:
+    """Serves REGISTRY as Prometheus text on http://host:port/metrics."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9108, registry: Registry = REGISTRY):
+        self._host = host
+        self._port = port
+        self._registry = registry
+        self._runner = None
+
+    async def start(self) -> None:
+        from aiohttp import web
+
+        async def handle(_request: web.Request) -> web.Response:
+            return web.Response(body=self._registry.render().encode("utf-8"),
+                                headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self._host, self._port).start()
+        log.info("Metrics endpoint on http://%s:%d/metrics", self._host, self._port)
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
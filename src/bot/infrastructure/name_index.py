@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import bisect
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from collections import deque
+from itertools import islice
+from typing import Iterable, Optional
+
+from src.bot.domain.models import Deal
+
+_NON_WORD_RE = re.compile(r"[\W_]+")
+
+# Giới hạn công việc mỗi lần tra: autocomplete chạy trên mọi phím gõ
+MAX_PREFIX_SCAN = 200
+MAX_SUBSTRING_SCAN = 2000
+# Batch lớn hơn chừng này / bucket -> sort lại cả bucket thay vì insort từng cái
+_RESORT_BATCH = 64
+# Batch lớn (catalog crawl) được index theo từng chunk, nhả lock giữa các chunk
+_CHUNK = 5000
+
+
+def normalize_name(name: str) -> str:
+    """Casefold, strip accents and punctuation: "Ori & the Will" -> "ori the will"."""
+    decomposed = unicodedata.normalize("NFKD", name.casefold())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_WORD_RE.sub(" ", stripped).strip()
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class NameIndex:
+    """
+    In-memory name lookup for autocomplete over every discounted app the bot
+    has seen (fetch results and catalog crawls).
+
+    - prefix: sorted lists of (name tail from each word start, appid),
+      bucketed by first character, so "hollow kn" and "knight" both land on
+      "Hollow Knight" with one bisect and an insert only shifts one bucket
+    - substring: trigram -> appid postings (compact arrays); only the
+      shortest posting list of the query is scanned and each candidate is
+      verified against its name, so no set intersection is needed
+
+    Updates are incremental. Renamed or pruned apps leave stale postings that
+    are filtered at lookup and dropped when `retain` rebuilds the index.
+
+    Writers never hold the lock for long: `add_many` works in chunks of
+    `_CHUNK` deals and `retain` builds the new index outside the lock. The
+    event loop uses `offer`, which never waits for the lock; if a background
+    writer holds it, the deals are queued and that writer indexes them.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._norm: dict[int, str] = {}
+        self._deals: dict[int, Deal] = {}
+        self._seen_at: dict[int, float] = {}
+        self._tails: dict[str, list[tuple[str, int]]] = {}
+        self._grams: dict[str, array] = {}
+        self._stale = 0
+        self._pending: deque[tuple[list[Deal], float]] = deque()
+        self._rebuilding: Optional[set[int]] = None  # appids (re)index trong lúc retain build index mới
+
+    def __len__(self) -> int:
+        return len(self._norm)
+
+    def get(self, appid: int) -> Optional[Deal]:
+        return self._deals.get(appid)
+
+    def seen_at(self, appid: int) -> Optional[float]:
+        return self._seen_at.get(appid)
+
+    def add_many(self, deals: Iterable[Deal], seen_at: Optional[float] = None) -> int:
+        """
+        Index new or renamed apps and refresh the stored deal; returns how
+        many names were (re)indexed. May block on the lock (one chunk at a
+        time): call it from a worker thread for large batches, use `offer`
+        on the event loop.
+        """
+        now = seen_at if seen_at is not None else time.time()
+        indexed = 0
+        it = iter(deals)
+        while chunk := list(islice(it, _CHUNK)):
+            with self._lock:
+                indexed += self._add_locked(chunk, now)
+                indexed += self._drain_locked()
+        return indexed + self._drain()
+
+    def offer(self, deals: Iterable[Deal], seen_at: Optional[float] = None) -> None:
+        """Non-blocking add for the event loop: index now if the lock is free, else queue for the current writer."""
+        self._pending.append((list(deals), seen_at if seen_at is not None else time.time()))
+        # Writer đang giữ lock sẽ drain sau khi nhả lock (xem _drain), không cần chờ
+        self._drain()
+
+    def _drain(self) -> int:
+        indexed = 0
+        while self._pending and self._lock.acquire(blocking=False):
+            try:
+                indexed += self._drain_locked()
+            finally:
+                self._lock.release()
+        return indexed
+
+    def _drain_locked(self) -> int:
+        indexed = 0
+        while self._pending:
+            deals, seen_at = self._pending.popleft()
+            indexed += self._add_locked(deals, seen_at)
+        return indexed
+
+    def _add_locked(self, deals: Iterable[Deal], now: float) -> int:
+        indexed = 0
+        new_tails: list[tuple[str, int]] = []
+        for d in deals:
+            self._deals[d.appid] = d
+            self._seen_at[d.appid] = now
+            norm = normalize_name(d.name)
+            old = self._norm.get(d.appid)
+            if old == norm or not norm:
+                continue
+            if old is not None:
+                self._stale += 1
+            self._norm[d.appid] = norm
+            indexed += 1
+            if self._rebuilding is not None:
+                self._rebuilding.add(d.appid)
+            new_tails.extend(self._tails_of(norm, d.appid))
+            self._add_grams(self._grams, norm, d.appid)
+        self._merge_tails(new_tails)
+        return indexed
+
+    @staticmethod
+    def _add_grams(grams: dict[str, array], norm: str, appid: int) -> None:
+        for g in _trigrams(norm):
+            postings = grams.get(g)
+            if postings is None:
+                postings = grams[g] = array("I")
+            postings.append(appid)
+
+    def _merge_tails(self, new_tails: list[tuple[str, int]], tails: Optional[dict[str, list[tuple[str, int]]]] = None) -> None:
+        tails = self._tails if tails is None else tails
+        by_bucket: dict[str, list[tuple[str, int]]] = {}
+        for t in new_tails:
+            by_bucket.setdefault(t[0][0], []).append(t)
+        for key, items in by_bucket.items():
+            bucket = tails.get(key)
+            if bucket is None or len(items) > _RESORT_BATCH:
+                # Gán list mới thay vì sort tại chỗ: reader (có thể ở thread khác) không thấy list dở dang
+                tails[key] = sorted((bucket or []) + items)
+            else:
+                for t in items:
+                    bisect.insort(bucket, t)
+
+    @staticmethod
+    def _tails_of(norm: str, appid: int) -> list[tuple[str, int]]:
+        out = [(norm, appid)]
+        out.extend((norm[m.start():], appid) for m in re.finditer(r"(?<= )\S", norm))
+        return out
+
+    def retain(self, appids: Iterable[int]) -> int:
+        """Forget apps not in `appids` (e.g. no longer discounted after a full crawl); returns removed count."""
+        try:
+            return self._retain(set(appids))
+        finally:
+            self._drain()  # deal được offer trong lúc retain giữ lock
+
+    def _retain(self, keep: set[int]) -> int:
+        with self._lock:
+            gone = [a for a in self._norm if a not in keep]
+            for a in gone:
+                del self._norm[a]
+                self._deals.pop(a, None)
+                self._seen_at.pop(a, None)
+            self._stale += len(gone)
+            if self._stale <= len(self._norm) or self._rebuilding is not None:
+                return len(gone)
+            snapshot = dict(self._norm)
+            self._rebuilding = set()
+        try:
+            # Build index mới ngoài lock (~giây với 100k tên); reader vẫn dùng index cũ
+            tails, grams = self._build(snapshot)
+        except BaseException:
+            with self._lock:
+                self._rebuilding = None
+            raise
+        with self._lock:
+            changed, self._rebuilding = self._rebuilding, None
+            # Tên thêm / đổi trong lúc build chỉ nằm trong index cũ -> bổ sung vào index mới
+            extra: list[tuple[str, int]] = []
+            for appid in changed:
+                norm = self._norm.get(appid)
+                if norm is not None:
+                    extra.extend(self._tails_of(norm, appid))
+                    self._add_grams(grams, norm, appid)
+            self._merge_tails(extra, tails)
+            self._tails, self._grams = tails, grams
+            self._stale = sum(1 for a in changed if a in snapshot)  # tên cũ trong snapshot giờ là stale
+        return len(gone)
+
+    @classmethod
+    def _build(cls, names: dict[int, str]) -> tuple[dict[str, list[tuple[str, int]]], dict[str, array]]:
+        tails: dict[str, list[tuple[str, int]]] = {}
+        grams: dict[str, array] = {}
+        for appid, norm in names.items():
+            for t in cls._tails_of(norm, appid):
+                tails.setdefault(t[0][0], []).append(t)
+            cls._add_grams(grams, norm, appid)
+        for bucket in tails.values():
+            bucket.sort()
+        return tails, grams
+
+    def search(self, query: str, limit: int = 25) -> list[Deal]:
+        """Full-name prefix matches first, then word prefixes, then substrings; shorter names first."""
+        q = normalize_name(query)
+        if not q:
+            return []
+        norm = self._norm
+
+        full: dict[int, str] = {}
+        word: dict[int, str] = {}
+        tails = self._tails.get(q[0], [])
+        i = bisect.bisect_left(tails, (q,))
+        for tail, appid in tails[i:i + MAX_PREFIX_SCAN]:
+            if not tail.startswith(q):
+                break
+            name = norm.get(appid)
+            if name is None or not name.endswith(tail):
+                continue  # stale (đổi tên / đã bị prune)
+            (full if len(tail) == len(name) else word)[appid] = name
+
+        ranked = sorted(full, key=lambda a: (len(full[a]), full[a]))
+        ranked += sorted((a for a in word if a not in full), key=lambda a: (len(word[a]), word[a]))
+
+        if len(ranked) < limit and len(q) >= 3:
+            grams = self._grams
+            postings = [grams.get(g) for g in _trigrams(q)]
+            if all(p is not None for p in postings):
+                seen = set(ranked)
+                extra: dict[int, str] = {}
+                for appid in min(postings, key=len)[:MAX_SUBSTRING_SCAN]:
+                    if appid in seen or appid in extra:
+                        continue
+                    name = norm.get(appid)
+                    if name is not None and q in name:
+                        extra[appid] = name
+                        if len(ranked) + len(extra) >= limit * 4:
+                            break
+                ranked += sorted(extra, key=lambda a: (len(extra[a]), extra[a]))
+
+        deals = self._deals
+        return [deals[a] for a in ranked[:limit] if a in deals]
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "names": len(self._norm),
+            "tails": sum(len(b) for b in self._tails.values()),
+            "trigrams": len(self._grams),
+            "stale": self._stale,
+        }
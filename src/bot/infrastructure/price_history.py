@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence
+
+from src.bot.domain.models import Deal, parse_country_code
+from src.bot.domain.prices import parse_price_minor
+from src.bot.infrastructure.logger import get_logger
+
+log = get_logger(__name__)
+
+# appid, observed_at (unix s), price_final (minor units), discount_pct -> 13 bytes
+_RECORD = struct.Struct("<IIIB")
+_U32_MAX = 2**32 - 1
+
+
+@dataclass(slots=True)
+class PriceState:
+    price: int  # minor units
+    discount: int
+    last_at: int  # thời điểm record gần nhất
+    since: int  # đầu chuỗi quan sát hiện tại (cùng giá, không đứt quãng)
+    previous: Optional[int]  # giá trước chuỗi hiện tại; None nếu mới thấy / sau khoảng trống
+    low: int
+    low_discount: int
+    low_at: int
+    first_at: int
+
+
+class PriceHistoryStore:
+    """
+    Append-only price history, one binary file of fixed-size records per
+    country code (prices differ per region; language does not matter).
+
+    Only informative observations are written: a price change, a first
+    sighting after a gap of `streak_gap_seconds`, or an unchanged price at
+    most once per `heartbeat_seconds`. Replaying the file rebuilds an
+    in-memory appid -> PriceState index, so "last seen" and "all-time low"
+    are dict lookups and the live state always equals a replay of the file.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        *,
+        heartbeat_seconds: int = 20 * 3600,
+        streak_gap_seconds: int = 36 * 3600,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._dir = directory
+        self._heartbeat = heartbeat_seconds
+        self._gap = streak_gap_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._indexes: dict[str, dict[int, PriceState]] = {}
+        self.records_written = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, cc: str) -> str:
+        # cc đi vào tên file: chỉ nhận mã vùng 2 chữ cái, không bao giờ thoát khỏi thư mục
+        return os.path.join(self._dir, f"prices-{parse_country_code(cc)}.bin")
+
+    def _apply(self, index: dict[int, PriceState], appid: int, at: int, price: int, discount: int) -> bool:
+        """Fold one observation into the index; True if it must be persisted."""
+        st = index.get(appid)
+        if st is None:
+            index[appid] = PriceState(price, discount, at, at, None, price, discount, at, at)
+            return True
+
+        if at - st.last_at > self._gap:
+            st.previous, st.since = None, at
+        elif price != st.price:
+            st.previous, st.since = st.price, at
+        elif at - st.last_at < self._heartbeat:
+            return False
+
+        st.price, st.discount, st.last_at = price, discount, at
+        if price < st.low:
+            st.low, st.low_discount, st.low_at = price, discount, at
+        return True
+
+    def _load_sync(self, cc: str) -> dict[int, PriceState]:
+        index: dict[int, PriceState] = {}
+        path = self._path(cc)
+        if not os.path.exists(path):
+            return index
+        with self._lock:
+            with open(path, "rb") as f:
+                data = f.read()
+            usable = len(data) - len(data) % _RECORD.size
+            if usable != len(data):
+                # Record ghi dở (crash giữa chừng): cắt bỏ để các lần append sau vẫn thẳng hàng
+                log.warning("Price history %s has a torn tail (%d bytes), truncating", path, len(data) - usable)
+                with open(path, "r+b") as f:
+                    f.truncate(usable)
+        for appid, at, price, discount in _RECORD.iter_unpack(memoryview(data)[:usable]):
+            self._apply(index, appid, at, price, discount)
+        log.info("Loaded price history cc=%s records=%d apps=%d", cc, usable // _RECORD.size, len(index))
+        return index
+
+    def _index(self, cc: str) -> dict[int, PriceState]:
+        cc = cc.lower()
+        index = self._indexes.get(cc)
+        if index is None:
+            index = self._indexes[cc] = self._load_sync(cc)
+        return index
+
+    async def load(self, cc: str) -> None:
+        if cc.lower() not in self._indexes:
+            index = await asyncio.to_thread(self._load_sync, cc.lower())
+            self._indexes.setdefault(cc.lower(), index)
+
+    def _append_sync(self, cc: str, payload: bytes) -> None:
+        with self._lock:
+            with open(self._path(cc), "ab") as f:
+                f.write(payload)
+
+    async def record(self, cc: str, deals: Sequence[Deal], observed_at: Optional[float] = None) -> int:
+        """Fold a fetch result into the history; returns the number of records appended."""
+        await self.load(cc)
+        index = self._index(cc)
+        at = int(observed_at if observed_at is not None else self._clock())
+        out = bytearray()
+        for d in deals:
+            price = d.final_minor if d.final_minor is not None else parse_price_minor(d.price_final)
+            if price is None or not (0 <= price <= _U32_MAX) or not (0 < d.appid <= _U32_MAX):
+                continue
+            discount = max(0, min(int(d.discount_pct), 255))
+            if self._apply(index, d.appid, at, price, discount):
+                out += _RECORD.pack(d.appid, at, price, discount)
+        if out:
+            await asyncio.to_thread(self._append_sync, cc.lower(), bytes(out))
+            self.records_written += len(out) // _RECORD.size
+        return len(out) // _RECORD.size
+
+    def get(self, cc: str, appid: int) -> Optional[PriceState]:
+        return self._index(cc).get(appid)
+
+    def is_new_or_deeper(self, cc: str, appid: int, since: float) -> bool:
+        """True if the current price streak began after `since` and is a new sale or a deeper cut."""
+        st = self.get(cc, appid)
+        if st is None:
+            return True
+        return st.since >= since and (st.previous is None or st.price < st.previous)
+
+    def stats(self) -> dict[str, object]:
+        return {
+            "apps": {cc: len(index) for cc, index in self._indexes.items()},
+            "records_written": self.records_written,
+        }
+
+    async def close(self) -> None:
+        self._indexes.clear()
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import signal
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from src.bot.infrastructure.logger import get_logger
+
+log = get_logger(__name__)
+
+SORT_KEYS = ("cumulative", "tottime", "ncalls")
+
+
+class ProfilerBusyError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class ProfileResult:
+    path: str  # file .prof (mở bằng snakeviz / pstats)
+    summary_path: str
+    seconds: float
+    summary: str
+
+
+class OnDemandProfiler:
+    """
+    cProfile on the event-loop thread for a fixed window, switched on by an
+    admin command or SIGUSR1. Nothing is installed while idle, so there is
+    no overhead when it is off. Work offloaded to parse pools runs on other
+    threads/processes and is not included.
+    """
+
+    def __init__(self, output_dir: str = "data/profiles", *, default_seconds: float = 30,
+                 max_seconds: float = 300, top_n: int = 25):
+        self._output_dir = output_dir
+        self._default_seconds = default_seconds
+        self._max_seconds = max_seconds
+        self._top_n = top_n
+        self._active: Optional[cProfile.Profile] = None
+        self._signal_task: Optional[asyncio.Task] = None
+
+    @property
+    def active(self) -> bool:
+        return self._active is not None
+
+    async def capture(self, seconds: Optional[float] = None, *, sort: str = "cumulative") -> ProfileResult:
+        if self._active is not None:
+            raise ProfilerBusyError("A profile is already being captured")
+        if sort not in SORT_KEYS:
+            raise ValueError(f"sort must be one of {SORT_KEYS}")
+        seconds = max(1.0, min(seconds or self._default_seconds, self._max_seconds))
+
+        prof = cProfile.Profile()
+        self._active = prof
+        log.info("Profiling event loop for %.0fs", seconds)
+        started = time.perf_counter()
+        prof.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            prof.disable()
+            self._active = None
+        elapsed = time.perf_counter() - started
+
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self._output_dir, f"profile-{stamp}.prof")
+        summary_path = os.path.join(self._output_dir, f"profile-{stamp}.txt")
+        summary = await asyncio.to_thread(self._write, prof, path, summary_path, sort)
+        log.info("Profile written to %s", path)
+        return ProfileResult(path, summary_path, elapsed, summary)
+
+    def _write(self, prof: cProfile.Profile, path: str, summary_path: str, sort: str) -> str:
+        os.makedirs(self._output_dir, exist_ok=True)
+        prof.dump_stats(path)
+        buf = io.StringIO()
+        stats = pstats.Stats(prof, stream=buf)
+        stats.strip_dirs().sort_stats(sort).print_stats(self._top_n)
+        # Bỏ phần header của pstats, giữ bảng
+        text = buf.getvalue()
+        table = text[text.find("   ncalls"):] if "   ncalls" in text else text
+        summary = f"{stats.total_calls} calls in {stats.total_tt:.2f}s CPU, sorted by {sort}\n{table.rstrip()}\n"
+        with open(summary_path, "w", encoding="utf-8") as f:
+            f.write(summary)
+        return summary
+
+    def install_signal_handler(self, sig: int = getattr(signal, "SIGUSR1", 0)) -> bool:
+        """`kill -USR1 <pid>` -> profile default_seconds, write to disk, log top-N."""
+        if not sig:
+            return False
+        try:
+            asyncio.get_running_loop().add_signal_handler(sig, self._on_signal)
+        except (NotImplementedError, RuntimeError):  # Windows / not main thread
+            return False
+        return True
+
+    def _on_signal(self) -> None:
+        if self.active:
+            log.info("Profiler already running, signal ignored")
+            return
+        self._signal_task = asyncio.get_running_loop().create_task(self._capture_and_log(), name="profiler-signal")
+
+    async def _capture_and_log(self) -> None:
+        try:
+            result = await self.capture()
+        except Exception as e:
+            log.warning("Signal-triggered profile failed: %s", e)
+            return
+        log.info("Profile (%.0fs) %s\n%s", result.seconds, result.path, result.summary)
+
+    async def close(self) -> None:
+        if self._signal_task is not None:
+            self._signal_task.cancel()
+            self._signal_task = None
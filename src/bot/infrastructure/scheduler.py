@@ -1,43 +1,77 @@
 from __future__ import annotations
 
+import asyncio
 import datetime as dt
+import json
+import os
+from collections import defaultdict
+from typing import Optional
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 import discord
-from discord.ext import tasks
 
 from src.bot.application.ports import DealsQuery
 from src.bot.application.use_cases import GetDealsUseCase
+from src.bot.domain.models import Deal
 from src.bot.infrastructure.logger import get_logger
-from src.bot.adapters.inbound.discord_commands import send_deals_embeds  # reuse
+from src.bot.infrastructure.price_history import PriceHistoryStore
+from src.bot.infrastructure.subscriptions import Slot, Subscription, SubscriptionRegistry, slot_label
+from src.bot.adapters.inbound.discord_commands import price_history_note, send_deals_embeds  # reuse
 
 log = get_logger(__name__)
 
+# Ngủ từng đoạn tối đa chừng này rồi tính lại theo đồng hồ thật
+# (asyncio.sleep dùng monotonic: suspend / chỉnh giờ hệ thống sẽ làm lệch)
+MAX_SLEEP_CHUNK_SECONDS = 300
+POST_RETRY_DELAYS_SECONDS = (30, 120)
+
+
+def _sub_key(sub: Subscription) -> str:
+    # Định danh 1 subscription trong state file (1 kênh có thể có nhiều subscription cùng slot)
+    tags = ",".join(str(t) for t in sorted(set(sub.tag_ids)))
+    return f"{sub.channel_id}|{tags}|{sub.country_code}|{sub.language}|{sub.limit}"
+
 
 class DailyDealsScheduler:
     """
-    Run every minute and post once per day at 06:00 (local tz).
-    This avoids discord.ext.tasks 'time=' limitations and is restart-safe.
+    Post deals to every subscribed channel at its local time slot.
+
+    - sleeps until the next computed fire time instead of polling; fire times
+      are computed per local date with ZoneInfo, so DST shifts are honoured
+      (a slot inside a spring-forward gap is shifted by the gap: 02:30 -> 03:30)
+    - at each slot, subscriptions are grouped by identical DealsQuery: one
+      fetch per distinct query, then the result is fanned out to all its
+      channels concurrently (at most `fanout_concurrency` sends in flight;
+      discord.py handles per-route 429s)
+    - `prewarm_seconds` before each slot the distinct queries are fetched into
+      the use-case cache, so the posts at the slot are cache hits
+    - the last fire time posted per slot is persisted to `state_path`; after
+      a restart, slots missed within `catchup_seconds` are posted right away.
+      While a slot is only partly posted (some channels still failing), the
+      subscriptions already served are persisted too, so a catch-up only
+      posts to the ones that failed
+    - with a `price_history` and `only_new_deals`, a slot only posts deals
+      whose sale started (or deepened) after that slot last fired; channels
+      with nothing new get no message
     """
 
     def __init__(
         self,
         uc: GetDealsUseCase,
+        registry: SubscriptionRegistry,
         *,
-        steam_cc: str,
-        steam_lang: str,
-        tag_metroidvania: int,
-        channel_id: int | None,
         tz_name: str,
-        limit: int = 10,
-        hour: int = 6,
-        minute: int = 0,
+        prewarm_seconds: float = 120,
+        catchup_seconds: float = 6 * 3600,
+        state_path: str = "",
+        fanout_concurrency: int = 5,
+        price_history: Optional[PriceHistoryStore] = None,
+        only_new_deals: bool = False,
     ):
         self._uc = uc
-        self._steam_cc = steam_cc
-        self._steam_lang = steam_lang
-        self._tag = tag_metroidvania
-        self._channel_id = channel_id
+        self._registry = registry
+        self._history = price_history
+        self._only_new = only_new_deals and price_history is not None
         try:
             self._tz = ZoneInfo(tz_name)
         except ZoneInfoNotFoundError:
@@ -46,83 +80,290 @@ class DailyDealsScheduler:
             log.warning("ZoneInfo '%s' not found. Falling back to UTC+07:00 fixed offset. Install 'tzdata' to fix.",
                         tz_name)
 
-        self._limit = max(1, min(limit, 20))
-        self._target_hour = hour
-        self._target_minute = minute
+        self._prewarm = max(0.0, prewarm_seconds)
+        self._catchup = max(0.0, catchup_seconds)
+        self._state_path = state_path
+        self._fanout = asyncio.Semaphore(max(1, fanout_concurrency))
 
         self._bot: discord.Client | None = None
-        self._last_post_date: dt.date | None = None
+        self._task: asyncio.Task | None = None
+        # slot label -> fire time (UTC) đã post gần nhất
+        self._last_fired: dict[str, dt.datetime] = {}
+        # slot label -> (fire time đang post dở, subscription keys đã post xong)
+        self._partial: dict[str, tuple[dt.datetime, set[str]]] = {}
+
+    # ------------------------------------------------------------ fire times
+
+    def _fire_at(self, day: dt.date, slot: Slot) -> dt.datetime:
+        local = dt.datetime.combine(day, dt.time(slot[0], slot[1]), tzinfo=self._tz)
+        # Đi qua UTC: giờ rơi vào khoảng trống DST bị đẩy lên đúng bằng độ dài khoảng trống
+        return local.astimezone(dt.timezone.utc)
+
+    def next_fire(self, after: dt.datetime) -> Optional[tuple[Slot, dt.datetime]]:
+        """Earliest (slot, UTC fire time) strictly after `after` (aware); None without slots."""
+        slots = self._registry.slots()
+        if not slots:
+            return None
+        day = after.astimezone(self._tz).date()
+        for offset in range(0, 3):
+            d = day + dt.timedelta(days=offset)
+            future = [(t, s) for t, s in ((self._fire_at(d, s), s) for s in slots) if t > after]
+            if future:
+                t, s = min(future)
+                return s, t
+        raise RuntimeError("No upcoming fire time")  # không thể xảy ra với >= 1 slot
+
+    def last_fire(self, slot: Slot, at_or_before: dt.datetime) -> dt.datetime:
+        day = at_or_before.astimezone(self._tz).date()
+        for offset in range(0, 3):
+            t = self._fire_at(day - dt.timedelta(days=offset), slot)
+            if t <= at_or_before:
+                return t
+        raise RuntimeError("No previous fire time")
+
+    # ------------------------------------------------------------ state
+
+    def _load_state(self) -> None:
+        if not self._state_path or not os.path.exists(self._state_path):
+            return
+        try:
+            with open(self._state_path, encoding="utf-8") as f:
+                raw = json.load(f)
+            self._last_fired = {k: dt.datetime.fromisoformat(v) for k, v in raw.get("last_fired", {}).items()}
+            self._partial = {
+                k: (dt.datetime.fromisoformat(v["fire"]), set(v.get("done", ())))
+                for k, v in raw.get("partial", {}).items()
+            }
+        except (OSError, ValueError, AttributeError, KeyError, TypeError) as e:
+            log.warning("Scheduler state unreadable path=%s err=%s", self._state_path, e)
+
+    def _save_state(self) -> None:
+        if not self._state_path:
+            return
+        parent = os.path.dirname(self._state_path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        tmp = self._state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "last_fired": {k: v.isoformat() for k, v in self._last_fired.items()},
+                "partial": {k: {"fire": fire.isoformat(), "done": sorted(done)}
+                            for k, (fire, done) in self._partial.items()},
+            }, f)
+        os.replace(tmp, self._state_path)
+
+    def _persist(self) -> None:
+        try:
+            self._save_state()
+        except OSError as e:
+            log.warning("Cannot persist scheduler state path=%s err=%s", self._state_path, e)
+
+    def _mark_fired(self, slot: Slot, fire: dt.datetime) -> None:
+        self._last_fired[slot_label(slot)] = fire
+        self._partial.pop(slot_label(slot), None)
+        self._persist()
+
+    def _mark_partial(self, slot: Slot, fire: dt.datetime, done: set[str]) -> None:
+        self._partial[slot_label(slot)] = (fire, set(done))
+        self._persist()
+
+    def _missed_slots(self, now: dt.datetime) -> list[tuple[Slot, dt.datetime]]:
+        missed = []
+        for slot in self._registry.slots():
+            fire = self.last_fire(slot, now)
+            done = self._last_fired.get(slot_label(slot))
+            if done is None:
+                # Lần chạy đầu (chưa có state): coi như đã post, không spam kênh
+                self._last_fired[slot_label(slot)] = fire
+                continue
+            if done < fire and (now - fire).total_seconds() <= self._catchup:
+                missed.append((slot, fire))
+        return sorted(missed, key=lambda x: x[1])
+
+    # ------------------------------------------------------------ run loop
 
     def start(self, bot: discord.Client) -> None:
         self._bot = bot
-        if not self._channel_id:
-            log.warning("DISCORD_DEALS_CHANNEL_ID not set -> daily scheduler disabled")
-            return
-        if not self._ticker.is_running():
-            self._ticker.start()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="daily-deals-scheduler")
+            subs = self._registry.all()
             log.info(
-                "Daily scheduler started: target=%02d:%02d tz=%s channel_id=%s",
-                self._target_hour, self._target_minute, self._tz.key, self._channel_id
+                "Daily scheduler started: subscriptions=%d distinct_queries=%d slots=%s tz=%s prewarm=%.0fs",
+                len(subs), len({sub.query() for sub in subs}),
+                ",".join(slot_label(s) for s in self._registry.slots()) or "-",
+                getattr(self._tz, "key", self._tz), self._prewarm,
             )
 
-    @tasks.loop(minutes=1)
-    async def _ticker(self):
-        assert self._bot is not None
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
 
-        now = dt.datetime.now(self._tz)
-        today = now.date()
+    @staticmethod
+    def _utcnow() -> dt.datetime:
+        return dt.datetime.now(dt.timezone.utc)
 
-        # Already posted today -> do nothing
-        if self._last_post_date == today:
-            return
+    async def _sleep_until(self, when: Optional[dt.datetime]) -> bool:
+        """Sleep until `when` (None = until woken); False if the registry changed first."""
+        changed = self._registry.changed
+        while True:
+            remaining = MAX_SLEEP_CHUNK_SECONDS if when is None else (when - self._utcnow()).total_seconds()
+            if remaining <= 0:
+                return True
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=min(remaining, MAX_SLEEP_CHUNK_SECONDS))
+            except asyncio.TimeoutError:
+                continue
+            changed.clear()
+            return False
 
-        # Only post at exactly target minute
-        if not (now.hour == self._target_hour and now.minute == self._target_minute):
-            return
+    async def _run(self) -> None:
+        assert self._bot is not None
+        await self._bot.wait_until_ready()
+        self._load_state()
+
+        for slot, fire in self._missed_slots(self._utcnow()):
+            log.info("Catching up missed slot %s (fire time %s)", slot_label(slot), fire.astimezone(self._tz))
+            await self._fire(slot, fire)
+        self._save_state()
 
-        assert self._channel_id is not None
+        while True:
+            try:
+                now = self._utcnow()
+                nxt = self.next_fire(now)
+                if nxt is None:
+                    # Chưa có subscription nào: chờ tới khi registry đổi
+                    await self._sleep_until(None)
+                    continue
+                slot, fire = nxt
+                log.info("Next daily post slot=%s at %s", slot_label(slot), fire.astimezone(self._tz).isoformat())
+
+                # Registry đổi giữa chừng (thêm slot sớm hơn...) -> tính lại
+                prewarm_at = fire - dt.timedelta(seconds=self._prewarm)
+                if self._prewarm and prewarm_at > now:
+                    if not await self._sleep_until(prewarm_at):
+                        continue
+                    await self._prewarm_slot(slot)
+                if not await self._sleep_until(fire):
+                    continue
+                await self._fire(slot, fire)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.exception("Scheduler loop error: %s", e)
+                await asyncio.sleep(60)
 
-        q = DealsQuery(
-            tag_ids=[self._tag],
-            only_discounted=True,
-            limit=self._limit,
-            country_code=self._steam_cc,
-            language=self._steam_lang,
-        )
+    def _groups(self, subs: list[Subscription]) -> dict[DealsQuery, list[Subscription]]:
+        groups: dict[DealsQuery, list[Subscription]] = defaultdict(list)
+        for sub in subs:
+            groups[sub.query()].append(sub)
+        return groups
 
+    async def _fetch(self, q: DealsQuery) -> Optional[list[Deal]]:
         try:
-            deals = list(await self._uc.execute(q))
-            deals = [d for d in deals if d.discount_pct > 0]
-            deals.sort(key=lambda d: d.discount_pct, reverse=True)
+            deals = [d for d in await self._uc.execute(q) if d.discount_pct > 0]
         except Exception as e:
-            log.exception("Daily fetch failed: %s", e)
-            return
+            log.warning("Scheduled fetch failed query=%s err=%s", q, e)
+            return None
+        deals.sort(key=lambda d: d.discount_pct, reverse=True)
+        return deals
 
-        if not deals:
-            log.info("Daily post: no deals today")
-            self._last_post_date = today  # still mark to prevent retry spam
-            return
+    async def _prewarm_slot(self, slot: Slot) -> None:
+        # Không sao nếu lỗi: lúc post sẽ fetch lại
+        queries = list(self._groups(self._registry.for_slot(slot)))
+        results = await asyncio.gather(*(self._fetch(q) for q in queries))
+        log.info("Prewarmed slot=%s queries=%d ok=%d", slot_label(slot), len(queries),
+                 sum(1 for r in results if r is not None))
 
-        # Resolve channel
-        channel = self._bot.get_channel(self._channel_id)
-        if channel is None:
-            try:
-                channel = await self._bot.fetch_channel(self._channel_id)
-            except Exception as e:
-                log.exception("Cannot fetch channel_id=%s err=%s", self._channel_id, e)
-                return
+    async def _fire(self, slot: Slot, fire: dt.datetime) -> None:
+        partial = self._partial.get(slot_label(slot))
+        done = set(partial[1]) if partial is not None and partial[0] == fire else set()
+        pending = [sub for sub in self._registry.for_slot(slot) if _sub_key(sub) not in done]
+        if done:
+            log.info("Slot %s already posted to %d subscription(s) before restart, %d left",
+                     slot_label(slot), len(done), len(pending))
+        for attempt, delay in enumerate((0, *POST_RETRY_DELAYS_SECONDS), start=1):
+            if not pending:
+                break
+            if delay:
+                await asyncio.sleep(delay)
+            failed = await self._post_slot(slot, pending, since=self._last_fired.get(slot_label(slot)))
+            failed_keys = {_sub_key(sub) for sub in failed}
+            done.update(k for k in map(_sub_key, pending) if k not in failed_keys)
+            pending = failed
+            if pending:
+                # Ghi lại kênh nào đã nhận: restart giữa các lần retry không post lại cho chúng
+                self._mark_partial(slot, fire, done)
+                log.warning("Daily post slot=%s attempt=%d failed for %d channel(s)",
+                            slot_label(slot), attempt, len(pending))
+        if not pending:
+            self._mark_fired(slot, fire)
+        # Còn lỗi: không mark fired; lần restart sau (trong catch-up window) chỉ thử lại các subscription lỗi
 
-        if not isinstance(channel, (discord.TextChannel, discord.Thread, discord.DMChannel)):
-            log.warning("Channel_id=%s is not a text channel", self._channel_id)
-            return
+    def _only_new_deals(self, q: DealsQuery, deals: list[Deal], since: Optional[dt.datetime]) -> list[Deal]:
+        if not self._only_new or since is None or self._history is None:
+            return deals
+        ts = since.timestamp()
+        fresh = [d for d in deals if self._history.is_new_or_deeper(q.country_code, d.appid, ts)]
+        log.info("Only-new filter cc=%s tags=%s kept=%d/%d", q.country_code, list(q.tag_ids), len(fresh), len(deals))
+        return fresh
+
+    async def _post_slot(self, slot: Slot, subs: list[Subscription],
+                         since: Optional[dt.datetime] = None) -> list[Subscription]:
+        """One fetch per distinct query, concurrent fan-out; returns subscriptions still to retry."""
+        groups = self._groups(subs)
+        queries = list(groups)
+        results = await asyncio.gather(*(self._fetch(q) for q in queries))
+        log.info("Daily slot=%s subscriptions=%d distinct_queries=%d", slot_label(slot), len(subs), len(queries))
 
-        log.info("Daily posting %d deals to channel_id=%s", len(deals), self._channel_id)
-        await send_deals_embeds(channel.send, deals)
+        failed: list[Subscription] = []
+        jobs = []
+        for q, deals in zip(queries, results):
+            if deals is None:
+                failed.extend(groups[q])
+                continue
+            deals = self._only_new_deals(q, deals, since)
+            jobs.extend((sub, q, deals) for sub in groups[q])
 
-        # Mark posted for today
-        self._last_post_date = today
+        outcomes = await asyncio.gather(*(self._post_to_channel(sub.channel_id, deals, q.country_code)
+                                          for sub, q, deals in jobs))
+        failed.extend(sub for (sub, _, _), ok in zip(jobs, outcomes) if not ok)
+        return failed
 
-    @_ticker.before_loop
-    async def _before_ticker(self):
+    async def _resolve_channel(self, channel_id: int):
         assert self._bot is not None
-        await self._bot.wait_until_ready()
+        channel = self._bot.get_channel(channel_id)
+        if channel is None:
+            channel = await self._bot.fetch_channel(channel_id)
+        return channel
+
+    async def _post_to_channel(self, channel_id: int, deals: list[Deal], cc: str = "") -> bool:
+        """True when this channel is done for the slot (posted, nothing to post, or unusable)."""
+        if not deals:
+            log.info("Daily post: no deals for channel_id=%s", channel_id)
+            return True  # still mark to prevent retry spam
+
+        async with self._fanout:
+            try:
+                channel = await self._resolve_channel(channel_id)
+            except discord.NotFound:
+                log.warning("Channel_id=%s not found, skipping", channel_id)
+                return True
+            except Exception as e:
+                log.exception("Cannot fetch channel_id=%s err=%s", channel_id, e)
+                return False
+
+            if not isinstance(channel, (discord.TextChannel, discord.Thread, discord.DMChannel)):
+                log.warning("Channel_id=%s is not a text channel", channel_id)
+                return True
+
+            log.info("Daily posting %d deals to channel_id=%s", len(deals), channel_id)
+            try:
+                await send_deals_embeds(channel.send, deals, note=price_history_note(self._history, cc))
+            except discord.Forbidden as e:
+                log.warning("No permission to post in channel_id=%s: %s", channel_id, e)
+                return True
+            except discord.HTTPException as e:
+                log.warning("Daily post to channel_id=%s failed: %s", channel_id, e)
+                return False
+        return True
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from dataclasses import asdict, dataclass
+from typing import Optional, Sequence
+
+from src.bot.application.ports import DealsQuery
+from src.bot.domain.models import parse_country_code
+from src.bot.infrastructure.logger import get_logger
+
+log = get_logger(__name__)
+
+Slot = tuple[int, int]  # (hour, minute) giờ địa phương
+
+
+def parse_slot(raw: str) -> Slot:
+    hh, _, mm = raw.strip().partition(":")
+    h, m = int(hh), int(mm or 0)
+    if not (0 <= h < 24 and 0 <= m < 60):
+        raise ValueError(f"Invalid schedule slot: {raw!r}")
+    return h, m
+
+
+def parse_slots(raw: str) -> list[Slot]:
+    """"06:00,18:30" -> [(6, 0), (18, 30)] (sorted, de-duplicated)."""
+    slots = {parse_slot(part) for part in raw.split(",") if part.strip()}
+    if not slots:
+        raise ValueError("No schedule slots configured")
+    return sorted(slots)
+
+
+def slot_label(slot: Slot) -> str:
+    return f"{slot[0]:02d}:{slot[1]:02d}"
+
+
+@dataclass(frozen=True)
+class Subscription:
+    channel_id: int
+    slot: str  # "HH:MM" theo SCHEDULE_TZ
+    tag_ids: tuple[int, ...]
+    country_code: str = "vn"
+    language: str = "english"
+    limit: int = 10
+    guild_id: Optional[int] = None
+
+    def query(self) -> DealsQuery:
+        # Cùng query -> cùng DealsQuery (hashable) -> 1 lần fetch cho mọi kênh
+        return DealsQuery(
+            tag_ids=tuple(sorted(set(self.tag_ids))),
+            only_discounted=True,
+            limit=self.limit,
+            country_code=self.country_code,
+            language=self.language,
+        )
+
+    @staticmethod
+    def from_dict(raw: dict) -> "Subscription":
+        return Subscription(
+            channel_id=int(raw["channel_id"]),
+            slot=slot_label(parse_slot(raw["slot"])),
+            tag_ids=tuple(int(t) for t in raw["tag_ids"]),
+            country_code=parse_country_code(str(raw.get("country_code", "vn"))),
+            language=str(raw.get("language", "english")),
+            limit=max(1, min(int(raw.get("limit", 10)), 20)),
+            guild_id=int(raw["guild_id"]) if raw.get("guild_id") is not None else None,
+        )
+
+
+class SubscriptionRegistry:
+    """
+    Channel subscriptions (channel -> cc, lang, tags, limit, slot) kept in a
+    JSON file. `defaults` (e.g. the legacy DISCORD_DEALS_CHANNEL_ID setup)
+    are always active and never written to the file. `changed` is set on
+    every edit so the scheduler can re-plan its next wake-up.
+    """
+
+    def __init__(self, path: str = "", *, defaults: Sequence[Subscription] = ()):
+        self._path = path
+        self._defaults = list(dict.fromkeys(defaults))
+        self._subs: list[Subscription] = []
+        self.changed = asyncio.Event()
+        self._load()
+
+    def _load(self) -> None:
+        if not self._path or not os.path.exists(self._path):
+            return
+        try:
+            with open(self._path, encoding="utf-8") as f:
+                raw = json.load(f)
+            items = raw.get("subscriptions", [])
+        except (OSError, ValueError, AttributeError) as e:
+            log.warning("Subscriptions file unreadable path=%s err=%s", self._path, e)
+            return
+        subs = []
+        for item in items:
+            # Bỏ từng entry hỏng (vd cc không hợp lệ ghi từ bản cũ), không bỏ cả file
+            try:
+                subs.append(Subscription.from_dict(item))
+            except (ValueError, KeyError, TypeError) as e:
+                log.warning("Skipping invalid subscription in %s: %r err=%s", self._path, item, e)
+        self._subs = list(dict.fromkeys(subs))
+        log.info("Loaded %d subscription(s) from %s", len(self._subs), self._path)
+
+    def _save(self) -> None:
+        if not self._path:
+            return
+        parent = os.path.dirname(self._path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        tmp = self._path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"subscriptions": [asdict(s) for s in self._subs]}, f, indent=2)
+        os.replace(tmp, self._path)
+
+    def _touch(self) -> None:
+        self._save()
+        self.changed.set()
+
+    def all(self) -> list[Subscription]:
+        return list(dict.fromkeys(self._defaults + self._subs))
+
+    def is_default(self, sub: Subscription) -> bool:
+        return sub in self._defaults
+
+    def slots(self) -> list[Slot]:
+        return sorted({parse_slot(s.slot) for s in self.all()})
+
+    def for_slot(self, slot: Slot) -> list[Subscription]:
+        label = slot_label(slot)
+        return [s for s in self.all() if s.slot == label]
+
+    def for_guild(self, guild_id: int) -> list[Subscription]:
+        return [s for s in self.all() if s.guild_id == guild_id]
+
+    def add(self, sub: Subscription) -> bool:
+        if sub in self._subs or sub in self._defaults:
+            return False
+        self._subs.append(sub)
+        self._touch()
+        return True
+
+    def remove(self, channel_id: int, slot: Optional[str] = None) -> int:
+        """Remove a channel's subscriptions (one slot or all). Defaults are not removable."""
+        keep = [s for s in self._subs if not (s.channel_id == channel_id and (slot is None or s.slot == slot))]
+        removed = len(self._subs) - len(keep)
+        if removed:
+            self._subs = keep
+            self._touch()
+        return removed
@@ -1,7 +1,13 @@
 from __future__ import annotations
 
 from src.bot.adapters.inbound.discord_bot import DiscordBot
-from src.bot.adapters.inbound.discord_commands import register_commands
+from src.bot.adapters.inbound.discord_commands import (
+    register_admin_commands,
+    register_catalog_commands,
+    register_commands,
+    register_search_commands,
+    register_subscription_commands,
+)
 from src.bot.infrastructure.logger import setup_logging, get_logger
 from src.bot.infrastructure.config import Settings
 from src.bot.infrastructure.di import build_container
@@ -22,16 +28,27 @@ def main():
     # Attach scheduler
     bot.deals_scheduler = DailyDealsScheduler(
         container["get_deals_uc"],
-        steam_cc=settings.steam_cc,
-        steam_lang=settings.steam_lang,
-        tag_metroidvania=settings.metroidvania_tag_id,
-        channel_id=settings.deals_channel_id,
+        container["subscriptions"],
         tz_name=settings.schedule_tz,
-        limit=settings.daily_post_limit,
+        prewarm_seconds=settings.schedule_prewarm_seconds,
+        catchup_seconds=settings.schedule_catchup_seconds,
+        state_path=settings.schedule_state_path,
+        fanout_concurrency=settings.subscription_fanout_concurrency,
+        price_history=container["price_history"],
+        only_new_deals=settings.schedule_only_new_deals,
     )
 
-    # (Optional) attach http for close
+    # (Optional) attach use case + http + caches for close
+    bot.deals_uc = container["get_deals_uc"]  # type: ignore
     bot.http_client = container["http"]  # type: ignore
+    bot.cache = container["cache"]  # type: ignore
+    bot.appdetails_store = container["appdetails_store"]  # type: ignore
+    bot.metrics_server = container["metrics_server"]  # type: ignore
+    bot.loop_monitor = container["loop_monitor"]  # type: ignore
+    bot.parse_offloader = container["parse_offloader"]  # type: ignore
+    bot.profiler = container["profiler"]  # type: ignore
+    bot.price_history = container["price_history"]  # type: ignore
+    bot.catalog = container["catalog"]  # type: ignore
 
     register_commands(
         tree=bot.tree,
@@ -40,7 +57,42 @@ def main():
         steam_lang=settings.steam_lang,
         tag_metroidvania=settings.metroidvania_tag_id,
         default_limit=settings.default_limit,
+        streaming=settings.streaming_replies,
+        price_history=container["price_history"],
+    )
+    register_subscription_commands(
+        bot.tree,
+        container["subscriptions"],
+        steam_cc=settings.steam_cc,
+        steam_lang=settings.steam_lang,
+        tag_metroidvania=settings.metroidvania_tag_id,
+        default_limit=settings.default_limit,
+    )
+    if container["catalog"] is not None:
+        register_catalog_commands(
+            bot.tree,
+            container["catalog"],
+            steam_cc=settings.steam_cc,
+            default_limit=settings.default_limit,
+            price_history=container["price_history"],
+        )
+    register_search_commands(
+        bot.tree,
+        container["name_index"],
+        steam_cc=settings.steam_cc,
+        price_history=container["price_history"],
     )
+    register_admin_commands(bot.tree, sources={
+        "deals": container["get_deals_uc"],
+        "provider": container["provider"],
+        "cache": container["cache"],
+        "http": container["http"],
+        "appdetails_store": container["appdetails_store"],
+        "event_loop": container["loop_monitor"],
+        "price_history": container["price_history"],
+        "catalog": container["catalog"],
+        "name_index": container["name_index"],
+    }, profiler=container["profiler"])
 
     bot.run(settings.discord_token)
 